@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+"""
+Bulk Address Validation
+Validates recipient lists from a file: EIP-55 checksums, normalization,
+duplicate removal and flagging of contract addresses (cached eth_getCode),
+with a line-level error report.
+"""
+
+import re
+import sys
+import csv
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+from eth_hash.auto import keccak
+from config import BALANCE_BATCH_SIZE, RPC_CONCURRENCY_PER_CHAIN, CODE_CACHE_MAX_AGE
+from chains import CHAINS
+from rpc import get_web3_connection, batch_request
+from state import get_cached_code, save_code_cache
+from scheduler import bind_priority
+
+
+ADDRESS_PATTERN = re.compile(r'^0x[0-9a-fA-F]{40}$')
+
+def to_checksum(address):
+    """Return the EIP-55 checksummed form of a 0x-prefixed hex address."""
+    lower = address[2:].lower()
+    digest = keccak(lower.encode('ascii')).hex()
+    return '0x' + ''.join(c.upper() if digest[i] >= '8' else c for i, c in enumerate(lower))
+
+
+def validate_address(address):
+    """Validate one address; returns (checksummed address, None) or (None, error message).
+
+    All-lowercase and all-uppercase addresses carry no checksum and are accepted;
+    mixed-case addresses must match their EIP-55 checksum.
+    """
+    address = address.strip()
+    if not ADDRESS_PATTERN.match(address):
+        if not address.startswith('0x'):
+            return None, "missing 0x prefix"
+        if len(address) != 42:
+            return None, f"wrong length ({len(address)} characters, expected 42)"
+        return None, "not hexadecimal"
+
+    checksummed = to_checksum(address)
+    body = address[2:]
+    if body != body.lower() and body != body.upper() and address != checksummed:
+        return None, f"bad EIP-55 checksum (expected {checksummed})"
+    return checksummed, None
+
+
+def read_address_column(filename, column=None):
+    """Yield (line number, value) from a plain list (one address per line) or a CSV column."""
+    with open(filename, newline='') as f:
+        first = f.readline()
+        if column is None and ',' not in first:
+            # Plain list
+            if first.strip():
+                yield 1, first.strip()
+            for line_number, line in enumerate(f, start=2):
+                if line.strip():
+                    yield line_number, line.strip()
+            return
+
+        header = next(csv.reader([first]))
+        column = column or ('recipient' if 'recipient' in header else header[0])
+        if column not in header:
+            raise ValueError(f"Column '{column}' not found in {filename}")
+        position = header.index(column)
+        for line_number, row in enumerate(csv.reader(f), start=2):
+            if len(row) > position and row[position].strip():
+                yield line_number, row[position].strip()
+
+
+def validate_addresses(entries):
+    """Validate (line number, value) pairs.
+
+    Returns ({checksummed address: first line} in first-seen order, errors, duplicates),
+    where errors are (line, value, message) and duplicates are (line, address, first line).
+    """
+    first_seen = {}
+    errors = []
+    duplicates = []
+    for line_number, value in entries:
+        address, error = validate_address(value)
+        if error:
+            errors.append((line_number, value, error))
+        elif address in first_seen:
+            duplicates.append((line_number, address, first_seen[address]))
+        else:
+            first_seen[address] = line_number
+    return first_seen, errors, duplicates
+
+
+def _fetch_code_chunk(network, addresses):
+    web3 = get_web3_connection(network)
+    responses = batch_request(web3, [('eth_getCode', [address, 'latest']) for address in addresses])
+    results = {}
+    for address, response in zip(addresses, responses):
+        code = response.get('result') if isinstance(response, dict) else None
+        if code is not None:
+            results[address] = code not in ('0x', '0x0', '')
+    return results
+
+
+def find_contracts(network, addresses, max_age=CODE_CACHE_MAX_AGE):
+    """Return the subset of addresses that have contract code on a network.
+
+    Uses the eth_getCode cache in the state store and queries only unknown
+    addresses, in parallel JSON-RPC batches.
+    """
+    cached = get_cached_code(network, addresses, max_age)
+    missing = [address for address in addresses if address not in cached]
+    chunks = [missing[i:i + BALANCE_BATCH_SIZE] for i in range(0, len(missing), BALANCE_BATCH_SIZE)]
+
+    fetched = {}
+    with ThreadPoolExecutor(max_workers=RPC_CONCURRENCY_PER_CHAIN) as pool:
+        for result in pool.map(bind_priority(lambda chunk: _fetch_code_chunk(network, chunk)), chunks):
+            fetched.update(result)
+    if fetched:
+        save_code_cache(network, fetched)
+
+    cached.update(fetched)
+    return {address for address in addresses if cached.get(address)}
+
+
+def write_report(filename, errors, duplicates, contracts):
+    """Write a line-level CSV report of every problem found."""
+    with open(filename, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['line', 'value', 'problem'])
+        for line_number, value, error in errors:
+            writer.writerow([line_number, value, error])
+        for line_number, address, first_line in duplicates:
+            writer.writerow([line_number, address, f"duplicate of line {first_line}"])
+        for line_number, address, network in contracts:
+            writer.writerow([line_number, address, f"contract on {network}"])
+
+
+def main():
+    """Main function to vet a recipient list."""
+    parser = argparse.ArgumentParser(description="Validate and de-duplicate a recipient address list")
+    parser.add_argument('file', help="Plain list (one address per line) or CSV file")
+    parser.add_argument('--column', help="CSV column with the addresses (default: recipient, else the first)")
+    parser.add_argument('--networks', default='', help="Comma-separated networks to flag contract addresses on")
+    parser.add_argument('--output', help="Write the unique checksummed addresses to this file")
+    parser.add_argument('--report', help="Write a line-level CSV problem report to this file")
+    args = parser.parse_args()
+
+    print("🔎 Address Validation")
+    print("=" * 50)
+
+    networks = [n.strip().lower() for n in args.networks.split(',') if n.strip()]
+    unknown = [n for n in networks if n not in CHAINS]
+    if unknown:
+        print(f"❌ Unknown networks: {', '.join(unknown)}")
+        return 2
+
+    try:
+        addresses, errors, duplicates = validate_addresses(read_address_column(args.file, args.column))
+    except (OSError, ValueError) as e:
+        print(f"❌ Could not read {args.file}: {e}")
+        return 2
+
+    contracts = []
+    for network in networks:
+        flagged = find_contracts(network, list(addresses))
+        contracts.extend((network, address) for address in addresses if address in flagged)
+
+    print(f"✅ {len(addresses)} unique valid address(es)")
+    print(f"❌ {len(errors)} invalid")
+    print(f"♻️  {len(duplicates)} duplicate(s)")
+    if networks:
+        print(f"📜 {len(contracts)} contract address(es) on {', '.join(networks)}")
+
+    for line_number, value, error in errors[:20]:
+        print(f"  line {line_number}: {value!r}: {error}")
+    if len(errors) > 20:
+        print(f"  ... and {len(errors) - 20} more")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.writelines(address + "\n" for address in addresses)
+        print(f"💾 Addresses written to {args.output}")
+    if args.report:
+        write_report(args.report, errors, duplicates,
+                     [(addresses[address], address, network) for network, address in contracts])
+        print(f"💾 Report written to {args.report}")
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,409 @@
+#!/usr/bin/env python3
+"""
+Balance alerts for the EVM Wallet Manager.
+Threshold and rate-of-change rules from alerts.json are checked against
+balance updates as they arrive. Only balances that changed are looked at,
+and each one only against the rules for its network and asset, so the
+cost follows the number of changes, not wallets x rules. Firing alerts
+whose outcome depends on time (a rate window expiring, a reminder due)
+are kept on a heap of deadlines and re-checked when those come due.
+Notifications go to stdout and, optionally, a webhook, with debouncing
+against flapping.
+
+Rule fields: name, network, asset, optional wallets (addresses; default
+all), and one condition: below / above (amount), or drop / rise (amount)
+within window (seconds).
+"""
+
+import sys
+import json
+import time
+import heapq
+import argparse
+import threading
+import urllib.request
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal, InvalidOperation
+from config import (
+    ALERT_RULES_FILE, ALERT_WEBHOOK_URL, ALERT_DEBOUNCE_SECONDS, ALERT_REPEAT_SECONDS, ALERT_CHECK_INTERVAL,
+)
+from chains import CHAINS
+from balances import fetch_all_balances, fetch_head_blocks, chain_asset_decimals, format_amount
+from state import save_balances, get_wallet_addresses
+from scheduler import rpc_priority, bind_priority
+
+
+CONDITIONS = ('below', 'above', 'drop', 'rise')
+RATE_CONDITIONS = ('drop', 'rise')
+WEBHOOK_TIMEOUT = 10  # seconds
+
+_webhook_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix='alert-webhook')
+_engine = None
+_engine_loaded = False
+_engine_lock = threading.Lock()
+
+
+def load_rules(filename=ALERT_RULES_FILE):
+    """Load and validate alert rules; returns [] if the file does not exist."""
+    try:
+        with open(filename) as f:
+            data = json.load(f)
+    except FileNotFoundError:
+        return []
+
+    rules = []
+    for position, rule in enumerate(data.get('rules', []), start=1):
+        name = rule.get('name') or f"rule {position}"
+        network = str(rule.get('network', '')).lower()
+        if network not in CHAINS:
+            raise ValueError(f"Alert '{name}' has unknown network {rule.get('network')} in {filename}")
+        asset = str(rule.get('asset', '')).upper()
+        if asset != CHAINS[network]['native'] and asset not in CHAINS[network]['tokens']:
+            raise ValueError(f"Alert '{name}' has asset {asset}, which {network} does not list, in {filename}")
+        conditions = [condition for condition in CONDITIONS if condition in rule]
+        if len(conditions) != 1:
+            raise ValueError(f"Alert '{name}' needs exactly one of {', '.join(CONDITIONS)} in {filename}")
+        condition = conditions[0]
+        try:
+            amount = Decimal(str(rule[condition]))
+        except InvalidOperation:
+            raise ValueError(f"Alert '{name}' has an invalid amount {rule[condition]} in {filename}")
+        window = float(rule.get('window', 3600)) if condition in RATE_CONDITIONS else None
+        rules.append({
+            'name': name,
+            'network': network,
+            'asset': asset,
+            'wallets': [address.lower() for address in rule.get('wallets') or []],
+            'condition': condition,
+            'amount': amount,
+            'window': window,
+        })
+    return rules
+
+
+def new_alert_engine(rules, webhook_url=ALERT_WEBHOOK_URL):
+    """Return an alert engine with its rules indexed by (network, asset) and wallet."""
+    engine = {
+        'lock': threading.Lock(),
+        'rules': [],
+        'index': {},  # (network, asset) -> {'any': [rule], 'wallets': {address: [rule]}}
+        'decimals': {},
+        'last': {},  # (network, address, asset) -> last raw balance seen
+        'history': {},  # (network, address, asset) -> deque of (time, raw) for rate rules
+        'alerts': {},  # (rule id, address) -> {'firing', 'notified', 'notified_at', 'due'}
+        'timers': [],  # heap of (deadline, rule id, address, key) for firing alerts to re-check
+        'webhook_url': webhook_url,
+        'sent': 0,
+    }
+    for rule_id, rule in enumerate(rules):
+        network, asset = rule['network'], rule['asset']
+        if network not in engine['decimals']:
+            engine['decimals'][network] = chain_asset_decimals(network)
+        decimals = engine['decimals'][network][asset]
+        rule = dict(rule, id=rule_id, decimals=decimals,
+                    threshold=int(rule['amount'].scaleb(decimals).to_integral_value()))
+        engine['rules'].append(rule)
+        entry = engine['index'].setdefault((network, asset), {'any': [], 'wallets': {}})
+        if rule['wallets']:
+            for address in rule['wallets']:
+                entry['wallets'].setdefault(address, []).append(rule)
+        else:
+            entry['any'].append(rule)
+    return engine
+
+
+def load_alert_engine(filename=ALERT_RULES_FILE):
+    """Return an alert engine for the rules file, or None if there are no rules."""
+    rules = load_rules(filename)
+    return new_alert_engine(rules) if rules else None
+
+
+def get_alert_engine():
+    """Return the shared alert engine for ALERT_RULES_FILE (loaded once), or None if there are no rules."""
+    global _engine, _engine_loaded
+    with _engine_lock:
+        if not _engine_loaded:
+            _engine_loaded = True
+            _engine = load_alert_engine()
+        return _engine
+
+
+def _rules_for(engine, network, address, asset):
+    entry = engine['index'].get((network, asset))
+    if entry is None:
+        return []
+    specific = entry['wallets'].get(address.lower())
+    return entry['any'] + specific if specific else entry['any']
+
+
+def _is_firing(rule, raw, values):
+    if rule['condition'] == 'below':
+        return raw < rule['threshold']
+    if rule['condition'] == 'above':
+        return raw > rule['threshold']
+    if rule['condition'] == 'drop':
+        return max(values) - raw >= rule['threshold']
+    return raw - min(values) >= rule['threshold']
+
+
+def _record_history(engine, key, raw, now, window):
+    """Add a balance to a key's history, keeping the value in effect at the window's start."""
+    history = engine['history'].setdefault(key, deque())
+    history.append((now, raw))
+    while len(history) > 1 and history[1][0] <= now - window:
+        history.popleft()
+    return history
+
+
+def _window_values(history, now, window):
+    """Return the balances a key had during the last window seconds (including the one at its start)."""
+    values = []
+    for position, (seen_at, value) in enumerate(history):
+        following = history[position + 1][0] if position + 1 < len(history) else now
+        if following > now - window:
+            values.append(value)
+    return values
+
+
+def observe_balances(engine, balances, now=None):
+    """Check balance updates in fetch_all_balances() shape against the rules; returns the notices sent.
+
+    Balances that did not change since the last call, or that no rule
+    watches, are skipped after one dictionary lookup. Alerts that came due
+    since the last call are re-checked first (see check_due_alerts).
+    """
+    if engine is None:
+        return []
+    now = now if now is not None else time.time()
+    with engine['lock']:
+        notices = _run_due(engine, now)
+        for network, by_address in balances.items():
+            for address, assets in by_address.items():
+                for asset, raw in assets.items():
+                    if raw is None:
+                        continue
+                    rules = _rules_for(engine, network, address, asset)
+                    if not rules:
+                        continue
+                    key = (network, address.lower(), asset)
+                    if engine['last'].get(key) == raw:
+                        continue
+                    engine['last'][key] = raw
+
+                    windows = [rule['window'] for rule in rules if rule['window']]
+                    if windows:
+                        _record_history(engine, key, raw, now, max(windows))
+                    for rule in rules:
+                        notice = _evaluate(engine, rule, address, key, now)
+                        if notice:
+                            notices.append(notice)
+    for notice in notices:
+        notify(engine, notice)
+    return notices
+
+
+def check_due_alerts(engine, now=None):
+    """Re-check firing alerts whose rate window moved on or whose reminder is due; returns the notices sent."""
+    if engine is None:
+        return []
+    now = now if now is not None else time.time()
+    with engine['lock']:
+        notices = _run_due(engine, now)
+    for notice in notices:
+        notify(engine, notice)
+    return notices
+
+
+def _evaluate(engine, rule, address, key, now):
+    """Check one rule against a key's last balance and schedule its next re-check (engine lock held)."""
+    raw = engine['last'][key]
+    values = _window_values(engine['history'][key], now, rule['window']) if rule['window'] else None
+    notice = _transition(engine, rule, address, raw, _is_firing(rule, raw, values), now)
+    _schedule(engine, rule, address, key, now)
+    return notice
+
+
+def _schedule(engine, rule, address, key, now):
+    """Push the next time a firing alert can change without a new balance (engine lock held)."""
+    alert = engine['alerts'][(rule['id'], address.lower())]
+    alert['due'] = None
+    if not alert['firing']:
+        return
+    deadlines = []
+    if ALERT_REPEAT_SECONDS and alert['notified_at'] is not None:
+        deadlines.append(alert['notified_at'] + ALERT_REPEAT_SECONDS)
+    if rule['window']:
+        # The next balance to leave the window, which is when a rate alert can resolve
+        history = engine['history'][key]
+        deadlines.extend(seen_at + rule['window'] for seen_at, _ in list(history)[1:] if seen_at + rule['window'] > now)
+    if deadlines:
+        alert['due'] = min(deadlines)
+        heapq.heappush(engine['timers'], (alert['due'], rule['id'], address, key))
+
+
+def _run_due(engine, now):
+    """Re-evaluate every alert whose deadline has passed; returns their notices (engine lock held)."""
+    notices = []
+    timers = engine['timers']
+    while timers and timers[0][0] <= now:
+        due, rule_id, address, key = heapq.heappop(timers)
+        # Entries superseded by a later evaluation are left in the heap and skipped here
+        if engine['alerts'][(rule_id, address.lower())]['due'] != due:
+            continue
+        notice = _evaluate(engine, engine['rules'][rule_id], address, key, now)
+        if notice:
+            notices.append(notice)
+    return notices
+
+
+def _transition(engine, rule, address, raw, firing, now):
+    """Update one (rule, wallet) alert and return a notice if one is due (engine lock held)."""
+    alert = engine['alerts'].setdefault((rule['id'], address.lower()),
+                                        {'firing': False, 'notified': False, 'notified_at': None})
+    since_notice = now - alert['notified_at'] if alert['notified_at'] is not None else None
+    status = None
+    if firing and not alert['firing']:
+        # Re-entering an alert right after the last notice (a flapping balance) stays quiet
+        alert['notified'] = since_notice is None or since_notice >= ALERT_DEBOUNCE_SECONDS
+        status = 'firing' if alert['notified'] else None
+    elif firing and ALERT_REPEAT_SECONDS and since_notice is not None and since_notice >= ALERT_REPEAT_SECONDS:
+        alert['notified'] = True
+        status = 'firing'
+    elif not firing and alert['firing']:
+        status = 'resolved' if alert['notified'] else None
+        alert['notified'] = False
+    alert['firing'] = firing
+    if status is None:
+        return None
+    alert['notified_at'] = now
+    return {
+        'rule': rule['name'],
+        'status': status,
+        'network': rule['network'],
+        'address': address,
+        'asset': rule['asset'],
+        'condition': rule['condition'],
+        'threshold': str(rule['amount']),
+        'window': rule['window'],
+        'balance': format_amount(raw, rule['decimals'], rule['decimals']),
+        'balance_raw': str(raw),
+        'time': now,
+    }
+
+
+def format_notice(notice):
+    """Return a one-line description of a notice."""
+    condition = notice['condition']
+    if condition in RATE_CONDITIONS:
+        condition = f"{condition} of {notice['threshold']} within {notice['window']:.0f}s"
+    else:
+        condition = f"{condition} {notice['threshold']}"
+    icon = "🚨" if notice['status'] == 'firing' else "✅"
+    return (f"{icon} [{notice['rule']}] {notice['status']}: {notice['network']} {notice['address']} "
+            f"{notice['asset']} balance {notice['balance'].rstrip('0').rstrip('.')} ({condition})")
+
+
+def _post_webhook(url, notice):
+    try:
+        request = urllib.request.Request(url, data=json.dumps(notice).encode('utf-8'),
+                                         headers={'Content-Type': 'application/json'})
+        with urllib.request.urlopen(request, timeout=WEBHOOK_TIMEOUT):
+            pass
+    except Exception as e:
+        print(f"⚠️  Alert webhook failed: {e}")
+
+
+def notify(engine, notice):
+    """Print a notice and post it to the webhook, if one is set (in the background)."""
+    print(format_notice(notice), flush=True)
+    engine['sent'] += 1
+    if engine['webhook_url']:
+        _webhook_pool.submit(_post_webhook, engine['webhook_url'], notice)
+
+
+def firing_alerts(engine):
+    """Return the number of (rule, wallet) alerts currently firing."""
+    if engine is None:
+        return 0
+    with engine['lock']:
+        return sum(1 for alert in engine['alerts'].values() if alert['firing'])
+
+
+def watch_alerts(engine, addresses, networks=None, interval=ALERT_CHECK_INTERVAL):
+    """Check the rules until Ctrl+C, re-reading only wallets touched by new blocks."""
+    # Imported here because dashboard.py imports this module
+    from dashboard import read_block_updates
+
+    networks = list(networks or CHAINS)
+    wallet_by_lower = {address.lower(): address for address in addresses}
+    heads = fetch_head_blocks(networks)
+    balances = fetch_all_balances(addresses, networks)
+    save_balances(balances, heads)
+    observe_balances(engine, balances)
+    last_full = dict(heads)
+    print(f"👀 Watching {len(addresses)} wallet(s) with {len(engine['rules'])} rule(s), "
+          f"{firing_alerts(engine)} alert(s) firing (Ctrl+C to stop)")
+
+    with ThreadPoolExecutor(max_workers=max(1, len(networks))) as pool:
+        while True:
+            time.sleep(interval)
+            moved = {network: head for network, head in fetch_head_blocks(networks).items()
+                     if head is not None and (heads[network] is None or head > heads[network])}
+            futures = {network: pool.submit(bind_priority(read_block_updates), network, addresses, wallet_by_lower,
+                                            heads[network], last_full[network], head)
+                       for network, head in moved.items()}
+            for network, future in futures.items():
+                try:
+                    updated, full = future.result()
+                except Exception as e:
+                    print(f"⚠️  {network}: {e}")
+                    continue
+                heads[network] = moved[network]
+                if full:
+                    last_full[network] = moved[network]
+                if updated:
+                    save_balances({network: updated}, {network: moved[network]})
+                    observe_balances(engine, {network: updated})
+            check_due_alerts(engine)
+
+
+def main():
+    """Main function to check balance alerts."""
+    parser = argparse.ArgumentParser(description="Check balance alert rules against live balances")
+    parser.add_argument('--rules', default=ALERT_RULES_FILE, help="Alert rules file")
+    parser.add_argument('--once', action='store_true', help="Check current balances once and exit")
+    parser.add_argument('--interval', type=float, default=ALERT_CHECK_INTERVAL, help="Seconds between head checks")
+    parser.add_argument('--networks', nargs='+', choices=sorted(CHAINS), help="Networks to watch (default: all)")
+    args = parser.parse_args()
+
+    print("🚨 Balance Alerts")
+    print("=" * 50)
+
+    engine = load_alert_engine(args.rules)
+    if engine is None:
+        print(f"❌ No alert rules found in {args.rules}")
+        return 1
+    # Addresses come from the state store, so no keystore password is needed
+    addresses = list(get_wallet_addresses().values())
+    if not addresses:
+        print("❌ No wallets in the state store; run main.py once to index them")
+        return 1
+
+    with rpc_priority('background'):
+        if args.once:
+            balances = fetch_all_balances(addresses, args.networks)
+            save_balances(balances, fetch_head_blocks(args.networks))
+            observe_balances(engine, balances)
+            firing = firing_alerts(engine)
+            print(f"{'🚨' if firing else '✅'} {firing} alert(s) firing")
+            return 2 if firing else 0
+        try:
+            watch_alerts(engine, addresses, args.networks, args.interval)
+        except KeyboardInterrupt:
+            print("\n👋 Stopped watching")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
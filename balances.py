@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+Registry-driven balance scanning for the EVM Wallet Manager.
+Reads native and token balances for many addresses on every configured
+chain, with chains queried in parallel and reads sent as JSON-RPC batches.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Context, Decimal
+from config import BALANCE_BATCH_SIZE, RPC_CONCURRENCY_PER_CHAIN
+from chains import CHAINS, list_assets
+from rpc import get_web3_connection, batch_request
+from scheduler import bind_priority
+
+
+SELECTOR_BALANCE_OF = '0x70a08231'
+SELECTOR_DECIMALS = '0x313ce567'
+
+_decimals_cache = {}
+
+
+def encode_balance_of(address):
+    """ABI-encode a balanceOf(address) call."""
+    return SELECTOR_BALANCE_OF + address[2:].lower().rjust(64, '0')
+
+
+def decode_uint(response):
+    """Decode a uint256 JSON-RPC result, or return None if the call failed."""
+    if not isinstance(response, dict) or 'error' in response:
+        return None
+    result = response.get('result')
+    if result is None:
+        return None
+    if result in ('0x', ''):
+        return 0
+    return int(result, 16) if isinstance(result, str) else int(result)
+
+
+def format_amount(raw, decimals, places):
+    """Format a raw integer amount with the given decimals, without float rounding."""
+    if raw is None:
+        return "n/a"
+    amount = Decimal(raw).scaleb(-decimals)
+    return f"{amount:.{places}f}"
+
+
+def to_base_units(amount, decimals):
+    """Convert an amount in token units (str, int or Decimal) to raw base units, exactly.
+
+    Raises ValueError if the amount has more decimal places than the asset, instead of truncating it.
+    """
+    amount = Decimal(str(amount))
+    # Enough precision for every digit: the default context would round past 28 of them
+    raw = amount.scaleb(decimals, Context(prec=max(28, len(amount.as_tuple().digits))))
+    if raw != raw.to_integral_value():
+        raise ValueError(f"{amount} has more than {decimals} decimal places")
+    return int(raw)
+
+
+def get_token_decimals(network, symbol, token_address):
+    """Return token decimals from the registry, querying the chain once if unset."""
+    key = (network, symbol)
+    if key not in _decimals_cache:
+        decimals = CHAINS[network]['tokens'][symbol]['decimals']
+        if decimals is None:
+            web3 = get_web3_connection(network)
+            response = web3.provider.make_request(
+                'eth_call', [{'to': token_address, 'data': SELECTOR_DECIMALS}, 'latest'])
+            decimals = decode_uint(response)
+            if decimals is None:
+                raise ValueError(f"Could not read decimals for {symbol} on {network}")
+        _decimals_cache[key] = decimals
+    return _decimals_cache[key]
+
+
+def chain_asset_decimals(network):
+    """Return {symbol: decimals} for the native asset and every token of a network."""
+    decimals = {}
+    for symbol, asset_decimals, token_address in list_assets(network):
+        if token_address is not None:
+            asset_decimals = get_token_decimals(network, symbol, token_address)
+        decimals[symbol] = asset_decimals
+    return decimals
+
+
+def _fetch_chunk(network, addresses, block):
+    """Read every asset balance for a chunk of addresses in one batch."""
+    web3 = get_web3_connection(network)
+    assets = list_assets(network)
+    block = block if isinstance(block, str) else hex(block)
+    requests = []
+    for address in addresses:
+        for symbol, _, token_address in assets:
+            if token_address is None:
+                requests.append(('eth_getBalance', [address, block]))
+            else:
+                requests.append(('eth_call', [{'to': token_address, 'data': encode_balance_of(address)}, block]))
+
+    responses = batch_request(web3, requests)
+
+    balances = {}
+    position = 0
+    for address in addresses:
+        balances[address] = {}
+        for symbol, _, _ in assets:
+            balances[address][symbol] = decode_uint(responses[position])
+            position += 1
+    return balances
+
+
+def fetch_chain_balances(network, addresses, block='latest'):
+    """Return {address: {symbol: raw balance or None}} for one network."""
+    chunk_size = max(1, BALANCE_BATCH_SIZE // len(list_assets(network)))
+    chunks = [addresses[i:i + chunk_size] for i in range(0, len(addresses), chunk_size)]
+
+    balances = {}
+    with ThreadPoolExecutor(max_workers=RPC_CONCURRENCY_PER_CHAIN) as pool:
+        for result in pool.map(bind_priority(lambda chunk: _fetch_chunk(network, chunk, block)), chunks):
+            balances.update(result)
+    return balances
+
+
+def fetch_all_balances(addresses, networks=None, block='latest'):
+    """Return {network: {address: {symbol: raw balance or None}}}, querying all chains in parallel.
+
+    block is one block tag for every chain or a {network: block} dict (missing or None means 'latest').
+    """
+    networks = list(networks or CHAINS)
+    addresses = list(addresses)
+    results = {}
+    if not networks or not addresses:
+        return results
+
+    with ThreadPoolExecutor(max_workers=len(networks)) as pool:
+        futures = {network: pool.submit(bind_priority(fetch_chain_balances), network, addresses,
+                                        (block.get(network) or 'latest') if isinstance(block, dict) else block)
+                   for network in networks}
+        for network, future in futures.items():
+            try:
+                results[network] = future.result()
+            except Exception as e:
+                print(f"⚠️  Could not read balances on {network}: {e}")
+                results[network] = {address: {symbol: None for symbol, _, _ in list_assets(network)}
+                                    for address in addresses}
+    return results
+
+
+def fetch_head_blocks(networks=None):
+    """Return {network: latest block number or None}, querying all chains in parallel."""
+    networks = list(networks or CHAINS)
+
+    def head(network):
+        try:
+            return get_web3_connection(network).eth.block_number
+        except Exception:
+            return None
+
+    with ThreadPoolExecutor(max_workers=max(1, len(networks))) as pool:
+        return dict(zip(networks, pool.map(bind_priority(head), networks)))
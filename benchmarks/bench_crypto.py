@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+"""
+Crypto and keystore micro-benchmarks.
+Measures KDF time, Fernet throughput and keystore unlock/parse cost
+across keystore sizes, and emits machine-readable results.
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import shutil
+import tempfile
+import statistics
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cryptography.fernet import Fernet  # noqa: E402
+
+from crypto import (  # noqa: E402
+    derive_key_from_password,
+    encrypt_data,
+    decrypt_data,
+    load_encrypted_file,
+    save_encrypted_file,
+)
+from main import parse_wallets  # noqa: E402
+from decrypt import derive_address_lines  # noqa: E402
+from keystore import iter_keys, write_sharded_keystore, load_sharded_wallets  # noqa: E402
+
+
+PASSWORD = 'benchmark-password'
+DEFAULT_PAYLOAD_SIZES = [1024, 64 * 1024, 1024 * 1024, 16 * 1024 * 1024]
+DEFAULT_KEYSTORE_SIZES = [10, 100, 1000, 10000]
+
+
+def timed(func, repeat):
+    """Run func repeat times and return the list of durations in seconds."""
+    durations = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        durations.append(time.perf_counter() - started)
+    return durations
+
+
+def summarize(durations):
+    """Summarize a list of durations in milliseconds."""
+    return {
+        'runs': len(durations),
+        'min_ms': round(min(durations) * 1000, 3),
+        'mean_ms': round(statistics.mean(durations) * 1000, 3),
+        'max_ms': round(max(durations) * 1000, 3),
+    }
+
+
+def bench_kdf(repeat):
+    """Measure PBKDF2 key derivation time."""
+    salt = os.urandom(16)
+    result = summarize(timed(lambda: derive_key_from_password(PASSWORD, salt), repeat))
+    result['benchmark'] = 'kdf'
+    return result
+
+
+def bench_fernet(size, repeat):
+    """Measure raw Fernet and end-to-end encrypt/decrypt throughput for a payload size."""
+    key, salt = derive_key_from_password(PASSWORD)
+    fernet = Fernet(key)
+    payload = os.urandom(size // 2).hex().encode('utf-8')[:size]
+    token = fernet.encrypt(payload)
+    mb = len(payload) / (1024 * 1024)
+
+    encrypt = min(timed(lambda: fernet.encrypt(payload), repeat))
+    decrypt = min(timed(lambda: fernet.decrypt(token), repeat))
+
+    text = payload.decode('utf-8')
+    encrypted, data_salt = encrypt_data(text, PASSWORD)
+    encrypt_e2e = min(timed(lambda: encrypt_data(text, PASSWORD), repeat))
+    decrypt_e2e = min(timed(lambda: decrypt_data(encrypted, PASSWORD, data_salt), repeat))
+
+    return {
+        'benchmark': 'fernet',
+        'bytes': len(payload),
+        'encrypt_mb_s': round(mb / encrypt, 2),
+        'decrypt_mb_s': round(mb / decrypt, 2),
+        'encrypt_data_ms': round(encrypt_e2e * 1000, 3),
+        'decrypt_data_ms': round(decrypt_e2e * 1000, 3),
+    }
+
+
+def build_keystore_content(count):
+    """Build KEY_n=... content with deterministic private keys."""
+    return "\n".join(f"KEY_{i}={format(i, '064x')}" for i in range(1, count + 1))
+
+
+def bench_keystore(count, repeat):
+    """Measure unlock, parse and address derivation for a keystore of the given size."""
+    content = build_keystore_content(count)
+    fd, filename = tempfile.mkstemp(suffix='.dat')
+    os.close(fd)
+    try:
+        save_encrypted_file(content, filename, PASSWORD)
+        file_size = os.path.getsize(filename)
+        unlock = min(timed(lambda: load_encrypted_file(filename, PASSWORD), repeat))
+    finally:
+        os.remove(filename)
+
+    parse = min(timed(lambda: parse_wallets(content), repeat))
+    derive = min(timed(lambda: derive_address_lines(content), repeat))
+    per_1k = 1000 / count
+
+    # Sharded keystore: one KDF run, shards decrypted and derived across all cores
+    directory = tempfile.mkdtemp(prefix='keystore-bench-')
+    try:
+        write_sharded_keystore(iter_keys(content), directory, PASSWORD, -(-count // (os.cpu_count() or 1)))
+        sharded = min(timed(lambda: load_sharded_wallets(directory, PASSWORD), repeat))
+    finally:
+        shutil.rmtree(directory)
+
+    return {
+        'benchmark': 'keystore',
+        'keys': count,
+        'file_bytes': file_size,
+        'unlock_ms': round(unlock * 1000, 3),
+        'load_wallets_parse_ms': round(parse * 1000, 3),
+        'decrypt_derive_ms': round(derive * 1000, 3),
+        'load_wallets_parse_ms_per_1k': round(parse * 1000 * per_1k, 3),
+        'decrypt_derive_ms_per_1k': round(derive * 1000 * per_1k, 3),
+        'total_unlock_ms': round((unlock + parse) * 1000, 3),
+        'sharded_unlock_ms': round(sharded * 1000, 3),
+    }
+
+
+def print_table(results):
+    """Print results grouped by benchmark."""
+    for result in results:
+        if result['benchmark'] == 'kdf':
+            print(f"🔑 KDF (PBKDF2-SHA256, 100k iterations): mean {result['mean_ms']:.1f} ms "
+                  f"(min {result['min_ms']:.1f}, max {result['max_ms']:.1f})")
+
+    print(f"\n{'Payload':>12} {'Enc MB/s':>10} {'Dec MB/s':>10} {'encrypt_data':>14} {'decrypt_data':>14}")
+    print("-" * 64)
+    for r in results:
+        if r['benchmark'] == 'fernet':
+            print(f"{r['bytes']:>12} {r['encrypt_mb_s']:>10.1f} {r['decrypt_mb_s']:>10.1f} "
+                  f"{r['encrypt_data_ms']:>11.1f} ms {r['decrypt_data_ms']:>11.1f} ms")
+
+    print(f"\n{'Keys':>8} {'Unlock ms':>10} {'Parse ms':>10} {'Parse/1k':>10} {'Derive/1k':>10} {'Total ms':>10} "
+          f"{'Sharded ms':>11}")
+    print("-" * 74)
+    for r in results:
+        if r['benchmark'] == 'keystore':
+            print(f"{r['keys']:>8} {r['unlock_ms']:>10.1f} {r['load_wallets_parse_ms']:>10.1f} "
+                  f"{r['load_wallets_parse_ms_per_1k']:>10.1f} {r['decrypt_derive_ms_per_1k']:>10.1f} "
+                  f"{r['total_unlock_ms']:>10.1f} {r['sharded_unlock_ms']:>11.1f}")
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description="Crypto and keystore micro-benchmarks")
+    parser.add_argument('--payload-sizes', default=','.join(str(s) for s in DEFAULT_PAYLOAD_SIZES),
+                        help="Comma-separated Fernet payload sizes in bytes")
+    parser.add_argument('--keystore-sizes', default=','.join(str(s) for s in DEFAULT_KEYSTORE_SIZES),
+                        help="Comma-separated keystore sizes (number of keys)")
+    parser.add_argument('--repeat', type=int, default=3, help="Repetitions per measurement")
+    parser.add_argument('--format', choices=['table', 'json'], default='table',
+                        help="Output format for stdout")
+    parser.add_argument('--json', dest='json_output', help="Also write results to this JSON file")
+    args = parser.parse_args()
+
+    results = [bench_kdf(args.repeat)]
+    for size in (int(s) for s in args.payload_sizes.split(',') if s.strip()):
+        results.append(bench_fernet(size, args.repeat))
+    for count in (int(s) for s in args.keystore_sizes.split(',') if s.strip()):
+        results.append(bench_keystore(count, args.repeat))
+
+    report = {
+        'created': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+        'python': sys.version.split()[0],
+        'repeat': args.repeat,
+        'results': results,
+    }
+
+    if args.format == 'json':
+        print(json.dumps(report, indent=2))
+    else:
+        print_table(results)
+
+    if args.json_output:
+        with open(args.json_output, 'w') as f:
+            json.dump(report, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main_cli())
@@ -0,0 +1,270 @@
+#!/usr/bin/env python3
+"""
+Offline wallet manager benchmarks.
+Drives the main.py code paths against a local mock JSON-RPC server and
+reports wall time, RPC calls made and peak memory per wallet count.
+"""
+
+import os
+import sys
+import json
+import time
+import builtins
+import argparse
+import tempfile
+import tracemalloc
+import contextlib
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from eth_account import Account  # noqa: E402
+
+import main  # noqa: E402
+import rpc  # noqa: E402
+import rpc_cache  # noqa: E402
+from chains import CHAINS  # noqa: E402
+from state import get_state_db  # noqa: E402
+from benchmarks.mock_rpc import start_mock_rpc, reset_counters, get_counters  # noqa: E402
+
+
+DEFAULT_COUNTS = [10, 100, 1000]
+SCENARIOS = ['balances', 'details', 'sends', 'receipts']
+BASELINE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+RECIPIENT = '0x000000000000000000000000000000000000dEaD'
+
+
+def make_wallets(count):
+    """Build a deterministic wallets dict in the same shape as load_wallets()."""
+    wallets = {}
+    for index in range(1, count + 1):
+        private_key = '0x' + format(index, '064x')
+        account = Account.from_key(private_key)
+        wallets[index] = {
+            'private_key': private_key,
+            'address': account.address,
+            'account': account,
+        }
+    return wallets
+
+
+# Each runner returns the number of operations that failed (injected errors with --error-rate);
+# workdir is the run's temporary directory
+
+def run_balances(wallets, server, workdir):
+    try:
+        main.show_all_balances(wallets)
+    except Exception:
+        return 1
+    return 0
+
+
+def run_details(wallets, server, workdir):
+    errors = 0
+    for index, wallet in wallets.items():
+        try:
+            main.show_wallet_details(wallet, index)
+        except Exception:
+            errors += 1
+    return errors
+
+
+def run_sends(wallets, server, workdir):
+    """Send one transfer per wallet, alternating native and token transfers."""
+    journal_file = os.path.join(workdir, 'journal', 'interactive.jsonl')
+    errors = 0
+    for index, wallet in wallets.items():
+        network = 'ethereum' if index % 2 else 'bsc'
+        token_type = ('ETH' if network == 'ethereum' else 'BNB') if index % 4 < 2 else 'USDT'
+        if not main.execute_transaction(wallet, network, token_type, RECIPIENT, 0.001, journal_file=journal_file):
+            errors += 1
+    return errors
+
+
+def run_receipts(wallets, server, workdir):
+    """Broadcast one transaction per wallet, then track all receipts to completion."""
+    web3 = main.get_web3_connection('ethereum')
+    tx_hashes = []
+    errors = 0
+    for index in wallets:
+        try:
+            tx_hashes.append(web3.eth.send_raw_transaction('0x' + format(index, '064x')))
+        except Exception:
+            errors += 1
+    for tx_hash in tx_hashes:
+        try:
+            web3.eth.wait_for_transaction_receipt(tx_hash, timeout=300, poll_latency=0.05)
+        except Exception:
+            errors += 1
+    return errors
+
+
+SCENARIO_RUNNERS = {
+    'balances': run_balances,
+    'details': run_details,
+    'sends': run_sends,
+    'receipts': run_receipts,
+}
+
+
+def run_scenario(name, wallets, server, workdir):
+    """Run one scenario and return its measurements."""
+    reset_counters(server)
+    original_input = builtins.input
+    builtins.input = lambda prompt='': 'yes'
+
+    tracemalloc.start()
+    started = time.perf_counter()
+    try:
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            errors = SCENARIO_RUNNERS[name](wallets, server, workdir)
+    finally:
+        wall_time = time.perf_counter() - started
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        builtins.input = original_input
+
+    counters = get_counters(server)
+    return {
+        'scenario': name,
+        'wallets': len(wallets),
+        'wall_s': round(wall_time, 4),
+        'errors': errors,
+        'rpc_calls': counters['rpc_calls'],
+        'http_requests': counters['http_requests'],
+        'peak_mem_kb': round(peak / 1024, 1),
+        'methods': counters['methods'],
+    }
+
+
+def compare_with_baseline(results, baseline, tolerance, min_slack=0.0):
+    """Return a list of regressions compared with a stored baseline.
+
+    Wall time must also grow by more than min_slack seconds, so scheduler noise
+    on runs of a few hundred milliseconds is not flagged.
+    """
+    indexed = {(r['scenario'], r['wallets']): r for r in baseline.get('results', [])}
+    regressions = []
+    for result in results:
+        base = indexed.get((result['scenario'], result['wallets']))
+        if base is None:
+            continue
+        if result['rpc_calls'] > base['rpc_calls']:
+            regressions.append(f"{result['scenario']}@{result['wallets']}: rpc_calls "
+                               f"{base['rpc_calls']} -> {result['rpc_calls']}")
+        for metric, slack in (('wall_s', min_slack), ('peak_mem_kb', 0.0)):
+            if base[metric] and result[metric] > max(base[metric] * (1 + tolerance), base[metric] + slack):
+                regressions.append(f"{result['scenario']}@{result['wallets']}: {metric} "
+                                   f"{base[metric]} -> {result[metric]}")
+    return regressions
+
+
+def print_table(results):
+    """Print benchmark results as a table."""
+    print(f"\n{'Scenario':<10} {'Wallets':>8} {'Wall (s)':>10} {'Errors':>7} {'RPC calls':>10} {'HTTP reqs':>10} "
+          f"{'Peak (KB)':>11}")
+    print("-" * 72)
+    for r in results:
+        print(f"{r['scenario']:<10} {r['wallets']:>8} {r['wall_s']:>10.3f} {r['errors']:>7} {r['rpc_calls']:>10} "
+              f"{r['http_requests']:>10} {r['peak_mem_kb']:>11.1f}")
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description="Offline wallet manager benchmarks")
+    parser.add_argument('--counts', default=','.join(str(c) for c in DEFAULT_COUNTS),
+                        help="Comma-separated wallet counts (e.g. 10,100,1000,10000,100000)")
+    parser.add_argument('--scenarios', default=','.join(SCENARIOS),
+                        help=f"Comma-separated scenarios from: {', '.join(SCENARIOS)}")
+    parser.add_argument('--latency', type=float, default=0.0, help="Mock RPC latency in seconds")
+    parser.add_argument('--jitter', type=float, default=0.0, help="Mock RPC jitter in seconds")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="Fraction of mock RPC calls that fail")
+    parser.add_argument('--no-batch', action='store_true', help="Disable JSON-RPC batch support on the mock")
+    parser.add_argument('--receipt-delay', type=float, default=0.0, help="Seconds before a receipt is available")
+    parser.add_argument('--baseline', default=BASELINE_FILE, help="Baseline file to compare against")
+    parser.add_argument('--save-baseline', action='store_true', help="Store these results as the new baseline")
+    parser.add_argument('--tolerance', type=float, default=0.25, help="Allowed slowdown before flagging a regression")
+    parser.add_argument('--min-slack', type=float, default=0.5,
+                        help="Seconds of wall time a scenario may always gain, however short (default: 0.5)")
+    parser.add_argument('--json', dest='json_output', help="Also write results to this JSON file")
+    args = parser.parse_args()
+
+    counts = [int(c) for c in args.counts.split(',') if c.strip()]
+    scenarios = [s.strip() for s in args.scenarios.split(',') if s.strip()]
+    unknown = [s for s in scenarios if s not in SCENARIO_RUNNERS]
+    if unknown:
+        print(f"❌ Unknown scenarios: {', '.join(unknown)}")
+        return 2
+
+    with tempfile.TemporaryDirectory(prefix='wallet-bench-') as workdir:
+        return run_benchmarks(args, counts, scenarios, workdir)
+
+
+def run_benchmarks(args, counts, scenarios, workdir):
+    """Run every scenario for every count with its state in workdir; returns the exit code."""
+    # Keep benchmark state and journals out of the real state store and journal directory
+    get_state_db(os.path.join(workdir, 'state.db'))
+    # A fresh RPC cache per run, so the mock's heads and results never reach the real rpc_cache/
+    rpc_cache.use_shared_cache(os.path.join(workdir, 'rpc_cache'))
+
+    server = start_mock_rpc(latency=args.latency, jitter=args.jitter, error_rate=args.error_rate,
+                            batch=not args.no_batch, receipt_delay=args.receipt_delay)
+    # Every endpoint of every chain is the mock, so failover and hedged reads stay on it too
+    for network in list(rpc.RPC_URLS):
+        rpc.RPC_URLS[network] = server.url
+        CHAINS[network]['rpc'] = [server.url]
+
+    print(f"🧪 Mock JSON-RPC on {server.url} (latency={args.latency}s, jitter={args.jitter}s, "
+          f"error_rate={args.error_rate}, batch={not args.no_batch})")
+
+    results = []
+    for count in counts:
+        wallets = make_wallets(count)
+        for scenario in scenarios:
+            result = run_scenario(scenario, wallets, server, workdir)
+            print(f"  ✅ {scenario} x {count}: {result['wall_s']:.3f}s, {result['rpc_calls']} calls, "
+                  f"{result['errors']} error(s)")
+            results.append(result)
+
+    server.shutdown()
+    rpc_cache.close_shared_cache()
+    print_table(results)
+
+    report = {
+        'created': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+        'python': sys.version.split()[0],
+        'settings': {
+            'latency': args.latency,
+            'jitter': args.jitter,
+            'error_rate': args.error_rate,
+            'batch': not args.no_batch,
+            'receipt_delay': args.receipt_delay,
+        },
+        'results': results,
+    }
+
+    if args.json_output:
+        with open(args.json_output, 'w') as f:
+            json.dump(report, f, indent=2)
+
+    if args.save_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"\n💾 Baseline saved to {args.baseline}")
+        return 0
+
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare_with_baseline(results, baseline, args.tolerance, args.min_slack)
+        if regressions:
+            print("\n❌ Regressions against baseline:")
+            for line in regressions:
+                print(f"  - {line}")
+            return 1
+        print("\n✅ No regressions against baseline")
+    else:
+        print(f"\nℹ️  No baseline at {args.baseline}; run with --save-baseline to create one")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main_cli())
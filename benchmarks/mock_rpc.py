@@ -0,0 +1,523 @@
+#!/usr/bin/env python3
+"""
+Local JSON-RPC stand-in for offline benchmarks.
+Answers the subset of eth_* methods used by the wallet manager with
+deterministic data, and can inject latency, jitter and errors. Serves
+HTTP, or WebSocket with eth_subscribe("newHeads") push notifications.
+"""
+
+import os
+import sys
+import json
+import random
+import hashlib
+import threading
+import time
+import socketserver
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from eth_hash.auto import keccak
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from persistent import (  # noqa: E402
+    websocket_accept, encode_frame, read_frame, OPCODE_TEXT, OPCODE_CLOSE, OPCODE_PING, OPCODE_PONG,
+)
+
+
+# Function selectors understood by the eth_call handler
+SELECTOR_BALANCE_OF = '0x70a08231'
+SELECTOR_DECIMALS = '0x313ce567'
+SELECTOR_TRANSFER = '0xa9059cbb'
+
+ZERO_HASH = '0x' + '00' * 32
+EMPTY_BLOOM = '0x' + '00' * 256
+
+
+def _to_hex(value):
+    """Encode an integer as a JSON-RPC quantity."""
+    return hex(value)
+
+
+def _word(value):
+    """Encode an integer as a 32-byte ABI word."""
+    return '0x' + format(value, '064x')
+
+
+def _seed_int(*parts):
+    """Derive a deterministic integer from the given parts."""
+    digest = hashlib.sha256('|'.join(str(p).lower() for p in parts).encode('utf-8')).digest()
+    return int.from_bytes(digest[:8], 'big')
+
+
+class MockRPCHandler(BaseHTTPRequestHandler):
+    """HTTP handler that serves single and batched JSON-RPC requests."""
+
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        # Keep benchmark output clean
+        pass
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length', 0))
+        body = self.rfile.read(length)
+        state = self.server.state
+
+        delay = state['latency'] + random.uniform(-state['jitter'], state['jitter'])
+        if delay > 0:
+            time.sleep(delay)
+
+        try:
+            payload = json.loads(body)
+        except ValueError:
+            self._send(400, {'jsonrpc': '2.0', 'id': None,
+                             'error': {'code': -32700, 'message': 'Parse error'}})
+            return
+
+        with state['lock']:
+            state['http_requests'] += 1
+
+        if isinstance(payload, list):
+            if not state['batch']:
+                self._send(200, {'jsonrpc': '2.0', 'id': None,
+                                 'error': {'code': -32600, 'message': 'Batch requests not supported'}})
+                return
+            response = [handle_rpc(state, request) for request in payload]
+        else:
+            response = handle_rpc(state, payload)
+
+        self._send(200, response)
+
+    def _send(self, status, response):
+        data = json.dumps(response).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+class MockWebSocketHandler(socketserver.StreamRequestHandler):
+    """WebSocket handler: JSON-RPC messages answered concurrently, plus newHeads subscriptions."""
+
+    def handle(self):
+        state = self.server.state
+        request_line = self.rfile.readline()
+        headers = {}
+        while True:
+            line = self.rfile.readline().decode('latin-1').strip()
+            if not line:
+                break
+            name, _, value = line.partition(':')
+            headers[name.strip().lower()] = value.strip()
+        if not request_line.startswith(b'GET') or 'sec-websocket-key' not in headers:
+            self.wfile.write(b'HTTP/1.1 400 Bad Request\r\nContent-Length: 0\r\n\r\n')
+            return
+        self.wfile.write((
+            "HTTP/1.1 101 Switching Protocols\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n"
+            f"Sec-WebSocket-Accept: {websocket_accept(headers['sec-websocket-key'])}\r\n\r\n"
+        ).encode('ascii'))
+
+        self.send_lock = threading.Lock()
+        self.subscriptions = set()
+        self.open = True
+        self.frozen = False
+        with state['lock']:
+            state['connections'].add(self)
+        threading.Thread(target=self._push_heads, daemon=True).start()
+        try:
+            while True:
+                fin, opcode, payload = read_frame(self.rfile)
+                if opcode == OPCODE_CLOSE:
+                    break
+                if self.frozen:
+                    # A half-open connection: nothing is answered or closed
+                    continue
+                if opcode == OPCODE_PING:
+                    self._send_frame(payload, OPCODE_PONG)
+                elif opcode == OPCODE_TEXT:
+                    threading.Thread(target=self._answer, args=(payload,), daemon=True).start()
+        except (ConnectionError, OSError):
+            pass
+        finally:
+            self.open = False
+            with state['lock']:
+                state['connections'].discard(self)
+
+    def _send_frame(self, payload, opcode=OPCODE_TEXT):
+        with self.send_lock:
+            self.wfile.write(encode_frame(payload, opcode, mask=False))
+
+    def _answer(self, body):
+        state = self.server.state
+        delay = state['latency'] + random.uniform(-state['jitter'], state['jitter'])
+        if delay > 0:
+            time.sleep(delay)
+        try:
+            payload = json.loads(body)
+        except ValueError:
+            response = {'jsonrpc': '2.0', 'id': None, 'error': {'code': -32700, 'message': 'Parse error'}}
+        else:
+            with state['lock']:
+                state['http_requests'] += 1
+            if isinstance(payload, list):
+                response = [self._dispatch(request) for request in payload]
+            else:
+                response = self._dispatch(payload)
+        try:
+            self._send_frame(json.dumps(response).encode('utf-8'))
+        except OSError:
+            pass
+
+    def _dispatch(self, request):
+        method = request.get('method')
+        params = request.get('params') or []
+        if method == 'eth_subscribe':
+            if params[:1] != ['newHeads']:
+                return {'jsonrpc': '2.0', 'id': request.get('id'),
+                        'error': {'code': -32602, 'message': 'mock: only newHeads is supported'}}
+            subscription_id = _to_hex(random.getrandbits(64))
+            self.subscriptions.add(subscription_id)
+            return {'jsonrpc': '2.0', 'id': request.get('id'), 'result': subscription_id}
+        if method == 'eth_unsubscribe':
+            found = params[:1] and params[0] in self.subscriptions
+            self.subscriptions.discard(params[0] if params else None)
+            return {'jsonrpc': '2.0', 'id': request.get('id'), 'result': bool(found)}
+        return handle_rpc(self.server.state, request)
+
+    def _push_heads(self):
+        state = self.server.state
+        head = _current_block(state)
+        while self.open:
+            time.sleep(min(0.05, state['block_time'] / 4))
+            current = _current_block(state)
+            if current <= head:
+                continue
+            head = current
+            header = _block(state, head)
+            header.pop('transactions')
+            for subscription_id in list(self.subscriptions if not self.frozen else ()):
+                message = {'jsonrpc': '2.0', 'method': 'eth_subscription',
+                           'params': {'subscription': subscription_id, 'result': header}}
+                try:
+                    self._send_frame(json.dumps(message).encode('utf-8'))
+                except OSError:
+                    return
+
+
+def handle_rpc(state, request):
+    """Dispatch a single JSON-RPC request against the mock chain state."""
+    method = request.get('method')
+    params = request.get('params') or []
+    response = {'jsonrpc': '2.0', 'id': request.get('id')}
+
+    with state['lock']:
+        state['rpc_calls'] += 1
+        state['methods'][method] = state['methods'].get(method, 0) + 1
+
+    if state['error_rate'] and random.random() < state['error_rate']:
+        response['error'] = {'code': -32000, 'message': 'mock: injected error'}
+        return response
+
+    handler = RPC_METHODS.get(method)
+    if handler is None:
+        response['error'] = {'code': -32601, 'message': f'mock: method {method} not found'}
+        return response
+
+    try:
+        response['result'] = handler(state, params)
+    except (ValueError, IndexError, KeyError) as e:
+        response['error'] = {'code': -32602, 'message': f'mock: invalid params: {e}'}
+    return response
+
+
+def _current_block(state):
+    """Return the current head block number, advancing with wall time."""
+    elapsed = time.time() - state['started']
+    return state['start_block'] + int(elapsed / state['block_time'])
+
+
+def _block(state, number):
+    """Build a block object for the given height."""
+    return {
+        'number': _to_hex(number),
+        'hash': _word(_seed_int('block', number)),
+        'parentHash': _word(_seed_int('block', number - 1)),
+        'timestamp': _to_hex(state['genesis_time'] + number * 12),
+        'miner': '0x' + '00' * 20,
+        'gasLimit': _to_hex(30000000),
+        'gasUsed': _to_hex(15000000),
+        'baseFeePerGas': _to_hex(state['gas_price'] // 2),
+        'difficulty': '0x0',
+        'totalDifficulty': '0x0',
+        'extraData': '0x',
+        'logsBloom': EMPTY_BLOOM,
+        'nonce': '0x0000000000000000',
+        'sha3Uncles': ZERO_HASH,
+        'size': _to_hex(1000),
+        'stateRoot': ZERO_HASH,
+        'receiptsRoot': ZERO_HASH,
+        'transactionsRoot': ZERO_HASH,
+        'mixHash': ZERO_HASH,
+        'transactions': [],
+        'uncles': [],
+    }
+
+
+def _resolve_block(state, tag):
+    """Resolve a block tag or hex quantity to a block number."""
+    if tag in (None, 'latest', 'pending', 'safe', 'finalized'):
+        return _current_block(state)
+    if tag == 'earliest':
+        return 0
+    return int(tag, 16)
+
+
+def rpc_chain_id(state, params):
+    return _to_hex(state['chain_id'])
+
+
+def rpc_block_number(state, params):
+    return _to_hex(_current_block(state))
+
+
+def rpc_gas_price(state, params):
+    return _to_hex(state['gas_price'])
+
+
+def rpc_max_priority_fee(state, params):
+    return _to_hex(state['gas_price'] // 10)
+
+
+def rpc_get_balance(state, params):
+    address = params[0]
+    return _to_hex(_seed_int('native', address) % (10 ** 20))
+
+
+def rpc_get_transaction_count(state, params):
+    return _to_hex(state['nonces'].get(params[0].lower(), 0))
+
+
+def rpc_get_code(state, params):
+    return '0x'
+
+
+def rpc_call(state, params):
+    call = params[0]
+    data = call.get('data') or call.get('input') or '0x'
+    selector = data[:10]
+    if selector == SELECTOR_BALANCE_OF:
+        owner = '0x' + data[-40:]
+        # Wide enough that 18-decimal tokens (BSC USDT) also hold whole units
+        return _word(_seed_int('token', call.get('to'), owner) % (10 ** 24))
+    if selector == SELECTOR_DECIMALS:
+        return _word(state['token_decimals'])
+    if selector == SELECTOR_TRANSFER:
+        return _word(1)
+    raise ValueError(f'unknown selector {selector}')
+
+
+def rpc_estimate_gas(state, params):
+    call = params[0]
+    data = call.get('data') or call.get('input') or '0x'
+    return _to_hex(21000 if data in ('0x', '') else 52000)
+
+
+def rpc_send_raw_transaction(state, params):
+    raw = params[0]
+    # The signed transaction's hash, as a node computes it, so clients can wait on the hash they signed
+    tx_hash = '0x' + keccak(bytes.fromhex(raw[2:] if raw.startswith('0x') else raw)).hex()
+    with state['lock']:
+        state['transactions'][tx_hash] = {
+            'sent_at': time.time(),
+            'block': _current_block(state),
+        }
+    return tx_hash
+
+
+def rpc_get_transaction_receipt(state, params):
+    tx_hash = params[0]
+    tx = state['transactions'].get(tx_hash)
+    if tx is None or time.time() - tx['sent_at'] < state['receipt_delay']:
+        return None
+    block = tx['block'] + 1
+    return {
+        'transactionHash': tx_hash,
+        'transactionIndex': '0x0',
+        'blockHash': _word(_seed_int('block', block)),
+        'blockNumber': _to_hex(block),
+        'from': '0x' + '11' * 20,
+        'to': '0x' + '22' * 20,
+        'cumulativeGasUsed': _to_hex(21000),
+        'gasUsed': _to_hex(21000),
+        'effectiveGasPrice': _to_hex(state['gas_price']),
+        'contractAddress': None,
+        'logs': [],
+        'logsBloom': EMPTY_BLOOM,
+        'status': '0x1',
+        'type': '0x0',
+    }
+
+
+def rpc_get_block_by_number(state, params):
+    return _block(state, _resolve_block(state, params[0]))
+
+
+def rpc_get_logs(state, params):
+    return []
+
+
+def rpc_fee_history(state, params):
+    count = int(params[0], 16) if isinstance(params[0], str) else int(params[0])
+    newest = _resolve_block(state, params[1])
+    return {
+        'oldestBlock': _to_hex(max(0, newest - count + 1)),
+        'baseFeePerGas': [_to_hex(state['gas_price'] // 2)] * (count + 1),
+        'gasUsedRatio': [0.5] * count,
+        'reward': [[_to_hex(state['gas_price'] // 10)] * len(params[2] if len(params) > 2 else [])] * count,
+    }
+
+
+def rpc_net_version(state, params):
+    return str(state['chain_id'])
+
+
+RPC_METHODS = {
+    'eth_chainId': rpc_chain_id,
+    'eth_blockNumber': rpc_block_number,
+    'eth_gasPrice': rpc_gas_price,
+    'eth_maxPriorityFeePerGas': rpc_max_priority_fee,
+    'eth_getBalance': rpc_get_balance,
+    'eth_getTransactionCount': rpc_get_transaction_count,
+    'eth_getCode': rpc_get_code,
+    'eth_call': rpc_call,
+    'eth_estimateGas': rpc_estimate_gas,
+    'eth_sendRawTransaction': rpc_send_raw_transaction,
+    'eth_getTransactionReceipt': rpc_get_transaction_receipt,
+    'eth_getBlockByNumber': rpc_get_block_by_number,
+    'eth_getLogs': rpc_get_logs,
+    'eth_feeHistory': rpc_fee_history,
+    'net_version': rpc_net_version,
+}
+
+
+def _new_state(latency, jitter, error_rate, batch, chain_id, token_decimals, receipt_delay, block_time):
+    """Build the shared mock chain state."""
+    return {
+        'latency': latency,
+        'jitter': min(jitter, latency) if latency else jitter,
+        'error_rate': error_rate,
+        'batch': batch,
+        'chain_id': chain_id,
+        'token_decimals': token_decimals,
+        'receipt_delay': receipt_delay,
+        'gas_price': 5 * 10 ** 9,
+        'block_time': block_time,
+        'start_block': 20000000,
+        'genesis_time': 1438269973,
+        'started': time.time(),
+        'nonces': {},
+        'transactions': {},
+        'lock': threading.Lock(),
+        'connections': set(),
+        'http_requests': 0,
+        'rpc_calls': 0,
+        'methods': {},
+    }
+
+
+def start_mock_rpc(latency=0.0, jitter=0.0, error_rate=0.0, batch=True,
+                   chain_id=1, token_decimals=6, receipt_delay=0.0, block_time=12.0,
+                   host='127.0.0.1', port=0):
+    """Start a mock JSON-RPC server in a background thread and return it."""
+    server = ThreadingHTTPServer((host, port), MockRPCHandler)
+    server.daemon_threads = True
+    server.state = _new_state(latency, jitter, error_rate, batch, chain_id, token_decimals,
+                              receipt_delay, block_time)
+    server.url = f'http://{host}:{server.server_address[1]}'
+
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server
+
+
+def start_mock_ws_rpc(latency=0.0, jitter=0.0, error_rate=0.0,
+                      chain_id=1, token_decimals=6, receipt_delay=0.0, block_time=12.0,
+                      host='127.0.0.1', port=0):
+    """Start a mock WebSocket JSON-RPC server in a background thread and return it."""
+    server = socketserver.ThreadingTCPServer((host, port), MockWebSocketHandler)
+    server.daemon_threads = True
+    server.state = _new_state(latency, jitter, error_rate, True, chain_id, token_decimals,
+                              receipt_delay, block_time)
+    server.url = f'ws://{host}:{server.server_address[1]}'
+
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server
+
+
+def drop_connections(server):
+    """Close every open WebSocket connection, to exercise client reconnects."""
+    with server.state['lock']:
+        connections = list(server.state['connections'])
+    for handler in connections:
+        handler.open = False
+        try:
+            handler.connection.shutdown(2)
+        except OSError:
+            pass
+
+
+def freeze_connections(server):
+    """Stop answering on every open WebSocket connection without closing it, like a half-open socket."""
+    with server.state['lock']:
+        connections = list(server.state['connections'])
+    for handler in connections:
+        handler.frozen = True
+
+
+def reset_counters(server):
+    """Reset request counters between benchmark runs."""
+    state = server.state
+    with state['lock']:
+        state['http_requests'] = 0
+        state['rpc_calls'] = 0
+        state['methods'] = {}
+
+
+def get_counters(server):
+    """Return a snapshot of request counters."""
+    state = server.state
+    with state['lock']:
+        return {
+            'http_requests': state['http_requests'],
+            'rpc_calls': state['rpc_calls'],
+            'methods': dict(state['methods']),
+        }
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Run a local mock JSON-RPC server")
+    parser.add_argument('--port', type=int, default=8545)
+    parser.add_argument('--latency', type=float, default=0.0, help="Base latency in seconds")
+    parser.add_argument('--jitter', type=float, default=0.0, help="Latency jitter in seconds")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="Fraction of calls that fail")
+    parser.add_argument('--no-batch', action='store_true', help="Reject batched requests")
+    parser.add_argument('--block-time', type=float, default=12.0, help="Seconds between mock blocks")
+    parser.add_argument('--ws', action='store_true', help="Serve WebSocket (with eth_subscribe) instead of HTTP")
+    args = parser.parse_args()
+
+    if args.ws:
+        server = start_mock_ws_rpc(latency=args.latency, jitter=args.jitter, error_rate=args.error_rate,
+                                   block_time=args.block_time, port=args.port)
+    else:
+        server = start_mock_rpc(latency=args.latency, jitter=args.jitter, error_rate=args.error_rate,
+                                batch=not args.no_batch, block_time=args.block_time, port=args.port)
+    print(f"🧪 Mock JSON-RPC listening on {server.url}")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        print("\n👋 Goodbye!")
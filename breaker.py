@@ -0,0 +1,230 @@
+#!/usr/bin/env python3
+"""
+Per-endpoint circuit breakers for the EVM Wallet Manager.
+An endpoint that keeps failing or answering too slowly is cut off for a
+while: calls to it fail at once (or are rerouted to the network's next
+endpoint) instead of each waiting out a timeout. After a cool-down a few
+probe calls are let through, and the circuit closes again if they succeed.
+"""
+
+import time
+import threading
+from collections import deque
+from config import (
+    BREAKER_WINDOW, BREAKER_MIN_CALLS, BREAKER_FAILURE_RATIO, BREAKER_CONSECUTIVE_FAILURES,
+    BREAKER_SLOW_SECONDS, BREAKER_OPEN_SECONDS, BREAKER_MAX_OPEN_SECONDS, BREAKER_HALF_OPEN_PROBES,
+)
+
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half-open'
+
+_breakers = {}
+_breakers_lock = threading.Lock()
+
+
+class CircuitOpenError(ConnectionError):
+    """Raised instead of calling an endpoint whose circuit is open."""
+
+    def __init__(self, network, endpoint, retry_in):
+        super().__init__(f"{network} RPC endpoint {endpoint} is unavailable "
+                         f"(circuit open, next try in {retry_in:.0f}s)")
+        self.network = network
+        self.endpoint = endpoint
+        self.retry_in = retry_in
+
+
+def new_breaker():
+    """Return the state of one endpoint's circuit breaker."""
+    return {
+        'lock': threading.Lock(),
+        'state': CLOSED,
+        'outcomes': deque(),  # (time, failed) for calls within BREAKER_WINDOW
+        'failures': 0,  # failed calls within the window
+        'consecutive': 0,
+        'open_seconds': BREAKER_OPEN_SECONDS,
+        'retry_at': 0.0,
+        'probes': 0,
+        'trips': 0,
+        'rejected': 0,
+        'last_error': None,
+    }
+
+
+def get_breaker(network, endpoint):
+    """Return the shared breaker for a network's endpoint."""
+    with _breakers_lock:
+        breaker = _breakers.get((network, endpoint))
+        if breaker is None:
+            breaker = _breakers[(network, endpoint)] = new_breaker()
+        return breaker
+
+
+def _trip(breaker, now):
+    """Open the circuit (breaker lock held); each failed probe doubles the cool-down."""
+    if breaker['state'] == HALF_OPEN:
+        breaker['open_seconds'] = min(breaker['open_seconds'] * 2, BREAKER_MAX_OPEN_SECONDS)
+    breaker['state'] = OPEN
+    breaker['retry_at'] = now + breaker['open_seconds']
+    breaker['probes'] = 0
+    breaker['trips'] += 1
+
+
+def _close(breaker):
+    breaker['state'] = CLOSED
+    breaker['outcomes'].clear()
+    breaker['failures'] = 0
+    breaker['consecutive'] = 0
+    breaker['open_seconds'] = BREAKER_OPEN_SECONDS
+    breaker['probes'] = 0
+
+
+def allow_call(breaker):
+    """Return (True, 0) if a call may go to the endpoint, else (False, seconds until the next try)."""
+    now = time.monotonic()
+    with breaker['lock']:
+        if breaker['state'] == OPEN:
+            if now < breaker['retry_at']:
+                breaker['rejected'] += 1
+                return False, breaker['retry_at'] - now
+            breaker['state'] = HALF_OPEN
+        if breaker['state'] == HALF_OPEN:
+            if breaker['probes'] >= BREAKER_HALF_OPEN_PROBES:
+                breaker['rejected'] += 1
+                return False, 0.0
+            breaker['probes'] += 1
+        return True, 0.0
+
+
+def record_outcome(breaker, failed, latency, error=None):
+    """Record one call's outcome; a call slower than BREAKER_SLOW_SECONDS counts as failed."""
+    failed = failed or latency > BREAKER_SLOW_SECONDS
+    now = time.monotonic()
+    with breaker['lock']:
+        if failed:
+            breaker['last_error'] = error or f"slow response ({latency:.1f}s)"
+        if breaker['state'] == HALF_OPEN:
+            breaker['probes'] -= 1
+            if failed:
+                _trip(breaker, now)
+            else:
+                _close(breaker)
+            return
+        if breaker['state'] == OPEN:
+            # A call that started before the circuit opened
+            return
+
+        outcomes = breaker['outcomes']
+        outcomes.append((now, failed))
+        breaker['failures'] += failed
+        while outcomes and outcomes[0][0] < now - BREAKER_WINDOW:
+            breaker['failures'] -= outcomes.popleft()[1]
+        breaker['consecutive'] = breaker['consecutive'] + 1 if failed else 0
+
+        if breaker['consecutive'] >= BREAKER_CONSECUTIVE_FAILURES or \
+                (len(outcomes) >= BREAKER_MIN_CALLS and breaker['failures'] >= BREAKER_FAILURE_RATIO * len(outcomes)):
+            _trip(breaker, now)
+
+
+def get_breaker_states():
+    """Return {(network, endpoint): {'state', 'retry_in', 'trips', 'rejected', 'last_error'}}."""
+    with _breakers_lock:
+        breakers = dict(_breakers)
+    now = time.monotonic()
+    states = {}
+    for key, breaker in breakers.items():
+        with breaker['lock']:
+            states[key] = {
+                'state': breaker['state'],
+                'retry_in': max(0.0, breaker['retry_at'] - now) if breaker['state'] == OPEN else 0.0,
+                'trips': breaker['trips'],
+                'rejected': breaker['rejected'],
+                'last_error': breaker['last_error'],
+            }
+    return states
+
+
+def print_open_circuits():
+    """Print a warning for every endpoint that is currently cut off."""
+    for (network, endpoint), state in sorted(get_breaker_states().items()):
+        if state['state'] != CLOSED:
+            print(f"⚠️  {network}: RPC endpoint {endpoint} is {state['state']} "
+                  f"({state['last_error']}); its data is shown as n/a")
+
+
+def print_breaker_summary():
+    """Print how often each endpoint's circuit opened and how many calls it turned away."""
+    for (network, endpoint), state in sorted(get_breaker_states().items()):
+        if state['trips']:
+            print(f"🔌 {network}: {endpoint} circuit opened {state['trips']} time(s), "
+                  f"{state['rejected']} call(s) failed fast, now {state['state']}")
+
+
+def breaker_provider(provider, network, endpoint):
+    """Wrap a provider so calls fail fast with CircuitOpenError while its endpoint's circuit is open.
+
+    Only transport failures (exceptions) and slow answers count against the
+    endpoint; a JSON-RPC error such as a revert is a healthy response.
+    """
+    breaker = get_breaker(network, endpoint)
+
+    def guarded(call, batch, *args):
+        allowed, retry_in = allow_call(breaker)
+        if not allowed:
+            raise CircuitOpenError(network, endpoint, retry_in)
+        started = time.perf_counter()
+        try:
+            response = call(*args)
+        except Exception as e:
+            record_outcome(breaker, True, time.perf_counter() - started, str(e) or type(e).__name__)
+            raise
+        failed = batch and not isinstance(response, list)
+        record_outcome(breaker, failed, time.perf_counter() - started, "batch rejected" if failed else None)
+        return response
+
+    make_request = provider.make_request
+    provider.make_request = lambda method, params: guarded(make_request, False, method, params)
+
+    make_batch_request = getattr(provider, 'make_batch_request', None)
+    if make_batch_request is not None:
+        provider.make_batch_request = lambda requests: guarded(make_batch_request, True, requests)
+    return provider
+
+
+def failover_provider(provider, backups):
+    """Wrap a provider so a call whose circuit is open goes to the next backup instead.
+
+    backups are functions returning a provider for each further endpoint;
+    they are only called the first time a call is rerouted to them.
+    """
+    built = [None] * len(backups)
+    lock = threading.Lock()
+
+    def backup(index):
+        with lock:
+            if built[index] is None:
+                built[index] = backups[index]()
+            return built[index]
+
+    def rerouted(name, *args):
+        try:
+            return primary[name](*args)
+        except CircuitOpenError as e:
+            error = e
+        # Nothing was sent to the tripped endpoint, so even a send can safely go elsewhere
+        for index in range(len(backups)):
+            try:
+                return getattr(backup(index), name)(*args)
+            except CircuitOpenError as e:
+                error = e
+        raise error
+
+    primary = {'make_request': provider.make_request}
+    provider.make_request = lambda method, params: rerouted('make_request', method, params)
+
+    make_batch_request = getattr(provider, 'make_batch_request', None)
+    if make_batch_request is not None:
+        primary['make_batch_request'] = make_batch_request
+        provider.make_batch_request = lambda requests: rerouted('make_batch_request', requests)
+    return provider
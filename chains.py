@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+Chain and token registry for the EVM Wallet Manager.
+Networks, RPC endpoints and tokens are loaded from a JSON file so that
+adding a chain is a configuration change, not a code change.
+"""
+
+import json
+from web3 import Web3
+from config import CHAIN_REGISTRY_FILE, DEFAULT_GAS_LIMIT_ERC20, DEFAULT_GAS_LIMIT_NATIVE
+
+
+# ERC-20 ABI (minimal for balance and transfer)
+ERC20_ABI = [
+    {
+        "constant": True,
+        "inputs": [{"name": "_owner", "type": "address"}],
+        "name": "balanceOf",
+        "outputs": [{"name": "balance", "type": "uint256"}],
+        "type": "function"
+    },
+    {
+        "constant": True,
+        "inputs": [],
+        "name": "decimals",
+        "outputs": [{"name": "", "type": "uint8"}],
+        "type": "function"
+    },
+    {
+        "constant": False,
+        "inputs": [
+            {"name": "_to", "type": "address"},
+            {"name": "_value", "type": "uint256"}
+        ],
+        "name": "transfer",
+        "outputs": [{"name": "", "type": "bool"}],
+        "type": "function"
+    }
+]
+
+NATIVE_DECIMALS = 18
+
+SELECTOR_TRANSFER = '0xa9059cbb'
+
+# keccak("Transfer(address,address,uint256)")
+TRANSFER_TOPIC = '0xddf252ad1be2c89b69c2b068fc378daa952ba7f163c4a11628f55a4df523b3ef'
+
+TOPIC_ADDRESSES_PER_FILTER = 500  # addresses per eth_getLogs topic filter
+
+
+def address_topic(address):
+    """Return an address left-padded to a 32-byte log topic."""
+    return '0x' + address[2:].lower().rjust(64, '0')
+
+
+def encode_transfer(recipient, amount_raw):
+    """ABI-encode an ERC-20 transfer(address,uint256) call."""
+    return SELECTOR_TRANSFER + recipient[2:].lower().rjust(64, '0') + format(amount_raw, '064x')
+
+
+def load_chain_registry(filename=CHAIN_REGISTRY_FILE):
+    """Load and validate the chain registry from a JSON file."""
+    with open(filename) as f:
+        data = json.load(f)
+
+    chains = {}
+    for network, chain in data.get('chains', {}).items():
+        network = network.lower()
+        for field in ('chain_id', 'native', 'rpc'):
+            if field not in chain:
+                raise ValueError(f"Chain {network} is missing '{field}' in {filename}")
+        rpc = chain['rpc'] if isinstance(chain['rpc'], list) else [chain['rpc']]
+        if not rpc:
+            raise ValueError(f"Chain {network} has no RPC URLs in {filename}")
+
+        tokens = {}
+        for symbol, token in chain.get('tokens', {}).items():
+            tokens[symbol.upper()] = {
+                'address': Web3.to_checksum_address(token['address']),
+                'decimals': token.get('decimals'),
+            }
+
+        chains[network] = {
+            'network': network,
+            'name': chain.get('name', network.capitalize()),
+            'chain_id': int(chain['chain_id']),
+            'native': chain['native'].upper(),
+            'native_decimals': int(chain.get('native_decimals', NATIVE_DECIMALS)),
+            'standard': chain.get('standard', 'ERC20'),
+            'rpc': rpc,
+            'tokens': tokens,
+        }
+    return chains
+
+
+CHAINS = load_chain_registry()
+
+
+def get_chain(network):
+    """Return the registry entry for a network, or None if it is not configured."""
+    return CHAINS.get(network.lower())
+
+
+def get_token(network, symbol):
+    """Return the token entry for a symbol on a network, or None."""
+    chain = get_chain(network)
+    if chain is None:
+        return None
+    return chain['tokens'].get(symbol.upper())
+
+
+def build_transfer(chain, token_type, recipient, amount_raw, nonce, gas_price):
+    """Build an unsigned legacy transfer transaction for a native or token transfer."""
+    if token_type.upper() == chain['native']:
+        # Native token transfer
+        return {
+            'to': recipient,
+            'value': amount_raw,
+            'gas': DEFAULT_GAS_LIMIT_NATIVE,
+            'gasPrice': gas_price,
+            'nonce': nonce,
+            'chainId': chain['chain_id']
+        }
+    
+    # ERC-20/BEP-20 token transfer
+    token = get_token(chain['network'], token_type)
+    return {
+        'to': token['address'],
+        'value': 0,
+        'gas': DEFAULT_GAS_LIMIT_ERC20,
+        'gasPrice': gas_price,
+        'nonce': nonce,
+        'data': encode_transfer(recipient, amount_raw),
+        'chainId': chain['chain_id']
+    }
+
+
+def list_assets(network):
+    """Return (symbol, decimals, token_address) for the native asset and every token of a network."""
+    chain = CHAINS[network]
+    assets = [(chain['native'], chain['native_decimals'], None)]
+    for symbol, token in chain['tokens'].items():
+        assets.append((symbol, token['decimals'], token['address']))
+    return assets
+
+
+# Token contract addresses per network (derived from the registry)
+TOKEN_CONTRACTS = {
+    network: {symbol: token['address'] for symbol, token in chain['tokens'].items()}
+    for network, chain in CHAINS.items()
+}
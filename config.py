@@ -1,20 +1,135 @@
 # Configuration file for EVM Wallet Manager
-# Using reliable public RPC URLs
 
-# Ethereum RPC URLs (public endpoints)
-ETHEREUM_RPC = "https://ethereum.publicnode.com"  # PublicNode - reliable public RPC
+import os
 
-# BSC RPC URLs (public endpoints)  
-BSC_RPC = "https://bsc-dataseed.binance.org/"  # Binance official RPC
+# Keystore: a single encrypted file, or a sharded keystore directory (used when it exists)
+KEYSTORE_FILE = "env.dat"
+KEYSTORE_DIR = "env.dat.d"  # create with: python keystore.py shard
+KEYSTORE_SHARD_SIZE = 5000  # keys per shard
+KEYSTORE_WORKERS = None  # processes used to unlock shards (None = all cores)
 
-# Alternative RPC URLs (backup options)
-# ETHEREUM_RPC = "https://rpc.ankr.com/eth"  # Ankr public RPC
-# ETHEREUM_RPC = "https://eth.llamarpc.com"  # LlamaNodes
-# ETHEREUM_RPC = "https://eth.drpc.org"  # dRPC
-# BSC_RPC = "https://bsc-dataseed1.binance.org/"  # Binance backup
-# BSC_RPC = "https://bsc-dataseed2.binance.org/"  # Binance backup
-# BSC_RPC = "https://bsc.publicnode.com"  # PublicNode BSC
+# Chain and token registry (networks, RPC URLs, tokens)
+# Add a chain by adding an entry to this file; the first RPC URL is the primary
+CHAIN_REGISTRY_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "chains.json")
+
+# Balance scanning
+BALANCE_BATCH_SIZE = 100  # JSON-RPC calls per batch request
+RPC_CONCURRENCY_PER_CHAIN = 4  # Parallel batch requests per chain
+
+# Per-network endpoint override: an http(s):// URL, a ws(s):// URL or a node's IPC socket path.
+# WebSocket and IPC endpoints keep one multiplexed connection open and push new blocks
+# to the live dashboard, e.g. {"ethereum": "wss://...", "base": "/var/run/geth.ipc"}
+RPC_OVERRIDES = {}
+RPC_REQUEST_TIMEOUT = 30.0  # seconds to wait for a response on a WebSocket/IPC connection
+RPC_HTTP_TIMEOUT = 12.0  # seconds to wait for an HTTP response; just above BREAKER_SLOW_SECONDS
+RPC_RECONNECT_MAX_DELAY = 10.0  # longest backoff between WebSocket/IPC reconnect attempts
+RPC_KEEPALIVE_INTERVAL = 15.0  # ping a WebSocket/IPC connection after this many seconds without a message
+RPC_KEEPALIVE_TIMEOUT = 10.0  # ...and reconnect if nothing answers within this many seconds
+COALESCE_REQUESTS = True  # Identical read-only requests in flight at the same time share one call
+
+# RPC scheduling: each endpoint's request budget is shared by priority classes with weighted fair
+# queueing (send = broadcasts and the send path, interactive = menu actions, background = scans/watchers)
+RPC_ENDPOINT_CONCURRENCY = 16  # requests (a batch counts as one) in flight per endpoint
+RPC_RESERVED_SLOTS = 2  # slots background traffic never takes, kept free for send/interactive calls
+RPC_PRIORITY_WEIGHTS = {'send': 8, 'interactive': 4, 'background': 1}
+
+# Hedged reads (opt-in): a read not answered within the endpoint's observed p95 latency is also
+# sent to the network's next RPC URL in chains.json, and the first good answer is used
+HEDGED_READS = False
+HEDGE_DEFAULT_DELAY = 0.5  # seconds to wait before hedging until the endpoint has latency samples
+HEDGE_MIN_DELAY = 0.05  # never hedge sooner than this
+HEDGE_MAX_RATIO = 0.05  # at most this fraction of reads may be hedged...
+HEDGE_BURST = 10  # ...plus this many, so a cold start can still hedge
+
+# Circuit breakers: an endpoint that keeps failing or answering slowly is cut off for a while, so
+# calls fail at once (or go to the network's next RPC URL) instead of each waiting out a timeout
+BREAKER_ENABLED = True
+BREAKER_WINDOW = 30.0  # seconds of call outcomes the failure ratio is taken over
+BREAKER_MIN_CALLS = 10  # calls in the window before the failure ratio can open the circuit
+BREAKER_FAILURE_RATIO = 0.5  # open when this fraction of recent calls failed...
+BREAKER_CONSECUTIVE_FAILURES = 3  # ...or after this many failures in a row
+BREAKER_SLOW_SECONDS = 10.0  # a call slower than this counts as a failure
+BREAKER_OPEN_SECONDS = 15.0  # cool-down before probe calls are let through
+BREAKER_MAX_OPEN_SECONDS = 300.0  # the cool-down doubles after each failed probe, up to this
+BREAKER_HALF_OPEN_PROBES = 1  # probe calls allowed at once while half-open
+
+# Disk cache for immutable RPC responses (receipts, blocks, logs and reads at confirmed blocks)
+RPC_CACHE_ENABLED = True
+RPC_CACHE_DIR = "rpc_cache"
+RPC_CACHE_MAX_BYTES = 256 * 1024 * 1024  # least recently used entries are evicted past this size
+RPC_CACHE_CONFIRMATIONS = 64  # blocks below the highest head seen before data counts as final
+
+# Live dashboard (re-reads only wallets touched by new blocks)
+DASHBOARD_POLL_INTERVAL = 2.0  # seconds between head checks
+DASHBOARD_REDRAW_INTERVAL = 1.0  # redraw at most this often
+DASHBOARD_MAX_BLOCK_GAP = 50  # fall further behind than this and all balances are re-read
+DASHBOARD_FULL_REFRESH_BLOCKS = 300  # re-read everything this often (catches internal transfers)
+
+# Balance alerts: threshold and rate-of-change rules checked as balances change (see README)
+ALERT_RULES_FILE = "alerts.json"
+ALERT_WEBHOOK_URL = None  # e.g. "https://hooks.example.com/..." to also POST each notice as JSON
+ALERT_DEBOUNCE_SECONDS = 300  # an alert that re-fires this soon after its last notice stays quiet
+ALERT_REPEAT_SECONDS = 3600  # remind about a still-firing alert this often (0 = never)
+ALERT_CHECK_INTERVAL = 15.0  # seconds between head checks in `python alerts.py`
+
+# Streaming export (python export.py)
+EXPORT_CHUNK_ADDRESSES = 1000  # addresses read per chunk (and rows written per write)
+EXPORT_WORKERS = 4  # chunks read at once; at most twice this many are held in memory
+EXPORT_ROW_GROUP_ROWS = 100000  # rows per Parquet row group
+
+# Sharded scanner for external address lists (python scanner.py)
+SCANNER_DIR = "scans"  # shards, per-shard results and progress, one directory per scan
+SCANNER_SHARD_ADDRESSES = 10000  # addresses per shard (the unit of work and of checkpointing)
+SCANNER_WORKERS = None  # worker processes (None = all cores); each starts on a different endpoint
+
+# Local state (address index, last-known balances, nonce lanes, tx history)
+STATE_DB_FILE = "wallet_state.db"
+
+# Transaction journal (signed transactions are journaled before broadcast)
+JOURNAL_DIR = "journal"
+INTERACTIVE_JOURNAL_FILE = os.path.join(JOURNAL_DIR, "interactive.jsonl")
+JOURNAL_SYNC_EVERY = 50  # fsync after this many state-change entries
+JOURNAL_SYNC_INTERVAL = 1.0  # ...or after this many seconds
+PAYOUT_DUPLICATE_WINDOW = 7 * 24 * 3600  # payouts.py skips transfers already sent this recently (seconds)
+
+# Address vetting (known contract recipients are flagged using cached eth_getCode lookups)
+CODE_CACHE_MAX_AGE = 7 * 24 * 3600  # seconds before a "not a contract" result is re-checked
+
+# Token discovery (Transfer log scan over a block range, split into adaptive chunks)
+DISCOVERY_WORKERS = 4  # block chunks queried in parallel per chain
+DISCOVERY_CHUNK_BLOCKS = 2000  # initial blocks per eth_getLogs query
+DISCOVERY_MIN_CHUNK_BLOCKS = 1
+DISCOVERY_MAX_CHUNK_BLOCKS = 100000
+DISCOVERY_TARGET_SECONDS = 2.0  # chunks answered faster than half this grow, slower ones shrink
+DISCOVERY_BACKOFF_SECONDS = 1.0  # pause after a rate limit or timeout, doubled per retry of the same chunk
+DISCOVERY_MAX_BACKOFF_SECONDS = 30.0
+
+# Simulate transfers with eth_call/eth_estimateGas before any nonce is allocated or transaction signed
+PREFLIGHT_ENABLED = True
+
+# Stuck transaction watcher (re-signs long-pending transactions at the same nonce)
+TX_WATCH_ENABLED = True
+TX_WATCH_INTERVAL = 15  # seconds between checks
+STUCK_TX_SECONDS = 120  # pending longer than this counts as stuck
+FEE_BUMP_PERCENT = 15  # nodes reject replacements under +10% gas price
+MAX_FEE_BUMPS = 5  # stop replacing a nonce after this many bumps
+STUCK_TX_ACTION = "bump"  # "bump" re-sends the same transfer, "cancel" sends 0 to self instead
+
+# Historical snapshots
+SNAPSHOT_DIR = "snapshots"  # Columnar balance snapshots, one file per network and block
+BLOCK_CACHE_FILE = "block_cache.json"  # Resolved date -> block numbers
 
 # Gas settings (optional)
 DEFAULT_GAS_LIMIT_ERC20 = 100000
 DEFAULT_GAS_LIMIT_NATIVE = 21000
+
+# RPC metrics (per network/endpoint/method counts, errors, bytes, latency)
+METRICS_ENABLED = True
+METRICS_PORT = 9464  # Prometheus endpoint at http://127.0.0.1:9464/metrics (None to disable)
+METRICS_HOST = "127.0.0.1"
+METRICS_SUMMARY = True  # Print an RPC summary table on exit
+
+# Tracing and profiling (switch on per run with environment variables)
+TRACE_FILE = os.environ.get("WALLET_TRACE_FILE")  # e.g. traces.jsonl (OTLP/JSON spans)
+PROFILE_FILE = os.environ.get("WALLET_PROFILE_FILE")  # e.g. profile.folded (collapsed stacks)
+PROFILE_INTERVAL = float(os.environ.get("WALLET_PROFILE_INTERVAL", "0.005"))  # seconds between samples
@@ -41,6 +41,16 @@ def decrypt_data(encrypted_data: bytes, password: str, salt: bytes) -> str:
     return decrypted_data.decode('utf-8')
 
 
+def encrypt_with_key(data: str, key: bytes) -> bytes:
+    """Encrypt data with an already-derived Fernet key (one KDF run for many tokens)."""
+    return Fernet(key).encrypt(data.encode('utf-8'))
+
+
+def decrypt_with_key(token: bytes, key: bytes) -> str:
+    """Decrypt a token with an already-derived Fernet key."""
+    return Fernet(key).decrypt(token).decode('utf-8')
+
+
 def load_encrypted_file(filename: str, password: str) -> str:
     """Load and decrypt an encrypted file."""
     if not os.path.exists(filename):
@@ -0,0 +1,241 @@
+#!/usr/bin/env python3
+"""
+Live balance dashboard for the EVM Wallet Manager.
+Follows new blocks on every chain and re-reads only the wallets a block
+touched (found through block transactions and token Transfer logs),
+redrawing a balance table in place. New blocks are pushed by WebSocket
+and IPC endpoints and polled for on HTTP endpoints.
+"""
+
+import time
+import shutil
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from config import (
+    DASHBOARD_POLL_INTERVAL, DASHBOARD_REDRAW_INTERVAL, DASHBOARD_MAX_BLOCK_GAP, DASHBOARD_FULL_REFRESH_BLOCKS,
+)
+from chains import CHAINS, TRANSFER_TOPIC, TOPIC_ADDRESSES_PER_FILTER, address_topic
+from rpc import get_web3_connection, batch_request
+from balances import fetch_all_balances, fetch_chain_balances, fetch_head_blocks, chain_asset_decimals, format_amount
+from state import save_balances
+from metrics import BATCH_METHOD, get_metrics_snapshot
+from scheduler import bind_priority
+from alerts import observe_balances, check_due_alerts, firing_alerts
+
+
+CLEAR_SCREEN = "\033[H\033[J"
+GREEN = "\033[32m"
+RED = "\033[31m"
+RESET = "\033[0m"
+
+
+def find_touched_wallets(network, wallet_by_lower, from_block, to_block):
+    """Return (wallet addresses touched in a block range, complete flag).
+
+    Reads the range's blocks with their transactions (native transfers and
+    gas spent) and the tokens' Transfer logs from or to any wallet, all in
+    one JSON-RPC batch. complete is False if any read failed.
+    """
+    web3 = get_web3_connection(network)
+    token_addresses = [token['address'] for token in CHAINS[network]['tokens'].values()]
+    requests = [('eth_getBlockByNumber', [hex(number), True]) for number in range(from_block, to_block + 1)]
+    if token_addresses:
+        topics = [address_topic(address) for address in wallet_by_lower.values()]
+        for start in range(0, len(topics), TOPIC_ADDRESSES_PER_FILTER):
+            chunk = topics[start:start + TOPIC_ADDRESSES_PER_FILTER]
+            log_filter = {'fromBlock': hex(from_block), 'toBlock': hex(to_block), 'address': token_addresses}
+            requests.append(('eth_getLogs', [dict(log_filter, topics=[TRANSFER_TOPIC, chunk])]))
+            requests.append(('eth_getLogs', [dict(log_filter, topics=[TRANSFER_TOPIC, None, chunk])]))
+
+    touched = set()
+    complete = True
+    for response in batch_request(web3, requests):
+        result = response.get('result') if isinstance(response, dict) else None
+        if result is None:
+            complete = False
+        elif isinstance(result, dict):
+            for tx in result.get('transactions', []):
+                for field in ('from', 'to'):
+                    wallet = wallet_by_lower.get((tx.get(field) or '').lower())
+                    if wallet:
+                        touched.add(wallet)
+        else:
+            for log in result:
+                for topic in log.get('topics', [])[1:3]:
+                    wallet = wallet_by_lower.get('0x' + topic[-40:].lower())
+                    if wallet:
+                        touched.add(wallet)
+    return touched, complete
+
+
+def read_block_updates(network, addresses, wallet_by_lower, last, last_full, head):
+    """Return ({address: balances} to replace, full refresh flag) for a network that moved from last to head.
+
+    Only wallets touched by the new blocks are re-read, unless the gap is
+    too large, a full refresh is due, or the touched set is incomplete.
+    """
+    if last is None or head - last > DASHBOARD_MAX_BLOCK_GAP or \
+            head - (last_full or 0) >= DASHBOARD_FULL_REFRESH_BLOCKS:
+        return fetch_chain_balances(network, addresses, head), True
+    touched, complete = find_touched_wallets(network, wallet_by_lower, last + 1, head)
+    if not complete:
+        return fetch_chain_balances(network, addresses, head), True
+    return (fetch_chain_balances(network, sorted(touched), head) if touched else {}), False
+
+
+def render_table(wallets, balances, decimals, heads, changes, status):
+    """Return the dashboard as a string, sized to the terminal."""
+    width, height = shutil.get_terminal_size((120, 40))
+    networks = list(balances)
+
+    # Native asset of every chain, plus any token some wallet actually holds
+    columns = []
+    for network in networks:
+        native = CHAINS[network]['native']
+        for symbol in decimals[network]:
+            if symbol == native or any(assets.get(symbol) for assets in balances[network].values()):
+                columns.append((network, symbol))
+    column_width = 16
+    fit = max(1, (width - 50) // column_width)
+    hidden_columns = max(0, len(columns) - fit)
+    columns = columns[:fit]
+
+    lines = [
+        "📡 Live Balances  " + "  ".join(f"{network} #{heads.get(network, 'n/a')}" for network in networks),
+        status,
+        f"{'#':>5} {'Address':<43}" + "".join(f"{(network[:6] + ' ' + symbol)[:column_width - 1]:>{column_width}}"
+                                            for network, symbol in columns),
+    ]
+    rows = max(1, height - len(lines) - 2)
+    for index, wallet in list(wallets.items())[:rows]:
+        address = wallet['address']
+        cells = []
+        for network, symbol in columns:
+            text = format_amount(balances[network][address].get(symbol), decimals[network][symbol], 4)
+            change = changes.get((network, address, symbol))
+            if change:
+                text = f"{GREEN if change > 0 else RED}{text:>{column_width}}{RESET}"
+            else:
+                text = f"{text:>{column_width}}"
+            cells.append(text)
+        lines.append(f"{index:>5} {address:<43}" + "".join(cells))
+    if len(wallets) > rows:
+        lines.append(f"... {len(wallets) - rows} more wallet(s)")
+    if hidden_columns:
+        lines.append(f"... {hidden_columns} more column(s); widen the terminal to see them")
+    return "\n".join(lines)
+
+
+def subscribe_heads(networks, pushed_heads, new_block):
+    """Subscribe to newHeads on networks whose provider can push (WebSocket/IPC).
+
+    Each new head number is stored in pushed_heads and new_block is set.
+    Returns {network: (provider, handle)} for the subscribed networks.
+    """
+    subscriptions = {}
+    for network in networks:
+        provider = get_web3_connection(network).provider
+        if not hasattr(provider, 'subscribe'):
+            continue
+
+        def on_head(header, network=network):
+            pushed_heads[network] = int(header['number'], 16)
+            new_block.set()
+
+        try:
+            subscriptions[network] = (provider, provider.subscribe(['newHeads'], on_head))
+        except Exception as e:
+            print(f"⚠️  {network}: no block subscription ({e}), polling instead")
+    return subscriptions
+
+
+def _total_rpc_calls():
+    return sum(series['calls'] for (_, _, method), series in get_metrics_snapshot().items() if method != BATCH_METHOD)
+
+
+def run_dashboard(wallets, networks=None, poll_interval=DASHBOARD_POLL_INTERVAL,
+                  redraw_interval=DASHBOARD_REDRAW_INTERVAL, alerts=None):
+    """Show live balances until Ctrl+C, re-reading only wallets touched by new blocks.
+
+    alerts, an engine from alerts.load_alert_engine(), is checked against every update.
+    """
+    networks = list(networks or CHAINS)
+    addresses = [wallet['address'] for wallet in wallets.values()]
+    wallet_by_lower = {address.lower(): address for address in addresses}
+    decimals = {network: chain_asset_decimals(network) for network in networks}
+
+    heads = fetch_head_blocks(networks)
+    balances = fetch_all_balances(addresses, networks)
+    save_balances(balances, heads)
+    observe_balances(alerts, balances)
+    last_full = dict(heads)
+    changes = {}
+    status = "Full read of all wallets"
+    calls_before = _total_rpc_calls()
+
+    def update(network, head):
+        return read_block_updates(network, addresses, wallet_by_lower, heads[network], last_full[network], head)
+
+    pushed_heads = {}
+    new_block = threading.Event()
+    subscriptions = subscribe_heads(networks, pushed_heads, new_block)
+    polled = [network for network in networks if network not in subscriptions]
+
+    print(CLEAR_SCREEN + render_table(wallets, balances, decimals, heads, changes, status), flush=True)
+    last_draw = time.monotonic()
+    last_poll = time.monotonic()
+    dirty = False
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, len(networks))) as pool:
+            while True:
+                # Wake on a pushed block, or when it is time to poll the HTTP endpoints
+                new_block.wait(max(0.0, poll_interval - (time.monotonic() - last_poll)) if polled else poll_interval)
+                new_block.clear()
+                new_heads = dict(pushed_heads)
+                if polled and time.monotonic() - last_poll >= poll_interval:
+                    new_heads.update(fetch_head_blocks(polled))
+                    last_poll = time.monotonic()
+                moved = {network: head for network, head in new_heads.items()
+                         if head is not None and (heads[network] is None or head > heads[network])}
+                if moved:
+                    futures = {network: pool.submit(bind_priority(update), network, head)
+                               for network, head in moved.items()}
+                    touched_count = 0
+                    for network, future in futures.items():
+                        try:
+                            updated, full = future.result()
+                        except Exception as e:
+                            status = f"⚠️  {network}: {e}"
+                            continue
+                        for address, assets in updated.items():
+                            for symbol, raw in assets.items():
+                                old = balances[network][address].get(symbol)
+                                if raw is not None and old is not None and raw != old:
+                                    changes[(network, address, symbol)] = raw - old
+                            balances[network][address] = assets
+                        heads[network] = moved[network]
+                        if full:
+                            last_full[network] = moved[network]
+                        touched_count += len(updated)
+                        save_balances({network: updated}, {network: moved[network]})
+                        observe_balances(alerts, {network: updated})
+                    check_due_alerts(alerts)
+
+                    calls = _total_rpc_calls()
+                    status = (f"{len(moved)} chain(s) advanced, {touched_count} wallet read(s), "
+                              f"{len(changes)} change(s), {calls - calls_before} RPC call(s), "
+                              f"{firing_alerts(alerts)} alert(s) firing  (Ctrl+C to exit)")
+                    calls_before = calls
+                    dirty = True
+
+                if dirty and time.monotonic() - last_draw >= redraw_interval:
+                    print(CLEAR_SCREEN + render_table(wallets, balances, decimals, heads, changes, status), flush=True)
+                    last_draw = time.monotonic()
+                    dirty = False
+                    # Highlight each change in one frame only
+                    changes = {}
+    except KeyboardInterrupt:
+        print("\n👋 Leaving live view")
+    finally:
+        for provider, handle in subscriptions.values():
+            provider.unsubscribe(handle)
@@ -2,75 +2,207 @@
 """
 Decrypt EVM Private Keys
 Utility script to decrypt the encrypted private keys file.
+Addresses are derived in parallel and records are streamed to the output
+files as they are ready, so memory does not grow with the number of keys.
 """
 
 import os
+import sys
 import getpass
+import argparse
+from concurrent.futures import ProcessPoolExecutor
 from eth_account import Account
-from crypto import load_encrypted_file, save_decrypted_file
+from crypto import load_encrypted_file
+
+
+EXPORT_CHUNK_SIZE = 1000  # Keys per worker task
+WRITE_BUFFER_SIZE = 1 << 20
+
+
+def iter_key_lines(decrypted_content):
+    """Yield KEY_n=... lines from the decrypted content without splitting it into a list."""
+    position = 0
+    length = len(decrypted_content)
+    while position < length:
+        end = decrypted_content.find('\n', position)
+        if end == -1:
+            end = length
+        line = decrypted_content[position:end].strip()
+        position = end + 1
+        if line.startswith('KEY_') and '=' in line:
+            yield line
+
+
+def derive_chunk(key_lines):
+    """Derive (key line, address line or None, warning or None) for a chunk of KEY_n lines."""
+    records = []
+    for line in key_lines:
+        key_name, private_key = line.split('=', 1)
+        index = key_name.replace('KEY_', '')
+        try:
+            # Derive public address from private key
+            account = Account.from_key(private_key)
+            records.append((line, f"ADDR_{index}={account.address}", None))
+        except Exception as e:
+            records.append((line, None, f"Could not derive address for KEY_{index}: {e}"))
+    return records
+
+
+def _in_index_range(line, index_range):
+    if index_range is None:
+        return True
+    try:
+        index = int(line.split('=', 1)[0].replace('KEY_', ''))
+    except ValueError:
+        return False
+    low, high = index_range
+    return (low is None or index >= low) and (high is None or index <= high)
+
+
+def _chunks(lines, size):
+    chunk = []
+    for line in lines:
+        chunk.append(line)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def iter_export_records(decrypted_content, workers=None, index_range=None, addresses=None):
+    """Yield (key line, address line, warning) records in file order.
+
+    Chunks of keys are derived across worker processes with a bounded number
+    of chunks in flight. index_range is an inclusive (low, high) pair where
+    either end may be None; addresses keeps only records for those addresses.
+    """
+    wanted = {address.lower() for address in addresses} if addresses else None
+    lines = (line for line in iter_key_lines(decrypted_content) if _in_index_range(line, index_range))
+    chunks = _chunks(lines, EXPORT_CHUNK_SIZE)
+
+    def keep(record):
+        address_line = record[1]
+        return wanted is None or (address_line is not None and address_line.split('=', 1)[1].lower() in wanted)
+
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        for chunk in chunks:
+            for record in derive_chunk(chunk):
+                if keep(record):
+                    yield record
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = []
+        for chunk in chunks:
+            pending.append(pool.submit(derive_chunk, chunk))
+            if len(pending) < workers * 2:
+                continue
+            for record in pending.pop(0).result():
+                if keep(record):
+                    yield record
+        for future in pending:
+            for record in future.result():
+                if keep(record):
+                    yield record
+
+
+def derive_address_lines(decrypted_content):
+    """Return KEY_n lines from the decrypted content, each followed by its ADDR_n line."""
+    enhanced_content_lines = []
+    for key_line, address_line, warning in iter_export_records(decrypted_content, workers=1):
+        enhanced_content_lines.append(key_line)
+        if address_line:
+            enhanced_content_lines.append(address_line)
+        else:
+            print(f"⚠️  Warning: {warning}")
+    return enhanced_content_lines
+
+
+def export_decrypted(decrypted_content, output_files, workers=None, index_range=None, addresses=None):
+    """Stream KEY_n/ADDR_n records to every output file in one pass; returns (keys, warnings)."""
+    outputs = [open(filename, 'w', buffering=WRITE_BUFFER_SIZE) for filename in output_files]
+    keys = 0
+    warnings = 0
+    try:
+        for key_line, address_line, warning in iter_export_records(decrypted_content, workers, index_range, addresses):
+            record = key_line + "\n" + (address_line + "\n" if address_line else "")
+            for output in outputs:
+                output.write(record)
+            keys += 1
+            if warning:
+                warnings += 1
+                print(f"⚠️  Warning: {warning}")
+    finally:
+        for output in outputs:
+            output.close()
+    return keys, warnings
+
+
+def parse_index_range(value):
+    """Parse an index range like 10-200, 10- or -200 into an inclusive (low, high) pair."""
+    if value is None:
+        return None
+    low, _, high = value.partition('-')
+    return (int(low) if low else None, int(high) if high else None)
 
 
 def main():
     """Main function to decrypt keys."""
+    parser = argparse.ArgumentParser(description="Decrypt keys and export them with their addresses")
+    parser.add_argument('--input', help="Encrypted file (asked for if omitted, default: env.dat)")
+    parser.add_argument('--output', default="env.dec.dat", help="Decrypted output file")
+    parser.add_argument('--also', help="Write the same export to this additional file")
+    parser.add_argument('--range', dest='index_range', help="Only export wallet indexes in this range, e.g. 1-500")
+    parser.add_argument('--address', action='append', help="Only export this address (repeatable)")
+    parser.add_argument('--workers', type=int, help="Processes used to derive addresses (default: all cores)")
+    args = parser.parse_args()
+
     print("🔓 EVM Private Keys Decryptor")
     print("=" * 40)
-    
-    filename = input("Enter filename (default: env.dat): ").strip()
+
+    filename = args.input
+    if filename is None:
+        filename = input("Enter filename (default: env.dat): ").strip()
     if not filename:
         filename = "env.dat"
-    
+
     if not os.path.exists(filename):
         print(f"❌ File {filename} not found!")
         return
-    
+
     secret_key = getpass.getpass("Enter secret key to decrypt: ")
-    
+
     try:
         # Decrypt content using crypto module
         decrypted_content = load_encrypted_file(filename, secret_key)
-        
+
         print("\n✅ Successfully decrypted keys")
         print("🔒 For security, keys are not displayed in terminal")
-        
-        # Parse the decrypted content and derive public addresses
-        enhanced_content_lines = []
-        for line in decrypted_content.strip().split('\n'):
-            if line.startswith('KEY_') and '=' in line:
-                # Add the private key line
-                enhanced_content_lines.append(line)
-                
-                # Derive and add the public address
-                key_name, private_key = line.split('=', 1)
-                index = key_name.replace('KEY_', '')
-                
-                try:
-                    # Derive public address from private key
-                    account = Account.from_key(private_key)
-                    address_line = f"ADDR_{index}={account.address}"
-                    enhanced_content_lines.append(address_line)
-                except Exception as e:
-                    print(f"⚠️  Warning: Could not derive address for KEY_{index}: {e}")
-        
-        enhanced_content = "\n".join(enhanced_content_lines)
-        
-        # Always save to env.dec.dat as the decrypted output with addresses
-        output_file = "env.dec.dat"
-        save_decrypted_file(enhanced_content, output_file)
-        
-        print(f"✅ Decrypted keys with addresses saved to {output_file}")
+
+        output_files = [args.output]
+        if args.also:
+            output_files.append(args.also)
+        elif args.input is None:
+            # Ask if user wants to save to a custom file as well
+            save_custom = input("\n💾 Save to additional custom file? (y/n): ").lower().strip()
+            if save_custom == 'y':
+                custom_file = input("Enter custom filename: ").strip()
+                if custom_file:
+                    output_files.append(custom_file)
+
+        # Derive public addresses and stream them to every output file in one pass
+        keys, _ = export_decrypted(decrypted_content, output_files, args.workers,
+                                   parse_index_range(args.index_range), args.address)
+
+        for output_file in output_files:
+            print(f"✅ {keys} decrypted keys with addresses saved to {output_file}")
         print("⚠️  Remember to delete this file after use for security!")
-        
-        # Ask if user wants to save to a custom file as well
-        save_custom = input("\n💾 Save to additional custom file? (y/n): ").lower().strip()
-        if save_custom == 'y':
-            custom_file = input("Enter custom filename: ").strip()
-            if custom_file:
-                save_decrypted_file(enhanced_content, custom_file)
-                print(f"✅ Decrypted keys with addresses also saved to {custom_file}")
-        
+
     except Exception as e:
         print(f"❌ Failed to decrypt: {e}")
 
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
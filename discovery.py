@@ -0,0 +1,292 @@
+#!/usr/bin/env python3
+"""
+Token Holdings Discovery
+Finds every ERC-20 contract that sent Transfer events to our wallets by
+scanning eth_getLogs over a block range in parallel chunks. Chunk size
+adapts to provider limits and response times, progress is checkpointed so
+runs resume, and new tokens are added to the token metadata cache.
+"""
+
+import sys
+import time
+import hashlib
+import argparse
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from config import (
+    DISCOVERY_WORKERS, DISCOVERY_CHUNK_BLOCKS, DISCOVERY_MIN_CHUNK_BLOCKS, DISCOVERY_MAX_CHUNK_BLOCKS,
+    DISCOVERY_TARGET_SECONDS, DISCOVERY_BACKOFF_SECONDS, DISCOVERY_MAX_BACKOFF_SECONDS,
+)
+from chains import CHAINS, TRANSFER_TOPIC, TOPIC_ADDRESSES_PER_FILTER, address_topic
+from rpc import get_web3_connection, batch_request
+from balances import SELECTOR_DECIMALS, decode_uint, fetch_head_blocks
+from addresses import to_checksum, read_address_column, validate_addresses
+from scheduler import rpc_priority, bind_priority
+from state import (
+    load_known_addresses, get_token_metadata, save_token_metadata, get_scan_checkpoint, save_scan_checkpoint,
+)
+
+
+SELECTOR_SYMBOL = '0x95d89b41'
+SELECTOR_NAME = '0x06fdde03'
+
+MAX_ATTEMPTS = 3  # tries per chunk for other errors
+MAX_TRANSIENT_ATTEMPTS = 8  # tries per chunk for rate limits and timeouts, with backoff between them
+
+# Provider messages that mean the query's result or block range was too big
+# (e.g. "query returned more than 10000 results", "Log response size exceeded",
+# "exceed maximum block range: 5000", "block range is too wide")
+TOO_LARGE_ERRORS = (
+    'more than', 'response size', 'block range', 'range is too', 'range too', 'too many results', 'max results',
+    'results exceed', 'is limited to a',
+)
+
+# Provider messages that mean "slow down" or "try again", whatever the query's size
+TRANSIENT_ERRORS = (
+    '429', 'too many requests', 'rate limit', 'rate-limit', 'throttl', 'capacity', 'timeout', 'timed out',
+)
+
+
+def is_transient_error(message):
+    """Return True if a provider error is a rate limit or timeout, to retry after a backoff."""
+    message = message.lower()
+    return any(marker in message for marker in TRANSIENT_ERRORS)
+
+
+def is_too_large_error(message):
+    """Return True if a provider error asks for a smaller eth_getLogs query."""
+    if is_transient_error(message):
+        return False
+    message = message.lower()
+    return any(marker in message for marker in TOO_LARGE_ERRORS)
+
+
+def decode_string(result):
+    """Decode an ABI string (or legacy bytes32) eth_call result, or return None."""
+    try:
+        data = bytes.fromhex(result[2:])
+        if len(data) == 32:
+            return data.rstrip(b'\0').decode('utf-8', 'replace') or None
+        offset = int.from_bytes(data[:32], 'big')
+        length = int.from_bytes(data[offset:offset + 32], 'big')
+        return data[offset + 32:offset + 32 + length].decode('utf-8', 'replace') or None
+    except (TypeError, ValueError, IndexError):
+        return None
+
+
+def fetch_token_metadata(network, token_addresses):
+    """Return {token address: {'symbol', 'name', 'decimals'}} read with one batched eth_call each."""
+    web3 = get_web3_connection(network)
+    requests = []
+    for address in token_addresses:
+        for selector in (SELECTOR_SYMBOL, SELECTOR_NAME, SELECTOR_DECIMALS):
+            requests.append(('eth_call', [{'to': address, 'data': selector}, 'latest']))
+    responses = batch_request(web3, requests)
+
+    tokens = {}
+    for position, address in enumerate(token_addresses):
+        symbol, name, decimals = responses[position * 3:position * 3 + 3]
+        tokens[address] = {
+            'symbol': decode_string(symbol.get('result')) if 'result' in symbol else None,
+            'name': decode_string(name.get('result')) if 'result' in name else None,
+            'decimals': decode_uint(decimals),
+        }
+    return tokens
+
+
+def fetch_transfer_tokens(network, topics, from_block, to_block):
+    """Return (token contracts with ERC-20 Transfer logs to any topic address, seconds taken).
+
+    Raises ValueError with the provider's message if any query failed.
+    """
+    web3 = get_web3_connection(network)
+    requests = []
+    for start in range(0, len(topics), TOPIC_ADDRESSES_PER_FILTER):
+        log_filter = {'fromBlock': hex(from_block), 'toBlock': hex(to_block),
+                      'topics': [TRANSFER_TOPIC, None, topics[start:start + TOPIC_ADDRESSES_PER_FILTER]]}
+        requests.append(('eth_getLogs', [log_filter]))
+
+    started = time.perf_counter()
+    responses = batch_request(web3, requests)
+    elapsed = time.perf_counter() - started
+
+    tokens = set()
+    for response in responses:
+        result = response.get('result') if isinstance(response, dict) else None
+        if result is None:
+            error = response.get('error') if isinstance(response, dict) else None
+            raise ValueError((error or {}).get('message') or str(error or response))
+        for log in result:
+            # ERC-721 Transfer logs index the token id too (4 topics); only ERC-20 is wanted
+            if len(log.get('topics', [])) == 3:
+                tokens.add(to_checksum(log['address']))
+    return tokens, elapsed
+
+
+def scan_id_for(addresses, from_block):
+    """Return the checkpoint id for a scan of an address set starting at a block."""
+    digest = hashlib.sha256('\n'.join(sorted(address.lower() for address in addresses)).encode('utf-8'))
+    return f"transfers-{from_block}-{digest.hexdigest()[:16]}"
+
+
+def discover_tokens(network, addresses, from_block, to_block, workers=DISCOVERY_WORKERS,
+                    chunk_blocks=DISCOVERY_CHUNK_BLOCKS, resume=True, progress=None):
+    """Return the token contracts that sent Transfer events to any address in a block range.
+
+    Chunks are queried in parallel; a chunk the provider finds too large is
+    split in two and the chunk size shrinks, fast chunks make it grow. The
+    checkpoint advances over every fully scanned prefix of the range, and new
+    tokens are saved to the metadata cache as they are found, so an
+    interrupted run resumes where it stopped. progress(next_block, found) is
+    called as the checkpoint advances.
+    """
+    scan_id = scan_id_for(addresses, from_block)
+    checkpoint = get_scan_checkpoint(network, scan_id) if resume else None
+    next_block = checkpoint if checkpoint is not None else from_block
+    topics = [address_topic(address) for address in addresses]
+    registry = {to_checksum(token['address']) for token in CHAINS[network]['tokens'].values()}
+    cached = set(get_token_metadata(network))
+
+    size = chunk_blocks
+    ceiling = DISCOVERY_MAX_CHUNK_BLOCKS  # below the smallest chunk the provider rejected
+    cursor = next_block
+    retry = []
+    done = {}
+    pending = {}
+    found = set()
+    backoff_until = 0.0  # no chunk is sent before this, after a rate limit or timeout
+
+    # A scan is background traffic: it never holds up interactive calls or sends in this process
+    with rpc_priority('background'), ThreadPoolExecutor(max_workers=workers) as pool:
+        while pending or retry or cursor <= to_block:
+            pause = backoff_until - time.monotonic()
+            while pause <= 0 and len(pending) < workers and (retry or cursor <= to_block):
+                if retry:
+                    low, high, attempts = retry.pop()
+                else:
+                    low, high, attempts = cursor, min(to_block, cursor + size - 1), 0
+                    cursor = high + 1
+                future = pool.submit(bind_priority(fetch_transfer_tokens), network, topics, low, high)
+                pending[future] = (low, high, attempts)
+            if not pending:
+                time.sleep(pause)
+                continue
+
+            finished, _ = wait(pending, timeout=pause if pause > 0 else None, return_when=FIRST_COMPLETED)
+            for future in finished:
+                low, high, attempts = pending.pop(future)
+                try:
+                    tokens, elapsed = future.result()
+                except Exception as e:
+                    if is_transient_error(str(e)) and attempts + 1 < MAX_TRANSIENT_ATTEMPTS:
+                        # Back off the whole scan, same chunk size: splitting would only send more requests
+                        delay = min(DISCOVERY_MAX_BACKOFF_SECONDS, DISCOVERY_BACKOFF_SECONDS * 2 ** attempts)
+                        backoff_until = max(backoff_until, time.monotonic() + delay)
+                        retry.append((low, high, attempts + 1))
+                    elif is_too_large_error(str(e)) and high > low:
+                        middle = (low + high) // 2
+                        retry.extend([(middle + 1, high, 0), (low, middle, 0)])
+                        ceiling = min(ceiling, high - low)
+                        size = max(DISCOVERY_MIN_CHUNK_BLOCKS, min(size, middle - low + 1))
+                    elif attempts + 1 < MAX_ATTEMPTS:
+                        retry.append((low, high, attempts + 1))
+                    else:
+                        for other in pending:
+                            other.cancel()
+                        raise ValueError(f"blocks {low}-{high}: {e}")
+                    continue
+
+                if elapsed < DISCOVERY_TARGET_SECONDS / 2:
+                    size = min(ceiling, int(size * 1.5) + 1)
+                elif elapsed > DISCOVERY_TARGET_SECONDS:
+                    size = max(DISCOVERY_MIN_CHUNK_BLOCKS, int(size * 0.7))
+
+                new = sorted(tokens - registry - cached)
+                if new:
+                    save_token_metadata(network, fetch_token_metadata(network, new))
+                    cached.update(new)
+                found.update(tokens)
+
+                # Checkpoint only over a gap-free prefix, since chunks finish out of order
+                done[low] = high
+                advanced = False
+                while next_block in done:
+                    next_block = done.pop(next_block) + 1
+                    advanced = True
+                if advanced:
+                    save_scan_checkpoint(network, scan_id, next_block)
+                    if progress:
+                        progress(next_block, len(found))
+    return found
+
+
+def main():
+    """Main function to discover tokens held by the wallets."""
+    parser = argparse.ArgumentParser(description="Find ERC-20 tokens sent to our wallets")
+    parser.add_argument('--networks', default=','.join(CHAINS), help="Comma-separated networks to scan")
+    parser.add_argument('--from-block', type=int, default=0, help="First block to scan")
+    parser.add_argument('--to-block', type=int, help="Last block to scan (default: latest)")
+    parser.add_argument('--addresses', help="File with addresses to scan (default: wallets in the state store)")
+    parser.add_argument('--workers', type=int, default=DISCOVERY_WORKERS, help="Parallel chunks per chain")
+    parser.add_argument('--chunk-blocks', type=int, default=DISCOVERY_CHUNK_BLOCKS, help="Initial blocks per query")
+    parser.add_argument('--restart', action='store_true', help="Ignore the checkpoint and scan from --from-block")
+    args = parser.parse_args()
+
+    print("🔭 Token Discovery")
+    print("=" * 50)
+
+    networks = [n.strip().lower() for n in args.networks.split(',') if n.strip()]
+    unknown = [n for n in networks if n not in CHAINS]
+    if unknown:
+        print(f"❌ Unknown networks: {', '.join(unknown)}")
+        return 2
+
+    if args.addresses:
+        addresses, errors, _ = validate_addresses(read_address_column(args.addresses))
+        addresses = list(addresses)
+        if errors:
+            print(f"⚠️  Skipping {len(errors)} invalid address(es) in {args.addresses}")
+    else:
+        addresses = sorted(set(load_known_addresses().values()))
+    if not addresses:
+        print("❌ No addresses to scan; run main.py once or pass --addresses")
+        return 2
+    print(f"📋 Scanning for {len(addresses)} address(es)")
+
+    heads = fetch_head_blocks(networks) if args.to_block is None else {}
+    status = 0
+    for network in networks:
+        to_block = args.to_block if args.to_block is not None else heads.get(network)
+        if to_block is None:
+            print(f"❌ {network}: could not read the latest block")
+            status = 1
+            continue
+
+        def progress(next_block, found, network=network, to_block=to_block):
+            print(f"\r⏳ {network}: block {next_block - 1}/{to_block}, {found} token(s)", end='', flush=True)
+
+        try:
+            found = discover_tokens(network, addresses, args.from_block, to_block, args.workers,
+                                    args.chunk_blocks, resume=not args.restart, progress=progress)
+        except ValueError as e:
+            print(f"\n❌ {network}: scan stopped at {e}; run again to resume")
+            status = 1
+            continue
+        print()
+
+        metadata = get_token_metadata(network)
+        registry = {to_checksum(token['address']): symbol for symbol, token in CHAINS[network]['tokens'].items()}
+        print(f"✅ {network}: {len(found)} token(s) with transfers to our wallets in the blocks scanned this run "
+              f"({len(metadata)} discovered token(s) cached in total)")
+        for address in sorted(found, key=lambda a: (a not in registry, (metadata.get(a) or {}).get('symbol') or '')):
+            if address in registry:
+                print(f"  {registry[address]:<12} {address}  (in registry)")
+                continue
+            meta = metadata.get(address) or {}
+            decimals = meta.get('decimals')
+            print(f"  {(meta.get('symbol') or '?')[:12]:<12} {address}  {meta.get('name') or ''}"
+                  f"{'' if decimals is not None else '  (no decimals)'}")
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,261 @@
+#!/usr/bin/env python3
+"""
+Streaming export of balances and transaction history.
+Rows are written to CSV, NDJSON or Parquet as they are read, a chunk of
+addresses at a time, so memory stays bounded however many addresses are
+exported. Amounts are raw integers (as text, since uint256 does not fit
+a 64-bit column) with their decimals alongside.
+"""
+
+import sys
+import csv
+import json
+import argparse
+from itertools import islice
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from config import EXPORT_CHUNK_ADDRESSES, EXPORT_WORKERS, EXPORT_ROW_GROUP_ROWS
+from chains import CHAINS, list_assets
+from rpc import get_web3_connection
+from balances import fetch_chain_balances, fetch_head_blocks, chain_asset_decimals
+from addresses import read_address_column, validate_address
+from state import get_wallet_addresses, iter_transactions
+from scheduler import rpc_priority, bind_priority
+
+
+BALANCE_COLUMNS = ('network', 'block', 'timestamp', 'address', 'asset', 'token_address', 'raw', 'decimals')
+HISTORY_COLUMNS = ('tx_hash', 'network', 'sender', 'recipient', 'asset', 'amount_raw', 'decimals', 'nonce',
+                   'status', 'block', 'created_at', 'gas_price', 'replaces')
+INTEGER_COLUMNS = {'block', 'timestamp', 'decimals', 'nonce', 'created_at'}
+
+FORMATS = {'.csv': 'csv', '.ndjson': 'ndjson', '.jsonl': 'ndjson', '.parquet': 'parquet'}
+
+
+def open_export(filename, export_format, columns):
+    """Open an export file; returns the handle for write_rows() and close_export()."""
+    export = {'format': export_format, 'columns': list(columns), 'rows': 0, 'pending': []}
+    if export_format == 'parquet':
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ValueError("Parquet export needs pyarrow (pip install pyarrow)")
+        schema = pa.schema([(column, pa.int64() if column in INTEGER_COLUMNS else pa.string())
+                            for column in columns])
+        export['schema'] = schema
+        export['writer'] = pq.ParquetWriter(filename, schema, compression='zstd')
+        return export
+
+    export['file'] = open(filename, 'w', newline='')
+    if export_format == 'csv':
+        export['csv'] = csv.writer(export['file'])
+        export['csv'].writerow(columns)
+    return export
+
+
+def _flush_row_group(export):
+    import pyarrow as pa
+    pending = export['pending']
+    table = pa.Table.from_pydict({column: [row[column] for row in pending] for column in export['columns']},
+                                 schema=export['schema'])
+    export['writer'].write_table(table)
+    export['pending'] = []
+
+
+def write_rows(export, rows):
+    """Write row dicts, keeping only the export's columns."""
+    columns = export['columns']
+    for row in rows:
+        export['rows'] += 1
+        if export['format'] == 'csv':
+            export['csv'].writerow(['' if row[column] is None else row[column] for column in columns])
+        elif export['format'] == 'ndjson':
+            export['file'].write(json.dumps({column: row[column] for column in columns}) + '\n')
+        else:
+            export['pending'].append(row)
+            # One row group per EXPORT_ROW_GROUP_ROWS rows, so readers can skip or project within it
+            if len(export['pending']) >= EXPORT_ROW_GROUP_ROWS:
+                _flush_row_group(export)
+
+
+def close_export(export):
+    """Write anything buffered and close the file."""
+    if export['format'] == 'parquet':
+        if export['pending']:
+            _flush_row_group(export)
+        export['writer'].close()
+    else:
+        export['file'].close()
+
+
+def iter_addresses(filename=None, column=None, errors=None):
+    """Yield checksummed addresses from a file (streamed), or the wallets in the state store.
+
+    Invalid lines are skipped; their (line number, value, reason) go to the errors list if given.
+    """
+    if filename is None:
+        yield from get_wallet_addresses().values()
+        return
+    for line_number, value in read_address_column(filename, column):
+        address, error = validate_address(value)
+        if address:
+            yield address
+        elif errors is not None:
+            errors.append((line_number, value, error))
+
+
+def _chunks(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _read_chunk(network, chunk, block):
+    """Return {address: {symbol: raw or None}}; a chunk that cannot be read at all comes back empty."""
+    try:
+        return fetch_chain_balances(network, chunk, block)
+    except Exception as e:
+        print(f"⚠️  {network}: could not read {len(chunk)} balance row(s) at block {block}: {e}")
+        return {}
+
+
+def resolve_heads(networks):
+    """Return ({network: head block}, {network: its timestamp}), leaving out networks with no head."""
+    heads = {}
+    timestamps = {}
+    for network, head in fetch_head_blocks(networks).items():
+        if head is None:
+            print(f"⚠️  {network}: no head block, skipped")
+            continue
+        heads[network] = head
+        timestamps[network] = get_web3_connection(network).eth.get_block(head)['timestamp']
+    return heads, timestamps
+
+
+def iter_balance_rows(addresses, networks, chunk_size=EXPORT_CHUNK_ADDRESSES, workers=EXPORT_WORKERS,
+                      nonzero=False, stats=None, heads=None, timestamps=None):
+    """Yield one balance row per (network, address, asset), every network pinned to one block.
+
+    heads and timestamps (from resolve_heads()) pin the rows to blocks resolved
+    earlier; without them each network's current head is used. Chunks are read
+    concurrently but yielded in order; at most workers * 2 chunks are held at
+    once. Unreadable balances have raw None and are counted in stats['failed'].
+    """
+    stats = stats if stats is not None else {}
+    stats.setdefault('failed', 0)
+    if heads is None:
+        heads, timestamps = resolve_heads(networks)
+    else:
+        heads = {network: heads[network] for network in networks if network in heads}
+    assets = {network: list_assets(network) for network in heads}
+    decimals = {network: chain_asset_decimals(network) for network in heads}
+
+    pending = deque()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        def drain(limit):
+            while len(pending) > limit:
+                network, chunk, future = pending.popleft()
+                balances = future.result()
+                for address in chunk:
+                    address_balances = balances.get(address, {})
+                    for symbol, _, token_address in assets[network]:
+                        raw = address_balances.get(symbol)
+                        if raw is None:
+                            stats['failed'] += 1
+                        elif nonzero and raw == 0:
+                            continue
+                        yield {
+                            'network': network,
+                            'block': heads[network],
+                            'timestamp': timestamps[network],
+                            'address': address,
+                            'asset': symbol,
+                            'token_address': token_address,
+                            'raw': None if raw is None else str(raw),
+                            'decimals': decimals[network][symbol],
+                        }
+
+        for chunk in _chunks(addresses, chunk_size):
+            for network in heads:
+                pending.append((network, chunk, pool.submit(bind_priority(_read_chunk), network, chunk, heads[network])))
+            yield from drain(workers * 2)
+        yield from drain(0)
+
+
+def iter_history_rows():
+    """Yield one row per recorded transaction, oldest first, with the asset's decimals."""
+    decimals = {}
+    for tx in iter_transactions():
+        network = tx['network']
+        if network not in decimals:
+            decimals[network] = chain_asset_decimals(network) if network in CHAINS else {}
+        yield dict(tx, decimals=decimals[network].get(tx['asset']), created_at=int(tx['created_at']))
+
+
+def main():
+    """Main function to export balances or transaction history."""
+    parser = argparse.ArgumentParser(description="Stream balances or transaction history to CSV, NDJSON or Parquet")
+    parser.add_argument('what', choices=['balances', 'history'], help="What to export")
+    parser.add_argument('--output', required=True, help="Output file (.csv, .ndjson/.jsonl or .parquet)")
+    parser.add_argument('--format', choices=sorted(set(FORMATS.values())),
+                        help="Output format (default: from the file extension)")
+    parser.add_argument('--columns', help="Comma-separated columns to write (default: all)")
+    parser.add_argument('--networks', default=','.join(CHAINS), help="Comma-separated networks (balances)")
+    parser.add_argument('--addresses', help="File with addresses to export (default: wallets in the state store)")
+    parser.add_argument('--column', help="CSV column with the addresses")
+    parser.add_argument('--nonzero', action='store_true', help="Leave out zero balances")
+    args = parser.parse_args()
+
+    print("📤 Export")
+    print("=" * 50)
+
+    export_format = args.format or next((fmt for ext, fmt in FORMATS.items() if args.output.lower().endswith(ext)), None)
+    if export_format is None:
+        print("❌ Unknown output format; use --format or a .csv, .ndjson or .parquet file")
+        return 1
+    all_columns = BALANCE_COLUMNS if args.what == 'balances' else HISTORY_COLUMNS
+    columns = [c.strip() for c in args.columns.split(',') if c.strip()] if args.columns else list(all_columns)
+    unknown = [c for c in columns if c not in all_columns]
+    if unknown:
+        print(f"❌ Unknown columns: {', '.join(unknown)} (available: {', '.join(all_columns)})")
+        return 1
+    networks = [n.strip().lower() for n in args.networks.split(',') if n.strip()]
+    unknown = [n for n in networks if n not in CHAINS]
+    if unknown:
+        print(f"❌ Unknown networks: {', '.join(unknown)}")
+        return 1
+
+    try:
+        export = open_export(args.output, export_format, columns)
+    except (OSError, ValueError) as e:
+        print(f"❌ {e}")
+        return 1
+
+    stats, errors = {}, []
+    try:
+        with rpc_priority('background'):
+            if args.what == 'balances':
+                rows = iter_balance_rows(iter_addresses(args.addresses, args.column, errors), networks,
+                                         nonzero=args.nonzero, stats=stats)
+            else:
+                rows = iter_history_rows()
+            for chunk in _chunks(rows, EXPORT_CHUNK_ADDRESSES):
+                write_rows(export, chunk)
+                print(f"\r  {export['rows']} row(s) written", end='', flush=True)
+    finally:
+        close_export(export)
+    print()
+
+    if errors:
+        print(f"⚠️  Skipped {len(errors)} invalid address(es) in {args.addresses}")
+    if stats.get('failed'):
+        print(f"⚠️  {stats['failed']} balance(s) could not be read; their raw column is empty")
+    print(f"✅ {export['rows']} row(s) written to {args.output} ({export_format})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
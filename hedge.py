@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Hedged reads for the EVM Wallet Manager.
+A read that has not been answered within its endpoint's observed p95
+latency is sent again to a second endpoint, and whichever good answer
+arrives first is used. A budget caps how many reads are hedged.
+"""
+
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout, wait, FIRST_COMPLETED
+from config import HEDGE_DEFAULT_DELAY, HEDGE_MIN_DELAY, HEDGE_MAX_RATIO, HEDGE_BURST
+from metrics import endpoint_quantile
+from scheduler import bind_priority, current_priority
+from singleflight import READ_METHODS
+
+
+HEDGE_WORKERS = 64  # threads carrying hedged calls (the caller waits on the first answer)
+
+_executor = ThreadPoolExecutor(max_workers=HEDGE_WORKERS, thread_name_prefix='rpc-hedge')
+_stats = {}
+_stats_lock = threading.Lock()
+
+
+def hedge_delay(network, endpoint):
+    """Return how long to wait for an endpoint before hedging: its p95 latency, once known."""
+    p95 = endpoint_quantile(network, endpoint, 0.95)
+    return max(HEDGE_MIN_DELAY, p95) if p95 else HEDGE_DEFAULT_DELAY
+
+
+def get_hedge_stats():
+    """Return {network: {'reads', 'hedged', 'backup_wins'}} counted since start."""
+    with _stats_lock:
+        return {network: dict(stats) for network, stats in _stats.items()}
+
+
+def print_hedge_summary():
+    """Print how many reads were hedged and how often the backup answered first."""
+    for network, stats in sorted(get_hedge_stats().items()):
+        if stats['hedged']:
+            print(f"⏱️  {network}: {stats['hedged']} of {stats['reads']} read(s) hedged, "
+                  f"backup answered first {stats['backup_wins']} time(s)")
+
+
+def _succeeded(future, batch):
+    if future.exception() is not None:
+        return False
+    response = future.result()
+    if batch:
+        return isinstance(response, list)
+    return isinstance(response, dict) and 'error' not in response
+
+
+def hedge_provider(provider, network, endpoint, backup):
+    """Wrap a provider so slow reads are also sent to a backup provider; the first good answer wins.
+
+    endpoint is the metrics label of the provider's endpoint, whose p95 sets the hedge delay.
+    """
+    with _stats_lock:
+        stats = _stats.setdefault(network, {'reads': 0, 'hedged': 0, 'backup_wins': 0})
+
+    def start_hedge():
+        # The budget grows with traffic, so hedges stay a small fraction of reads
+        with _stats_lock:
+            if stats['hedged'] >= HEDGE_MAX_RATIO * stats['reads'] + HEDGE_BURST:
+                return False
+            stats['hedged'] += 1
+            return True
+
+    def hedged(call, backup_call, batch, *args):
+        if current_priority() == 'background':
+            # Scans care about throughput, not tail latency; keep the hedge budget for users
+            return call(*args)
+        with _stats_lock:
+            stats['reads'] += 1
+        primary = _executor.submit(bind_priority(call), *args)
+        try:
+            return primary.result(timeout=hedge_delay(network, endpoint))
+        except FutureTimeout:
+            pass
+        if not start_hedge():
+            return primary.result()
+
+        second = _executor.submit(bind_priority(backup_call), *args)
+        pending = [primary, second]
+        while True:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                pending.remove(future)
+                # A failed answer only counts if the other request failed as well
+                if _succeeded(future, batch) or not pending:
+                    if future is second:
+                        with _stats_lock:
+                            stats['backup_wins'] += 1
+                    return future.result()
+
+    make_request = provider.make_request
+
+    def hedged_make_request(method, params):
+        if method not in READ_METHODS:
+            return make_request(method, params)
+        return hedged(make_request, backup.make_request, False, method, params)
+
+    provider.make_request = hedged_make_request
+
+    make_batch_request = getattr(provider, 'make_batch_request', None)
+    if make_batch_request is not None and hasattr(backup, 'make_batch_request'):
+        def hedged_make_batch_request(requests):
+            if any(method not in READ_METHODS for method, _ in requests):
+                return make_batch_request(requests)
+            return hedged(make_batch_request, backup.make_batch_request, True, requests)
+
+        provider.make_batch_request = hedged_make_batch_request
+    return provider
@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+"""
+Crash-safe transaction journal for the EVM Wallet Manager.
+Every signed raw transaction is appended (and fsynced) before broadcast,
+and every later state change is appended after it, so an interrupted run
+can be reconciled against the chain without sending any payment twice.
+"""
+
+import os
+import json
+import time
+import threading
+from web3.exceptions import TransactionNotFound
+from config import JOURNAL_SYNC_EVERY, JOURNAL_SYNC_INTERVAL
+from rpc import get_web3_connection
+from state import record_transaction, update_transaction, get_transaction, get_replacement_chain
+from txwatch import find_receipt, wait_for_receipt, receipt_hash, is_cancel
+
+
+# Item states, in the order they can be reached
+PLANNED = 'planned'
+SIGNED = 'signed'
+BROADCAST = 'broadcast'
+CONFIRMED = 'confirmed'
+CANCELLED = 'cancelled'
+FAILED = 'failed'
+CONFLICT = 'conflict'
+SKIPPED = 'skipped'
+
+# CANCELLED is left out: the nonce was consumed by a cancel, but the payment still has to be made
+FINAL_STATES = (CONFIRMED, FAILED, CONFLICT, SKIPPED)
+
+
+def open_journal(path):
+    """Open a journal file for appending and return its handle."""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    return {
+        'path': path,
+        'file': open(path, 'a', encoding='utf-8'),
+        'lock': threading.Lock(),
+        'unsynced': 0,
+        'last_sync': time.monotonic(),
+    }
+
+
+def _sync_locked(journal):
+    journal['file'].flush()
+    os.fsync(journal['file'].fileno())
+    journal['unsynced'] = 0
+    journal['last_sync'] = time.monotonic()
+
+
+def append_entry(journal, item_id, event, sync=False, **fields):
+    """Append one state change for an item.
+
+    Entries are fsynced in groups (every JOURNAL_SYNC_EVERY entries or
+    JOURNAL_SYNC_INTERVAL seconds); pass sync=True to make this entry and
+    everything before it durable immediately.
+    """
+    entry = {'id': item_id, 'event': event, 'ts': time.time()}
+    entry.update({k: v for k, v in fields.items() if v is not None})
+    line = json.dumps(entry, separators=(',', ':')) + "\n"
+    with journal['lock']:
+        journal['file'].write(line)
+        journal['unsynced'] += 1
+        if (sync or journal['unsynced'] >= JOURNAL_SYNC_EVERY
+                or time.monotonic() - journal['last_sync'] >= JOURNAL_SYNC_INTERVAL):
+            _sync_locked(journal)
+    return entry
+
+
+def sync_journal(journal):
+    """Make every appended entry durable."""
+    with journal['lock']:
+        if journal['unsynced']:
+            _sync_locked(journal)
+
+
+def close_journal(journal):
+    """Sync and close a journal."""
+    sync_journal(journal)
+    journal['file'].close()
+
+
+def read_journal(path):
+    """Read all entries, ignoring a torn final line from a crash mid-write."""
+    entries = []
+    if not os.path.exists(path):
+        return entries
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                entries.append(json.loads(line))
+            except ValueError:
+                break
+    return entries
+
+
+def fold_journal(entries):
+    """Fold entries into the latest state of each item, in first-seen order."""
+    items = {}
+    for entry in entries:
+        item = items.setdefault(entry['id'], {'id': entry['id']})
+        item.update({k: v for k, v in entry.items() if k not in ('event', 'ts')})
+        if entry['event'] != 'error':
+            item['status'] = entry['event']
+        else:
+            item['last_error'] = entry.get('message')
+    return items
+
+
+def unfinished_items(path):
+    """Return items that were signed or broadcast but never reached a final state."""
+    items = fold_journal(read_journal(path))
+    return [item for item in items.values() if item.get('status') in (SIGNED, BROADCAST)]
+
+
+def record_receipt(journal, item, receipt):
+    """Journal and store a mined receipt for an item; a mined cancel of it is CANCELLED, not CONFIRMED."""
+    mined_status = CONFIRMED if receipt.status == 1 else FAILED
+    mined_hash = receipt_hash(receipt)
+    # A fee-bumped replacement, or the watcher's cancel, may have been mined instead of the journaled transaction
+    replaced = mined_hash != item['tx_hash']
+    status = CANCELLED if replaced and is_cancel(get_transaction(mined_hash)) else mined_status
+    append_entry(journal, item['id'], status, block=receipt.blockNumber,
+                 mined_hash=mined_hash if replaced else None)
+    update_transaction(mined_hash, mined_status, receipt.blockNumber)
+    if status == CANCELLED:
+        update_transaction(item['tx_hash'], CANCELLED)
+    item['status'] = status
+    return status
+
+
+def reconcile_item(journal, item, timeout=300):
+    """Bring one unfinished item to a final state without ever signing a new transaction.
+
+    The journaled raw transaction is re-broadcast only while its nonce is
+    still unused on chain, so a payment can never be made twice.
+    """
+    web3 = get_web3_connection(item['network'])
+    tx_hash = item['tx_hash']
+
+    receipt = find_receipt(web3, tx_hash)
+    if receipt is not None:
+        return record_receipt(journal, item, receipt)
+
+    replaced = len(get_replacement_chain(tx_hash)) > 1
+    if not replaced and (item['status'] == SIGNED or not _is_known(web3, tx_hash)):
+        chain_nonce = web3.eth.get_transaction_count(item['sender'], 'latest')
+        if chain_nonce > item['nonce']:
+            # The nonce was consumed by a different transaction; never re-sign
+            append_entry(journal, item['id'], CONFLICT, sync=True,
+                         message=f"nonce {item['nonce']} already used on chain")
+            update_transaction(tx_hash, CONFLICT)
+            item['status'] = CONFLICT
+            return CONFLICT
+
+        try:
+            web3.eth.send_raw_transaction(item['raw_tx'])
+        except Exception as e:
+            # "already known" means the node has it; anything else is retried on the next resume
+            if 'known' not in str(e).lower():
+                append_entry(journal, item['id'], 'error', message=str(e))
+                return item['status']
+        if item['status'] == SIGNED:
+            record_transaction(tx_hash, item['network'], item['sender'], item['recipient'],
+                               item['asset'], item['amount_raw'], item['nonce'], gas_price=item.get('gas_price'))
+        append_entry(journal, item['id'], BROADCAST)
+        item['status'] = BROADCAST
+
+    try:
+        receipt = wait_for_receipt(web3, tx_hash, timeout=timeout)
+    except Exception as e:
+        append_entry(journal, item['id'], 'error', message=f"receipt: {e}")
+        return item['status']
+    return record_receipt(journal, item, receipt)
+
+
+def _is_known(web3, tx_hash):
+    """Return True if the node knows the transaction (pending or mined)."""
+    try:
+        return web3.eth.get_transaction(tx_hash) is not None
+    except TransactionNotFound:
+        return False
+
+
+def resume_journal(path, timeout=300):
+    """Reconcile every unfinished item in a journal against the chain.
+
+    Returns {status: count} for the reconciled items.
+    """
+    items = unfinished_items(path)
+    results = {}
+    if not items:
+        return results
+
+    print(f"⏳ Reconciling {len(items)} unfinished transaction(s) from {path}...")
+    journal = open_journal(path)
+    try:
+        for item in items:
+            try:
+                status = reconcile_item(journal, item, timeout)
+            except Exception as e:
+                append_entry(journal, item['id'], 'error', message=str(e))
+                status = item['status']
+            results[status] = results.get(status, 0) + 1
+            print(f"  {item['id']}: {status} ({item['tx_hash']})")
+    finally:
+        close_journal(journal)
+    return results
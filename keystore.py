@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""
+Sharded Keystore
+Splits the encrypted keys into N shard files under one master key, so
+shards can be decrypted and their addresses derived in parallel, and a
+command can unlock only the shards holding the wallets it needs.
+"""
+
+import os
+import sys
+import json
+import base64
+import getpass
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+from eth_account import Account
+from config import KEYSTORE_FILE, KEYSTORE_DIR, KEYSTORE_SHARD_SIZE, KEYSTORE_WORKERS
+from crypto import derive_key_from_password, encrypt_with_key, decrypt_with_key, load_encrypted_file
+from state import key_hash
+
+
+MANIFEST_FILE = "manifest.json"
+CHECK_PLAINTEXT = "evm-wallet-keystore"
+
+# Known addresses for the current worker process (set once per process, not per shard)
+_worker_known_addresses = {}
+
+
+def iter_keys(decrypted_content):
+    """Yield (index, private_key) for every KEY_n=... line."""
+    for line in decrypted_content.strip().split('\n'):
+        if line.startswith('KEY_') and '=' in line:
+            key_name, private_key = line.split('=', 1)
+            yield int(key_name.replace('KEY_', '')), private_key
+
+
+def write_sharded_keystore(keys, directory, password, shard_size=KEYSTORE_SHARD_SIZE):
+    """Encrypt (index, private_key) pairs into shard files plus a manifest; returns the manifest."""
+    os.makedirs(directory, exist_ok=True)
+    key, salt = derive_key_from_password(password)
+    keys = sorted(keys)
+
+    shards = []
+    for number, start in enumerate(range(0, len(keys), shard_size), start=1):
+        chunk = keys[start:start + shard_size]
+        filename = f"shard-{number:05d}.dat"
+        content = "\n".join(f"KEY_{index}={private_key}" for index, private_key in chunk)
+        with open(os.path.join(directory, filename), 'wb') as f:
+            f.write(encrypt_with_key(content, key))
+        shards.append({
+            'file': filename,
+            'first_index': chunk[0][0],
+            'last_index': chunk[-1][0],
+            'count': len(chunk),
+        })
+
+    manifest = {
+        'version': 1,
+        'salt': base64.b64encode(salt).decode('ascii'),
+        'check': encrypt_with_key(CHECK_PLAINTEXT, key).decode('ascii'),
+        'shards': shards,
+    }
+    # The manifest is written last, so a half-written keystore is never picked up
+    tmp = os.path.join(directory, MANIFEST_FILE + '.tmp')
+    with open(tmp, 'w') as f:
+        json.dump(manifest, f, indent=1)
+    os.replace(tmp, os.path.join(directory, MANIFEST_FILE))
+    return manifest
+
+
+def read_manifest(directory):
+    """Read a sharded keystore manifest."""
+    with open(os.path.join(directory, MANIFEST_FILE)) as f:
+        return json.load(f)
+
+
+def unlock_master_key(manifest, password):
+    """Derive the master key once and check it against the manifest."""
+    key, _ = derive_key_from_password(password, base64.b64decode(manifest['salt']))
+    try:
+        if decrypt_with_key(manifest['check'].encode('ascii'), key) != CHECK_PLAINTEXT:
+            raise ValueError
+    except Exception:
+        raise ValueError("Wrong password for keystore")
+    return key
+
+
+def select_shards(manifest, indexes=None):
+    """Return the shards holding any of the given wallet indexes (all shards if None)."""
+    if indexes is None:
+        return list(manifest['shards'])
+    return [shard for shard in manifest['shards']
+            if any(shard['first_index'] <= index <= shard['last_index'] for index in indexes)]
+
+
+def _init_worker(known_addresses):
+    global _worker_known_addresses
+    _worker_known_addresses = known_addresses or {}
+
+
+def unlock_shard(path, key, indexes=None):
+    """Decrypt one shard and return (index, private_key, address) for its wanted keys."""
+    with open(path, 'rb') as f:
+        content = decrypt_with_key(f.read(), key)
+    records = []
+    for index, private_key in iter_keys(content):
+        if indexes is not None and index not in indexes:
+            continue
+        address = _worker_known_addresses.get(key_hash(private_key)) or Account.from_key(private_key).address
+        records.append((index, private_key, address))
+    return records
+
+
+def load_sharded_wallets(directory, password, indexes=None, known_addresses=None, workers=KEYSTORE_WORKERS):
+    """Unlock the needed shards in parallel and return wallets in the load_wallets() shape.
+
+    known_addresses ({key_hash: address}) skips derivation for wallets seen before.
+    """
+    manifest = read_manifest(directory)
+    key = unlock_master_key(manifest, password)
+    indexes = set(indexes) if indexes is not None else None
+    shards = select_shards(manifest, indexes)
+    paths = [os.path.join(directory, shard['file']) for shard in shards]
+
+    workers = min(workers or os.cpu_count() or 1, len(paths))
+    if workers <= 1:
+        _init_worker(known_addresses)
+        results = [unlock_shard(path, key, indexes) for path in paths]
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(known_addresses,)) as pool:
+            results = list(pool.map(unlock_shard, paths, [key] * len(paths), [indexes] * len(paths)))
+
+    wallets = {}
+    for records in results:
+        for index, private_key, address in records:
+            wallets[index] = {'private_key': private_key, 'address': address, 'account': None}
+    return dict(sorted(wallets.items()))
+
+
+def main():
+    """Main function to create or inspect a sharded keystore."""
+    parser = argparse.ArgumentParser(description="Create or inspect a sharded keystore")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    shard_parser = subparsers.add_parser('shard', help="Split an encrypted key file into shards")
+    shard_parser.add_argument('--input', default=KEYSTORE_FILE, help="Encrypted key file to split")
+    shard_parser.add_argument('--output', default=KEYSTORE_DIR, help="Keystore directory to create")
+    shard_parser.add_argument('--shard-size', type=int, default=KEYSTORE_SHARD_SIZE, help="Keys per shard")
+    info_parser = subparsers.add_parser('info', help="Show the shards of a keystore")
+    info_parser.add_argument('--dir', default=KEYSTORE_DIR, help="Keystore directory")
+    args = parser.parse_args()
+
+    print("🗝️  Sharded Keystore")
+    print("=" * 40)
+
+    if args.command == 'info':
+        manifest = read_manifest(args.dir)
+        total = sum(shard['count'] for shard in manifest['shards'])
+        print(f"{len(manifest['shards'])} shard(s), {total} key(s) in {args.dir}")
+        for shard in manifest['shards']:
+            print(f"  {shard['file']}: wallets {shard['first_index']}-{shard['last_index']} ({shard['count']} keys)")
+        return 0
+
+    if os.path.exists(os.path.join(args.output, MANIFEST_FILE)):
+        print(f"❌ {args.output} already contains a keystore")
+        return 1
+    if not os.path.exists(args.input):
+        print(f"❌ File {args.input} not found!")
+        return 1
+
+    password = getpass.getpass("🔐 Enter decryption password: ")
+    try:
+        keys = list(iter_keys(load_encrypted_file(args.input, password)))
+    except Exception as e:
+        print(f"❌ Failed to decrypt {args.input}: {e}")
+        return 1
+
+    manifest = write_sharded_keystore(keys, args.output, password, args.shard_size)
+    print(f"✅ {len(keys)} keys written to {len(manifest['shards'])} shard(s) in {args.output}")
+    print(f"ℹ️  The wallet manager now unlocks {args.output}; {args.input} can be moved to a backup")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -6,101 +6,87 @@ Manages multiple EVM wallets, shows balances, and executes transactions.
 
 import os
 import re
+import time
+import uuid
 import getpass
-from decimal import Decimal
-from web3 import Web3
+from decimal import Decimal, InvalidOperation
 from eth_account import Account
+from web3.exceptions import Web3RPCError
 from crypto import load_encrypted_file
-from config import ETHEREUM_RPC, BSC_RPC
+from keystore import MANIFEST_FILE, load_sharded_wallets
+from config import KEYSTORE_FILE, KEYSTORE_DIR, INTERACTIVE_JOURNAL_FILE, PREFLIGHT_ENABLED, TX_WATCH_ENABLED, METRICS_PORT, METRICS_HOST, METRICS_SUMMARY, TRACE_FILE, PROFILE_FILE, PROFILE_INTERVAL
+from metrics import start_metrics_server, print_metrics_summary
+from scheduler import rpc_priority
+from hedge import print_hedge_summary
+from breaker import print_open_circuits, print_breaker_summary
+from chains import CHAINS, get_chain, get_token, build_transfer
+from rpc import get_web3_connection
+from balances import fetch_all_balances, fetch_head_blocks, chain_asset_decimals, get_token_decimals, format_amount, to_base_units
+from portfolio import portfolio_from_balances, print_portfolio_summary
+from state import (
+    key_hash, load_known_addresses, save_wallets, save_balances, get_cached_balances,
+    allocate_nonce, release_nonce, record_transaction, get_transaction_history,
+)
+from journal import (
+    SIGNED, BROADCAST, CONFIRMED, CANCELLED, SKIPPED, open_journal, append_entry, close_journal, record_receipt, resume_journal,
+)
+from addresses import validate_address
+from dashboard import run_dashboard
+from alerts import get_alert_engine, observe_balances
+from preflight import preflight_transfers
+from txwatch import wait_for_receipt, start_tx_watcher, stop_tx_watcher
+from tracing import span, configure_tracing, start_sampling_profiler, stop_sampling_profiler
 
 
-# RPC URLs for different networks (using config file)
-RPC_URLS = {
-    'ethereum': ETHEREUM_RPC,
-    'bsc': BSC_RPC,
-}
-
-
-def get_web3_connection(network):
-    """Get a properly configured Web3 connection for the specified network."""
-    rpc_url = RPC_URLS.get(network)
-    if not rpc_url:
-        raise ValueError(f"Unknown network: {network}")
-    
-    web3 = Web3(Web3.HTTPProvider(rpc_url))
+def parse_wallets(decrypted_content, known_addresses=None, indexes=None):
+    """Parse the KEY_1=... format into wallets (ignore ADDR_ lines if present).
     
-    # For BSC (Proof of Authority chain), we handle POA middleware internally
-    # Modern web3.py handles this automatically in most cases
-    
-    return web3
-
-
-# Token contract addresses
-TOKEN_CONTRACTS = {
-    'ethereum': {
-        'USDT': '0xdAC17F958D2ee523a2206206994597C13D831ec7',
-        'USDC': '0xA0b86991c6218b36c1d19D4a2e9Eb0cE3606eB48',
-    },
-    'bsc': {
-        'USDT': '0x55d398326f99059fF775485246999027B3197955',
-        'USDC': '0x8AC76a51cc950d9822D68b83fE1Ad97B32Cd580d',
-    }
-}
-
-# ERC-20 ABI (minimal for balance and transfer)
-ERC20_ABI = [
-    {
-        "constant": True,
-        "inputs": [{"name": "_owner", "type": "address"}],
-        "name": "balanceOf",
-        "outputs": [{"name": "balance", "type": "uint256"}],
-        "type": "function"
-    },
-    {
-        "constant": True,
-        "inputs": [],
-        "name": "decimals",
-        "outputs": [{"name": "", "type": "uint8"}],
-        "type": "function"
-    },
-    {
-        "constant": False,
-        "inputs": [
-            {"name": "_to", "type": "address"},
-            {"name": "_value", "type": "uint256"}
-        ],
-        "name": "transfer",
-        "outputs": [{"name": "", "type": "bool"}],
-        "type": "function"
-    }
-]
+    known_addresses maps key fingerprints to addresses from the state store;
+    wallets found there skip address derivation and have 'account' set to None.
+    indexes, if given, limits parsing to those wallet numbers.
+    """
+    wallets = {}
+    for line in decrypted_content.strip().split('\n'):
+        if line.startswith('KEY_') and '=' in line:
+            key_name, private_key = line.split('=', 1)
+            index = int(key_name.replace('KEY_', ''))
+            if indexes is not None and index not in indexes:
+                continue
+            address = known_addresses.get(key_hash(private_key)) if known_addresses else None
+            account = None if address else Account.from_key(private_key)
+            wallets[index] = {
+                'private_key': private_key,
+                'address': address or account.address,
+                'account': account
+            }
+    return wallets
 
 
-def load_wallets():
-    """Load and decrypt wallets from env.dat file."""
-    if not os.path.exists("env.dat"):
-        print("❌ env.dat file not found!")
+def load_wallets(indexes=None):
+    """Load and decrypt wallets from the sharded keystore or the env.dat file.
+    
+    indexes, if given, unlocks only those wallets (and only the shards holding them).
+    """
+    sharded = os.path.exists(os.path.join(KEYSTORE_DIR, MANIFEST_FILE))
+    if not sharded and not os.path.exists(KEYSTORE_FILE):
+        print(f"❌ {KEYSTORE_FILE} file not found!")
         print("   Please run generator.py first to create encrypted wallets.")
         return None
     
     secret_key = getpass.getpass("🔐 Enter decryption password: ")
     
     try:
-        # Decrypt content using crypto module
-        decrypted_content = load_encrypted_file("env.dat", secret_key)
-        
-        # Parse the KEY_1=... format (ignore ADDR_ lines if present)
-        wallets = {}
-        for line in decrypted_content.strip().split('\n'):
-            if line.startswith('KEY_') and '=' in line:
-                key_name, private_key = line.split('=', 1)
-                index = int(key_name.replace('KEY_', ''))
-                account = Account.from_key(private_key)
-                wallets[index] = {
-                    'private_key': private_key,
-                    'address': account.address,
-                    'account': account
-                }
+        # Reuse addresses derived on earlier runs
+        known_addresses = load_known_addresses()
+        if sharded:
+            # Decrypt shards and derive addresses in parallel
+            wallets = load_sharded_wallets(KEYSTORE_DIR, secret_key, indexes, known_addresses)
+        else:
+            # Decrypt content using crypto module
+            decrypted_content = load_encrypted_file(KEYSTORE_FILE, secret_key)
+            wallets = parse_wallets(decrypted_content, known_addresses,
+                                    set(indexes) if indexes is not None else None)
+        save_wallets(wallets, replace=indexes is None)
         
         print(f"✅ Successfully loaded {len(wallets)} wallets")
         return wallets
@@ -111,35 +97,29 @@ def load_wallets():
 
 
 def is_valid_eth_address(address):
-    """Validate if address is a valid Ethereum address."""
-    if not address.startswith('0x'):
-        return False
-    if len(address) != 42:
-        return False
-    try:
-        int(address, 16)
-        return True
-    except ValueError:
-        return False
+    """Validate if address is a valid Ethereum address (including its EIP-55 checksum if mixed-case)."""
+    return validate_address(address)[1] is None
 
 
-def get_balance(web3, address, token_contract=None):
-    """Get balance for native token or ERC-20 token."""
-    try:
-        if token_contract is None:
-            # Native token (ETH/BNB)
-            balance_wei = web3.eth.get_balance(address)
-            balance_eth = web3.from_wei(balance_wei, 'ether')
-            return float(balance_eth)
-        else:
-            # ERC-20 token
-            balance_raw = token_contract.functions.balanceOf(address).call()
-            decimals = token_contract.functions.decimals().call()
-            balance = balance_raw / (10 ** decimals)
-            return balance
-    except Exception as e:
-        print(f"Error getting balance: {e}")
-        return 0.0
+def print_wallet_balances(balances, decimals):
+    """Print one wallet's balances on every configured chain."""
+    for network, chain in CHAINS.items():
+        chain_balances = balances[network]
+        native = chain['native']
+        print(f"  📈 {chain['name']}: {format_amount(chain_balances.get(native), decimals[network][native], 6)} {native}")
+        for symbol in chain['tokens']:
+            print(f"  💵 {chain['standard']}-{symbol}: {format_amount(chain_balances.get(symbol), decimals[network][symbol], 2)} {symbol}")
+
+
+def refresh_balances(addresses):
+    """Read balances on every chain and store them as last-known balances."""
+    blocks = fetch_head_blocks()
+    # Read at the heads just fetched, so the stored block numbers match the balances
+    balances = fetch_all_balances(addresses, block=blocks)
+    save_balances(balances, blocks)
+    print_open_circuits()
+    observe_balances(get_alert_engine(), balances)
+    return balances
 
 
 def show_all_balances(wallets):
@@ -147,36 +127,29 @@ def show_all_balances(wallets):
     print("\n💰 Wallet Balances Overview")
     print("=" * 80)
     
-    # Initialize Web3 connections
-    web3_eth = get_web3_connection('ethereum')
-    web3_bsc = get_web3_connection('bsc')
+    # Query every configured chain in parallel
+    decimals = {network: chain_asset_decimals(network) for network in CHAINS}
+    balances = refresh_balances([wallet['address'] for wallet in wallets.values()])
     
-    # Initialize token contracts
-    usdt_eth = web3_eth.eth.contract(address=TOKEN_CONTRACTS['ethereum']['USDT'], abi=ERC20_ABI)
-    usdc_eth = web3_eth.eth.contract(address=TOKEN_CONTRACTS['ethereum']['USDC'], abi=ERC20_ABI)
-    usdt_bsc = web3_bsc.eth.contract(address=TOKEN_CONTRACTS['bsc']['USDT'], abi=ERC20_ABI)
-    usdc_bsc = web3_bsc.eth.contract(address=TOKEN_CONTRACTS['bsc']['USDC'], abi=ERC20_ABI)
+    for index, wallet in wallets.items():
+        address = wallet['address']
+        print(f"\n🔑 Wallet {index}: {address}")
+        print_wallet_balances({network: balances[network][address] for network in CHAINS}, decimals)
+
+
+def show_cached_balances(wallets):
+    """Show last-known balances from the local state store, without any RPC calls."""
+    balances, blocks = get_cached_balances([wallet['address'] for wallet in wallets.values()], CHAINS)
+    decimals = {network: chain_asset_decimals(network) for network in CHAINS}
+    
+    print("\n💾 Last-Known Balances (offline)")
+    print("=" * 80)
+    print("As of blocks: " + ", ".join(f"{network} {blocks.get(network, 'n/a')}" for network in CHAINS))
     
     for index, wallet in wallets.items():
         address = wallet['address']
         print(f"\n🔑 Wallet {index}: {address}")
-        
-        # Get native token balances
-        eth_balance = get_balance(web3_eth, address)
-        bnb_balance = get_balance(web3_bsc, address)
-        
-        # Get ERC-20/BEP-20 token balances
-        usdt_eth_balance = get_balance(web3_eth, address, usdt_eth)
-        usdc_eth_balance = get_balance(web3_eth, address, usdc_eth)
-        usdt_bsc_balance = get_balance(web3_bsc, address, usdt_bsc)
-        usdc_bsc_balance = get_balance(web3_bsc, address, usdc_bsc)
-        
-        print(f"  📈 Ethereum: {eth_balance:.6f} ETH")
-        print(f"  💵 ERC20-USDT: {usdt_eth_balance:.2f} USDT")
-        print(f"  💵 ERC20-USDC: {usdc_eth_balance:.2f} USDC")
-        print(f"  📈 BSC: {bnb_balance:.6f} BNB")
-        print(f"  💵 BEP20-USDT: {usdt_bsc_balance:.2f} USDT")
-        print(f"  💵 BEP20-USDC: {usdc_bsc_balance:.2f} USDC")
+        print_wallet_balances({network: balances[network][address] for network in CHAINS}, decimals)
 
 
 def show_wallet_details(wallet, wallet_index):
@@ -185,122 +158,183 @@ def show_wallet_details(wallet, wallet_index):
     print(f"\n🔍 Wallet {wallet_index} Details: {address}")
     print("=" * 60)
     
-    # Initialize Web3 connections
-    web3_eth = get_web3_connection('ethereum')
-    web3_bsc = get_web3_connection('bsc')
-    
-    # Initialize token contracts
-    usdt_eth = web3_eth.eth.contract(address=TOKEN_CONTRACTS['ethereum']['USDT'], abi=ERC20_ABI)
-    usdc_eth = web3_eth.eth.contract(address=TOKEN_CONTRACTS['ethereum']['USDC'], abi=ERC20_ABI)
-    usdt_bsc = web3_bsc.eth.contract(address=TOKEN_CONTRACTS['bsc']['USDT'], abi=ERC20_ABI)
-    usdc_bsc = web3_bsc.eth.contract(address=TOKEN_CONTRACTS['bsc']['USDC'], abi=ERC20_ABI)
-    
-    # Get balances
-    balances = {
-        'ETH': get_balance(web3_eth, address),
-        'BNB': get_balance(web3_bsc, address),
-        'USDT-ETH': get_balance(web3_eth, address, usdt_eth),
-        'USDC-ETH': get_balance(web3_eth, address, usdc_eth),
-        'USDT-BSC': get_balance(web3_bsc, address, usdt_bsc),
-        'USDC-BSC': get_balance(web3_bsc, address, usdc_bsc),
-    }
+    decimals = {network: chain_asset_decimals(network) for network in CHAINS}
+    balances = refresh_balances([address])
     
     print("💰 Balances:")
-    print(f"  ETH: {balances['ETH']:.6f}")
-    print(f"  BNB: {balances['BNB']:.6f}")
-    print(f"  USDT (Ethereum): {balances['USDT-ETH']:.2f}")
-    print(f"  USDC (Ethereum): {balances['USDC-ETH']:.2f}")
-    print(f"  USDT (BSC): {balances['USDT-BSC']:.2f}")
-    print(f"  USDC (BSC): {balances['USDC-BSC']:.2f}")
+    print_wallet_balances({network: balances[network][address] for network in CHAINS}, decimals)
+
+
+def show_portfolio_summary(wallets):
+    """Show exact per-asset totals and top holders across all wallets."""
+    balances = refresh_balances([wallet['address'] for wallet in wallets.values()])
+    print_portfolio_summary(portfolio_from_balances(balances))
 
 
-def execute_transaction(wallet, network, token_type, recipient, amount):
-    """Execute a transaction from the specified wallet."""
+def show_transaction_history(address=None, limit=20):
+    """Show sent transactions from the local state store."""
+    history = get_transaction_history(address, limit)
+    print("\n📜 Transaction History")
+    print("=" * 80)
+    if not history:
+        print("No transactions recorded yet")
+        return
+    
+    for tx in history:
+        chain = get_chain(tx['network'])
+        symbol = tx['asset']
+        if symbol == chain['native']:
+            decimals = chain['native_decimals']
+        else:
+            decimals = get_token_decimals(tx['network'], symbol, get_token(tx['network'], symbol)['address'])
+        sent_at = time.strftime('%Y-%m-%d %H:%M', time.localtime(tx['created_at']))
+        print(f"\n{sent_at}  {tx['status'].upper()}  {chain['name']} nonce {tx['nonce']}")
+        print(f"  {tx['sender']} → {tx['recipient']}")
+        print(f"  {format_amount(int(tx['amount_raw']), decimals, 6)} {symbol}  Block: {tx['block'] or 'pending'}")
+        print(f"  Hash: {tx['tx_hash']}")
+        if tx['replaces']:
+            print(f"  Replaces: {tx['replaces']}")
+
+
+def to_raw_amount(chain, token_type, amount):
+    """Convert a token amount to raw base units using registry decimals (ValueError if it is finer than that)."""
+    if token_type.upper() == chain['native']:
+        decimals = chain['native_decimals']
+    else:
+        token = get_token(chain['network'], token_type)
+        decimals = get_token_decimals(chain['network'], token_type.upper(), token['address'])
+    return to_base_units(amount, decimals)
+
+
+def execute_transaction(wallet, network, token_type, recipient, amount, journal_file=INTERACTIVE_JOURNAL_FILE):
+    """Execute a transaction from the specified wallet, journaled in journal_file."""
     print(f"\n🚀 Executing Transaction")
     print("=" * 40)
     
     try:
-        if network.lower() == 'ethereum':
-            web3 = get_web3_connection('ethereum')
-        elif network.lower() == 'bsc':
-            web3 = get_web3_connection('bsc')
-        else:
-            print("❌ Invalid network. Use 'ethereum' or 'bsc'")
+        chain = get_chain(network)
+        if chain is None:
+            print(f"❌ Invalid network. Use one of: {', '.join(CHAINS)}")
+            return False
+        
+        if token_type.upper() != chain['native'] and not get_token(chain['network'], token_type):
+            print(f"❌ Token {token_type} not supported on {network}")
             return False
         
+        web3 = get_web3_connection(chain['network'])
         from_address = wallet['address']
-        account = wallet['account']
         
         print(f"From: {from_address}")
         print(f"To: {recipient}")
         print(f"Amount: {amount} {token_type}")
         print(f"Network: {network}")
         
-        # Get current gas price
-        gas_price = web3.eth.gas_price
-        
-        if token_type.upper() in ['ETH', 'BNB']:
-            # Native token transfer
-            amount_wei = web3.to_wei(amount, 'ether')
+        with span('execute_transaction', network=chain['network'], token=token_type.upper(),
+                  sender=from_address, recipient=recipient) as tx_attributes, rpc_priority('send'):
+            # Get current gas price
+            with span('fee_lookup'):
+                gas_price = web3.eth.gas_price
             
-            transaction = {
-                'to': recipient,
-                'value': amount_wei,
-                'gas': 21000,
-                'gasPrice': gas_price,
-                'nonce': web3.eth.get_transaction_count(from_address),
-                'chainId': web3.eth.chain_id
-            }
+            amount_raw = to_raw_amount(chain, token_type, amount)
             
-        else:
-            # ERC-20/BEP-20 token transfer
-            token_address = TOKEN_CONTRACTS[network.lower()].get(token_type.upper())
-            if not token_address:
-                print(f"❌ Token {token_type} not supported on {network}")
-                return False
+            # Simulate before a nonce is allocated, so a failing transfer costs neither gas nor a nonce
+            if PREFLIGHT_ENABLED:
+                with span('preflight'):
+                    check = preflight_transfers(chain['network'], [{
+                        'sender': from_address, 'recipient': recipient,
+                        'asset': token_type.upper(), 'amount_raw': amount_raw,
+                    }], gas_price)[0]
+                if not check['ok']:
+                    print(f"❌ Pre-flight check failed: {check['error']}")
+                    tx_attributes['outcome'] = 'preflight_failed'
+                    return False
             
-            token_contract = web3.eth.contract(address=token_address, abi=ERC20_ABI)
-            decimals = token_contract.functions.decimals().call()
-            amount_wei = int(amount * (10 ** decimals))
+            with span('nonce_lookup'):
+                nonce = allocate_nonce(from_address, chain['network'],
+                                       web3.eth.get_transaction_count(from_address, 'pending'))
             
-            transaction = {
-                'to': token_address,
-                'value': 0,
-                'gas': 100000,
-                'gasPrice': gas_price,
-                'nonce': web3.eth.get_transaction_count(from_address),
-                'data': token_contract.functions.transfer(recipient, amount_wei).build_transaction({
-                    'gas': 100000,
-                    'gasPrice': gas_price,
-                })['data'],
-                'chainId': web3.eth.chain_id
-            }
-        
-        # Sign and send transaction
-        signed_txn = web3.eth.account.sign_transaction(transaction, wallet['private_key'])
-        
-        print("\n⚠️  TRANSACTION READY TO SEND")
-        print(f"Estimated gas fee: {web3.from_wei(gas_price * transaction['gas'], 'ether'):.8f} {token_type if token_type.upper() in ['ETH', 'BNB'] else 'ETH' if network.lower() == 'ethereum' else 'BNB'}")
-        
-        confirm = input("\n🔥 Send this transaction? (yes/no): ").lower().strip()
-        if confirm != 'yes':
-            print("❌ Transaction cancelled")
-            return False
-        
-        # Send transaction
-        tx_hash = web3.eth.send_raw_transaction(signed_txn.raw_transaction)
-        print(f"✅ Transaction sent! Hash: {tx_hash.hex()}")
-        
-        # Wait for confirmation
-        print("⏳ Waiting for confirmation...")
-        receipt = web3.eth.wait_for_transaction_receipt(tx_hash, timeout=300)
-        
-        if receipt.status == 1:
-            print(f"✅ Transaction confirmed! Block: {receipt.blockNumber}")
-            return True
-        else:
-            print("❌ Transaction failed!")
-            return False
+            sent = False
+            try:
+                with span('encode'):
+                    transaction = build_transfer(chain, token_type, recipient, amount_raw, nonce, gas_price)
+                
+                # Sign transaction
+                with span('sign'):
+                    signed_txn = web3.eth.account.sign_transaction(transaction, wallet['private_key'])
+                tx_hash_hex = web3.to_hex(signed_txn.hash)
+                
+                print("\n⚠️  TRANSACTION READY TO SEND")
+                print(f"Estimated gas fee: {web3.from_wei(gas_price * transaction['gas'], 'ether'):.8f} {chain['native']}")
+                
+                with span('confirm'):
+                    confirm = input("\n🔥 Send this transaction? (yes/no): ").lower().strip()
+                if confirm != 'yes':
+                    release_nonce(from_address, chain['network'], nonce)
+                    print("❌ Transaction cancelled")
+                    tx_attributes['outcome'] = 'cancelled'
+                    return False
+                
+                # Journal the signed transaction durably before it can reach the network
+                journal = open_journal(journal_file)
+                item_id = f"tx-{uuid.uuid4().hex[:12]}"
+                try:
+                    append_entry(journal, item_id, SIGNED, sync=True, network=chain['network'],
+                                 sender=from_address, recipient=recipient, asset=token_type.upper(),
+                                 amount_raw=str(amount_raw), nonce=nonce, gas_price=gas_price, tx_hash=tx_hash_hex,
+                                 raw_tx=web3.to_hex(signed_txn.raw_transaction))
+                
+                    # Send transaction
+                    with span('broadcast'):
+                        try:
+                            web3.eth.send_raw_transaction(signed_txn.raw_transaction)
+                        except Web3RPCError as e:
+                            # "already known": the node has it from an earlier attempt
+                            if 'known' not in str(e).lower():
+                                # The node answered and refused it: nothing was sent, the nonce is free again
+                                append_entry(journal, item_id, SKIPPED, sync=True, message=str(e))
+                                raise
+                        except Exception as e:
+                            # No answer (timeout, dropped connection): the node may have accepted it. The item
+                            # stays SIGNED and keeps its nonce, so the next start reconciles it by tx_hash
+                            append_entry(journal, item_id, 'error', sync=True, message=str(e))
+                            sent = True
+                            print(f"⚠️  Broadcast of {tx_hash_hex} unconfirmed; it is checked on the next start")
+                            raise
+                    sent = True
+                    tx_attributes['tx_hash'] = tx_hash_hex
+                    record_transaction(tx_hash_hex, chain['network'], from_address, recipient,
+                                       token_type.upper(), amount_raw, nonce, gas_price=gas_price)
+                    append_entry(journal, item_id, BROADCAST)
+                    print(f"✅ Transaction sent! Hash: {tx_hash_hex}")
+                
+                    # Wait for confirmation
+                    print("⏳ Waiting for confirmation...")
+                    with span('receipt_wait'):
+                        receipt = wait_for_receipt(web3, tx_hash_hex, timeout=300)
+                
+                    tx_attributes['block'] = receipt.blockNumber
+                    status = record_receipt(journal, {'id': item_id, 'tx_hash': tx_hash_hex}, receipt)
+                finally:
+                    close_journal(journal)
+            except BaseException:
+                # Leaving before the transaction can have reached a node (Ctrl+C at the prompt, a journal
+                # error, a send the node rejected) gives the nonce back, so the lane never runs ahead of the chain
+                if not sent:
+                    release_nonce(from_address, chain['network'], nonce)
+                raise
+            
+            if status == CONFIRMED:
+                print(f"✅ Transaction confirmed! Block: {receipt.blockNumber}")
+                tx_attributes['outcome'] = 'confirmed'
+                return True
+            elif status == CANCELLED:
+                print(f"❌ Transaction was stuck and cancelled at block {receipt.blockNumber}; nothing was sent")
+                tx_attributes['outcome'] = 'cancelled'
+                return False
+            else:
+                print("❌ Transaction failed!")
+                tx_attributes['outcome'] = 'reverted'
+                return False
             
     except Exception as e:
         print(f"❌ Transaction error: {e}")
@@ -312,20 +346,52 @@ def main():
     print("💼 EVM Wallet Manager")
     print("=" * 50)
     
+    configure_tracing(TRACE_FILE)
+    profiler = start_sampling_profiler(PROFILE_INTERVAL) if PROFILE_FILE else None
+    
     # Load wallets
     wallets = load_wallets()
     if not wallets:
+        if profiler:
+            stop_sampling_profiler(profiler, PROFILE_FILE)
         return
     
+    # Finish any sends interrupted by a previous crash
+    try:
+        resume_journal(INTERACTIVE_JOURNAL_FILE, timeout=30)
+    except Exception as e:
+        print(f"⚠️  Could not reconcile transaction journal: {e}")
+    
+    # Replace transactions that stay pending too long
+    watcher = start_tx_watcher(wallets) if TX_WATCH_ENABLED else None
+    
+    try:
+        alerts = get_alert_engine()
+        if alerts:
+            print(f"🚨 {len(alerts['rules'])} balance alert rule(s) loaded")
+    except Exception as e:
+        print(f"⚠️  Could not load alert rules: {e}")
+    
+    if METRICS_PORT:
+        try:
+            start_metrics_server(METRICS_PORT, METRICS_HOST)
+            print(f"📊 Metrics available at http://{METRICS_HOST}:{METRICS_PORT}/metrics")
+        except OSError as e:
+            print(f"⚠️  Could not start metrics server: {e}")
+    
     while True:
         print("\n📋 Options:")
         print("1. Show all wallet balances")
         print("2. Show specific wallet details")
         print("3. Send transaction")
-        print("4. Exit")
+        print("4. Portfolio totals and top holders")
+        print("5. Transaction history")
+        print("6. Last-known balances (offline)")
+        print("7. Live balances (follows new blocks)")
+        print("8. Exit")
         
         try:
-            choice = input("\n👉 Choose option (1-4): ").strip()
+            choice = input("\n👉 Choose option (1-8): ").strip()
             
             if choice == '1':
                 show_all_balances(wallets)
@@ -357,10 +423,14 @@ def main():
                     
                     wallet = wallets[wallet_index]
                     
-                    print("\nNetworks: ethereum, bsc")
+                    print(f"\nNetworks: {', '.join(CHAINS)}")
                     network = input("👉 Enter network: ").strip()
                     
-                    print("\nTokens: ETH, BNB, USDT, USDC")
+                    chain = get_chain(network)
+                    if chain is None:
+                        print("❌ Invalid network")
+                        continue
+                    print(f"\nTokens: {', '.join([chain['native']] + list(chain['tokens']))}")
                     token_type = input("👉 Enter token type: ").strip()
                     
                     recipient = input("👉 Enter recipient address: ").strip()
@@ -368,28 +438,53 @@ def main():
                         print("❌ Invalid recipient address")
                         continue
                     
-                    amount = float(input("👉 Enter amount: ").strip())
+                    amount = Decimal(input("👉 Enter amount: ").strip())
                     if amount <= 0:
                         print("❌ Amount must be greater than 0")
                         continue
                     
                     execute_transaction(wallet, network, token_type, recipient, amount)
                     
-                except ValueError:
+                except (ValueError, InvalidOperation):
                     print("❌ Please enter valid values")
                     
             elif choice == '4':
+                show_portfolio_summary(wallets)
+                
+            elif choice == '5':
+                address = input("👉 Filter by address (blank for all): ").strip()
+                show_transaction_history(address or None)
+                
+            elif choice == '6':
+                show_cached_balances(wallets)
+                
+            elif choice == '7':
+                run_dashboard(wallets, alerts=get_alert_engine())
+                
+            elif choice == '8':
                 print("👋 Goodbye!")
                 break
                 
             else:
-                print("❌ Invalid choice. Please select 1-4.")
+                print("❌ Invalid choice. Please select 1-8.")
                 
         except KeyboardInterrupt:
             print("\n\n👋 Goodbye!")
             break
         except Exception as e:
             print(f"❌ Error: {e}")
+    
+    if watcher:
+        stop_tx_watcher(watcher)
+    
+    if METRICS_SUMMARY:
+        print_metrics_summary()
+        print_hedge_summary()
+        print_breaker_summary()
+    
+    if profiler:
+        samples = stop_sampling_profiler(profiler, PROFILE_FILE)
+        print(f"🔬 {samples} profiler samples written to {PROFILE_FILE}")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,265 @@
+#!/usr/bin/env python3
+"""
+RPC instrumentation for the EVM Wallet Manager.
+Records per-(network, endpoint, method) call counts, errors, bytes and
+latency histograms, and exposes them as Prometheus text or a summary table.
+"""
+
+import bisect
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse
+from singleflight import get_coalescing_stats
+
+
+# Latency histogram bucket upper bounds in seconds (Prometheus "le" labels)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Method label for JSON-RPC batch round trips; their items are counted under their own methods
+BATCH_METHOD = 'batch'
+
+_metrics = {}
+_lock = threading.Lock()
+
+
+def endpoint_label(rpc_url):
+    """Return a label for an RPC URL without path or query (which may hold API keys)."""
+    parsed = urlparse(rpc_url)
+    return parsed.netloc or parsed.path or rpc_url
+
+
+def _new_series():
+    return {
+        'calls': 0,
+        'errors': 0,
+        'bytes_sent': 0,
+        'bytes_received': 0,
+        'latency_sum': 0.0,
+        'buckets': [0] * (len(LATENCY_BUCKETS) + 1),
+    }
+
+
+def record_rpc(network, endpoint, method, latency, error=False, bytes_sent=0, bytes_received=0):
+    """Record one RPC call; a latency of None counts the call without timing it."""
+    key = (network, endpoint, method)
+    with _lock:
+        series = _metrics.get(key)
+        if series is None:
+            series = _metrics[key] = _new_series()
+        series['calls'] += 1
+        series['errors'] += 1 if error else 0
+        series['bytes_sent'] += bytes_sent
+        series['bytes_received'] += bytes_received
+        if latency is not None:
+            series['latency_sum'] += latency
+            series['buckets'][bisect.bisect_left(LATENCY_BUCKETS, latency)] += 1
+
+
+def get_metrics_snapshot():
+    """Return a copy of all recorded series keyed by (network, endpoint, method)."""
+    with _lock:
+        return {key: dict(series, buckets=list(series['buckets'])) for key, series in _metrics.items()}
+
+
+def reset_metrics():
+    """Clear all recorded series."""
+    with _lock:
+        _metrics.clear()
+
+
+def histogram_quantile(buckets, quantile):
+    """Estimate a latency quantile from histogram bucket counts."""
+    total = sum(buckets)
+    if total == 0:
+        return 0.0
+    rank = quantile * total
+    cumulative = 0
+    lower = 0.0
+    for index, count in enumerate(buckets):
+        upper = LATENCY_BUCKETS[index] if index < len(LATENCY_BUCKETS) else LATENCY_BUCKETS[-1]
+        if count and cumulative + count >= rank:
+            return lower + (upper - lower) * ((rank - cumulative) / count)
+        cumulative += count
+        lower = upper
+    return LATENCY_BUCKETS[-1]
+
+
+def endpoint_quantile(network, endpoint, quantile):
+    """Estimate a latency quantile across all methods of one endpoint."""
+    buckets = [0] * (len(LATENCY_BUCKETS) + 1)
+    with _lock:
+        for (series_network, series_endpoint, _), series in _metrics.items():
+            if series_network == network and series_endpoint == endpoint:
+                for index, count in enumerate(series['buckets']):
+                    buckets[index] += count
+    return histogram_quantile(buckets, quantile)
+
+
+def instrument_provider(provider, network):
+    """Wrap a provider's request functions so every call is recorded."""
+    endpoint = endpoint_label(getattr(provider, 'endpoint_uri', None) or str(provider))
+    sizes = threading.local()
+
+    encode_rpc_request = provider.encode_rpc_request
+    decode_rpc_response = provider.decode_rpc_response
+    make_request = provider.make_request
+
+    def counting_encode(method, params):
+        data = encode_rpc_request(method, params)
+        sizes.sent = len(data)
+        return data
+
+    def counting_decode(raw_response):
+        sizes.received = len(raw_response)
+        return decode_rpc_response(raw_response)
+
+    def instrumented_make_request(method, params):
+        sizes.sent = sizes.received = 0
+        error = True
+        started = time.perf_counter()
+        try:
+            response = make_request(method, params)
+            error = isinstance(response, dict) and 'error' in response
+            return response
+        finally:
+            record_rpc(network, endpoint, method, time.perf_counter() - started,
+                       error, sizes.sent, sizes.received)
+
+    provider.encode_rpc_request = counting_encode
+    provider.decode_rpc_response = counting_decode
+    provider.make_request = instrumented_make_request
+
+    make_batch_request = getattr(provider, 'make_batch_request', None)
+    if make_batch_request is not None:
+        encode_batch_rpc_request = getattr(provider, 'encode_batch_rpc_request', None)
+        if encode_batch_rpc_request is not None:
+            def counting_encode_batch(requests):
+                data = encode_batch_rpc_request(requests)
+                sizes.sent = len(data)
+                return data
+
+            provider.encode_batch_rpc_request = counting_encode_batch
+
+        def instrumented_make_batch_request(requests):
+            sizes.sent = sizes.received = 0
+            responses = None
+            started = time.perf_counter()
+            try:
+                responses = make_batch_request(requests)
+                return responses
+            finally:
+                # One round trip: its latency goes under the batch label, since no single method's
+                # latency is measurable, and each item gets its own error and share of the bytes
+                latency = time.perf_counter() - started
+                failed = not isinstance(responses, list)
+                record_rpc(network, endpoint, BATCH_METHOD, latency, failed)
+                if failed:
+                    responses = []
+                count = max(len(requests), 1)
+                for index, (method, _) in enumerate(requests):
+                    response = responses[index] if index < len(responses) else None
+                    record_rpc(network, endpoint, method, None,
+                               not isinstance(response, dict) or 'error' in response,
+                               sizes.sent // count + (index < sizes.sent % count),
+                               sizes.received // count + (index < sizes.received % count))
+
+        provider.make_batch_request = instrumented_make_batch_request
+
+    return provider
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def render_prometheus():
+    """Render all metrics in the Prometheus text exposition format."""
+    snapshot = get_metrics_snapshot()
+    lines = []
+
+    counters = [
+        ('wallet_rpc_requests_total', 'calls', 'Total RPC calls'),
+        ('wallet_rpc_errors_total', 'errors', 'Total RPC calls that failed'),
+        ('wallet_rpc_request_bytes_total', 'bytes_sent', 'Total RPC request bytes'),
+        ('wallet_rpc_response_bytes_total', 'bytes_received', 'Total RPC response bytes'),
+    ]
+    for name, field, help_text in counters:
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} counter")
+        for (network, endpoint, method), series in sorted(snapshot.items()):
+            labels = f'network="{_escape(network)}",endpoint="{_escape(endpoint)}",method="{_escape(method)}"'
+            lines.append(f"{name}{{{labels}}} {series[field]}")
+
+    name = 'wallet_rpc_latency_seconds'
+    lines.append(f"# HELP {name} RPC call latency")
+    lines.append(f"# TYPE {name} histogram")
+    for (network, endpoint, method), series in sorted(snapshot.items()):
+        labels = f'network="{_escape(network)}",endpoint="{_escape(endpoint)}",method="{_escape(method)}"'
+        timed = sum(series['buckets'])
+        if not timed:
+            continue
+        cumulative = 0
+        for bound, count in zip(LATENCY_BUCKETS, series['buckets']):
+            cumulative += count
+            lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+        lines.append(f'{name}_bucket{{{labels},le="+Inf"}} {timed}')
+        lines.append(f"{name}_sum{{{labels}}} {series['latency_sum']:.6f}")
+        lines.append(f"{name}_count{{{labels}}} {timed}")
+
+    return "\n".join(lines) + "\n"
+
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    """Serves /metrics in Prometheus text format."""
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        if self.path.split('?', 1)[0] not in ('/', '/metrics'):
+            self.send_error(404)
+            return
+        data = render_prometheus().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+def start_metrics_server(port, host='127.0.0.1'):
+    """Serve Prometheus metrics on a local port from a background thread."""
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server
+
+
+def print_metrics_summary():
+    """Print an end-of-run summary table of RPC activity."""
+    snapshot = get_metrics_snapshot()
+    if not snapshot:
+        return
+
+    print("\n📊 RPC Summary")
+    print("=" * 100)
+    print(f"{'Network':<10} {'Endpoint':<30} {'Method':<26} {'Calls':>7} {'Errors':>7} "
+          f"{'p50 ms':>8} {'p95 ms':>8} {'KB in':>8}")
+    print("-" * 100)
+    for (network, endpoint, method), series in sorted(snapshot.items()):
+        if any(series['buckets']):
+            p50 = f"{histogram_quantile(series['buckets'], 0.50) * 1000:.1f}"
+            p95 = f"{histogram_quantile(series['buckets'], 0.95) * 1000:.1f}"
+        else:
+            # Only ever sent inside batches, whose latency is under the batch label
+            p50 = p95 = '-'
+        print(f"{network:<10} {endpoint[:30]:<30} {method[:26]:<26} {series['calls']:>7} "
+              f"{series['errors']:>7} {p50:>8} {p95:>8} {series['bytes_received'] / 1024:>8.1f}")
+
+    coalescing = get_coalescing_stats()
+    shared = sum(stats['shared'] for stats in coalescing.values())
+    if shared:
+        requests = sum(stats['requests'] for stats in coalescing.values())
+        print(f"♻️  {shared} of {requests} read request(s) shared an identical in-flight call")
@@ -0,0 +1,352 @@
+#!/usr/bin/env python3
+"""
+Batch Payouts
+Sends every transfer listed in a CSV file through the transaction journal,
+so an interrupted batch can be re-run, even from an edited file, and never
+pays twice.
+
+CSV columns: wallet, network, token, recipient, amount, optional id
+"""
+
+import os
+import re
+import sys
+import csv
+import time
+import hashlib
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal, InvalidOperation
+from config import JOURNAL_DIR, JOURNAL_SYNC_EVERY, PREFLIGHT_ENABLED, TX_WATCH_ENABLED, PAYOUT_DUPLICATE_WINDOW
+from chains import CHAINS, get_chain, get_token, build_transfer
+from rpc import get_web3_connection
+from state import allocate_nonce, record_transaction, count_recent_transfers
+from journal import (
+    SIGNED, BROADCAST, CONFIRMED, CANCELLED, FINAL_STATES, open_journal, append_entry, sync_journal,
+    close_journal, read_journal, fold_journal, record_receipt, resume_journal,
+)
+from preflight import preflight_transfers
+from txwatch import wait_for_receipt, start_tx_watcher, stop_tx_watcher
+from main import load_wallets, is_valid_eth_address, to_raw_amount
+from scheduler import rpc_priority, bind_priority
+
+
+def batch_journal_path(filename, batch=None, journal_dir=JOURNAL_DIR):
+    """Return the journal path for a batch, named after --batch or the payout file's name.
+
+    The name, not the content, keys the journal, so editing the file (say, to
+    drop a row that failed pre-flight) keeps the batch's history.
+    """
+    name = batch or os.path.splitext(os.path.basename(filename))[0]
+    return os.path.join(journal_dir, f"batch-{re.sub(r'[^A-Za-z0-9_.-]', '_', name)}.jsonl")
+
+
+def payout_id(sender, network, recipient, token, amount_raw, occurrence):
+    """Return the identity of a payout row without an id column: what it pays, and which repeat it is."""
+    key = f"{sender.lower()}|{network}|{recipient.lower()}|{token}|{amount_raw}|{occurrence}"
+    return 'p-' + hashlib.sha256(key.encode('utf-8')).hexdigest()[:16]
+
+
+def payout_wallet_indexes(filename):
+    """Return the wallet numbers a payout file uses, so only their keystore shards are unlocked."""
+    indexes = set()
+    with open(filename, newline='') as f:
+        for row in csv.DictReader(f):
+            try:
+                indexes.add(int(row['wallet']))
+            except (KeyError, TypeError, ValueError):
+                continue
+    return indexes
+
+
+def read_payouts(filename, wallets):
+    """Read and validate payout rows; returns (rows, errors).
+
+    A row's id is its id column if the file has one, else payout_id() of its
+    transfer, so ids survive rows being added, removed or reordered.
+    """
+    rows, errors = [], []
+    occurrences, ids = {}, set()
+    with open(filename, newline='') as f:
+        for line_number, row in enumerate(csv.DictReader(f), start=2):
+            try:
+                index = int(row['wallet'])
+                chain = get_chain(row['network'].strip())
+                token = row['token'].strip().upper()
+                recipient = row['recipient'].strip()
+                amount = Decimal(row['amount'].strip())
+            except (KeyError, AttributeError, ValueError, InvalidOperation) as e:
+                errors.append(f"line {line_number}: unreadable row ({e})")
+                continue
+
+            if index not in wallets:
+                errors.append(f"line {line_number}: unknown wallet {index}")
+            elif chain is None:
+                errors.append(f"line {line_number}: unknown network {row['network']}")
+            elif token != chain['native'] and not get_token(chain['network'], token):
+                errors.append(f"line {line_number}: token {token} not supported on {chain['network']}")
+            elif not is_valid_eth_address(recipient):
+                errors.append(f"line {line_number}: invalid recipient {recipient}")
+            elif amount <= 0:
+                errors.append(f"line {line_number}: amount must be positive")
+            else:
+                try:
+                    amount_raw = to_raw_amount(chain, token, amount)
+                except ValueError as e:
+                    errors.append(f"line {line_number}: {e}")
+                    continue
+                sender = wallets[index]['address']
+                transfer = (sender.lower(), chain['network'], recipient.lower(), token, amount_raw)
+                occurrences[transfer] = occurrences.get(transfer, 0) + 1
+                row_id = (row.get('id') or '').strip() or payout_id(sender, chain['network'], recipient, token,
+                                                                    amount_raw, occurrences[transfer])
+                if row_id in ids:
+                    errors.append(f"line {line_number}: duplicate id {row_id}")
+                    continue
+                ids.add(row_id)
+                rows.append({
+                    'id': row_id,
+                    'line': line_number,
+                    'wallet': wallets[index],
+                    'chain': chain,
+                    'token': token,
+                    'recipient': recipient,
+                    'amount': amount,
+                    'amount_raw': amount_raw,
+                })
+    return rows, errors
+
+
+def unsent_rows(rows, path):
+    """Return the rows a batch journal has no record of, plus those whose transaction was cancelled."""
+    done = fold_journal(read_journal(path))
+    return [row for row in rows if row['id'] not in done or done[row['id']]['status'] == CANCELLED]
+
+
+def already_sent_rows(rows, since):
+    """Return the rows matching a pending or confirmed transfer in the state store sent at or after since.
+
+    Catches a batch whose journal is gone or was started under another name;
+    n identical rows are matched against n recorded transfers.
+    """
+    remaining, duplicates = {}, []
+    for row in rows:
+        transfer = (row['chain']['network'], row['wallet']['address'], row['recipient'], row['token'],
+                    row['amount_raw'])
+        key = tuple(str(part).lower() for part in transfer)
+        if key not in remaining:
+            remaining[key] = count_recent_transfers(*transfer, since)
+        if remaining[key]:
+            remaining[key] -= 1
+            duplicates.append(row)
+    return duplicates
+
+
+def preflight_rows(rows, gas_prices):
+    """Simulate every row at one block per network; returns (passing rows, [(row, error)])."""
+    by_network = {}
+    for row in rows:
+        row['amount_raw'] = to_raw_amount(row['chain'], row['token'], row['amount'])
+        by_network.setdefault(row['chain']['network'], []).append(row)
+
+    def check(network):
+        web3 = get_web3_connection(network)
+        gas_prices[network] = web3.eth.gas_price
+        transfers = [{'sender': row['wallet']['address'], 'recipient': row['recipient'],
+                      'asset': row['token'], 'amount_raw': row['amount_raw']} for row in by_network[network]]
+        return preflight_transfers(network, transfers, gas_prices[network])
+
+    failed = []
+    with ThreadPoolExecutor(max_workers=len(by_network)) as pool:
+        for network, results in zip(by_network, pool.map(bind_priority(check), by_network)):
+            for row, result in zip(by_network[network], results):
+                if not result['ok']:
+                    failed.append((row, result['error']))
+    failed_ids = {row['id'] for row, _ in failed}
+    return [row for row in rows if row['id'] not in failed_ids], failed
+
+
+def sign_group(journal, group, gas_prices, chain_nonces):
+    """Sign a group of rows and journal them with a single fsync; returns the signed items."""
+    items = []
+    for row in group:
+        chain = row['chain']
+        network = chain['network']
+        sender = row['wallet']['address']
+        web3 = get_web3_connection(network)
+
+        if network not in gas_prices:
+            gas_prices[network] = web3.eth.gas_price
+        if (sender, network) not in chain_nonces:
+            chain_nonces[(sender, network)] = web3.eth.get_transaction_count(sender, 'pending')
+        nonce = allocate_nonce(sender, network, chain_nonces[(sender, network)])
+
+        amount_raw = row.get('amount_raw') or to_raw_amount(chain, row['token'], row['amount'])
+        transaction = build_transfer(chain, row['token'], row['recipient'], amount_raw, nonce, gas_prices[network])
+        signed_txn = web3.eth.account.sign_transaction(transaction, row['wallet']['private_key'])
+
+        item = {
+            'id': row['id'],
+            'network': network,
+            'sender': sender,
+            'recipient': row['recipient'],
+            'asset': row['token'],
+            'amount_raw': str(amount_raw),
+            'nonce': nonce,
+            'tx_hash': web3.to_hex(signed_txn.hash),
+            'raw_tx': web3.to_hex(signed_txn.raw_transaction),
+            'gas_price': gas_prices[network],
+        }
+        append_entry(journal, item['id'], SIGNED, **{k: v for k, v in item.items() if k != 'id'})
+        item['status'] = SIGNED
+        items.append(item)
+
+    # Nothing in this group reaches the network until all of it is durable
+    sync_journal(journal)
+    return items
+
+
+def broadcast_items(journal, items):
+    """Broadcast signed items; failures stay SIGNED so a re-run re-sends the same bytes."""
+    for item in items:
+        web3 = get_web3_connection(item['network'])
+        try:
+            web3.eth.send_raw_transaction(item['raw_tx'])
+        except Exception as e:
+            append_entry(journal, item['id'], 'error', message=str(e))
+            print(f"  ❌ {item['id']}: broadcast failed: {e}")
+            continue
+        record_transaction(item['tx_hash'], item['network'], item['sender'], item['recipient'],
+                           item['asset'], item['amount_raw'], item['nonce'], gas_price=item['gas_price'])
+        append_entry(journal, item['id'], BROADCAST)
+        item['status'] = BROADCAST
+        print(f"  ✅ {item['id']}: sent {item['tx_hash']}")
+
+
+def wait_for_items(journal, items, timeout):
+    """Wait for receipts of broadcast items and journal the outcome."""
+    for item in items:
+        if item['status'] != BROADCAST:
+            continue
+        web3 = get_web3_connection(item['network'])
+        try:
+            receipt = wait_for_receipt(web3, item['tx_hash'], timeout=timeout)
+        except Exception as e:
+            append_entry(journal, item['id'], 'error', message=f"receipt: {e}")
+            continue
+        record_receipt(journal, item, receipt)
+
+
+def print_batch_status(path):
+    """Print a per-status count of every item in a batch journal."""
+    counts = {}
+    for item in fold_journal(read_journal(path)).values():
+        counts[item['status']] = counts.get(item['status'], 0) + 1
+    print("\n📋 Batch status: " + ", ".join(f"{status} {count}" for status, count in sorted(counts.items())))
+    unfinished = sum(count for status, count in counts.items() if status not in FINAL_STATES)
+    if unfinished:
+        print(f"⚠️  {unfinished} item(s) unfinished; run the same file again to resume")
+
+
+def main():
+    """Main function to send a batch of payouts."""
+    parser = argparse.ArgumentParser(description="Send a batch of payouts from a CSV file (resumable)")
+    parser.add_argument('file', help="CSV with columns: wallet, network, token, recipient, amount, optional id")
+    parser.add_argument('--batch', help="Batch name keying the journal (default: the file name without extension)")
+    parser.add_argument('--allow-repeats', action='store_true',
+                        help="Send rows even if the same transfer was sent in the last PAYOUT_DUPLICATE_WINDOW seconds")
+    parser.add_argument('--timeout', type=int, default=300, help="Seconds to wait for each receipt")
+    parser.add_argument('--group-size', type=int, default=JOURNAL_SYNC_EVERY,
+                        help="Transactions signed per journal fsync")
+    args = parser.parse_args()
+
+    print("📦 Batch Payouts")
+    print("=" * 50)
+
+    wallets = load_wallets(payout_wallet_indexes(args.file))
+    if not wallets:
+        return 1
+
+    rows, errors = read_payouts(args.file, wallets)
+    if errors:
+        print("❌ Invalid payout file, nothing was sent:")
+        for error in errors:
+            print(f"  - {error}")
+        return 1
+
+    path = batch_journal_path(args.file, args.batch)
+
+    # Reconcile anything a previous run signed or broadcast before going further
+    resume_journal(path, timeout=args.timeout)
+    rows = unsent_rows(rows, path)
+    if not rows:
+        print("✅ Every payout in this file has already been processed")
+        print_batch_status(path)
+        return 0
+
+    # The journal only knows this batch; the state store knows every transfer sent from these wallets
+    if not args.allow_repeats:
+        repeats = already_sent_rows(rows, time.time() - PAYOUT_DUPLICATE_WINDOW)
+        if repeats:
+            print(f"⚠️  {len(repeats)} payout(s) match a transfer already sent and will be skipped "
+                  f"(--allow-repeats to send them anyway):")
+            for row in repeats:
+                print(f"  - line {row['line']}: {row['amount']} {row['token']} to {row['recipient']}")
+            repeat_ids = {row['id'] for row in repeats}
+            rows = [row for row in rows if row['id'] not in repeat_ids]
+        if not rows:
+            print("✅ Nothing left to send")
+            return 0
+
+    # Drop rows that would fail before any nonce is allocated; they are not journaled, so a re-run retries them
+    gas_prices, chain_nonces = {}, {}
+    if PREFLIGHT_ENABLED:
+        print(f"🧪 Simulating {len(rows)} payout(s)...")
+        rows, failed = preflight_rows(rows, gas_prices)
+        if failed:
+            print(f"⚠️  {len(failed)} payout(s) fail pre-flight and will be skipped this run:")
+            for row, error in failed:
+                print(f"  - line {row['line']}: {error}")
+        if not rows:
+            print("❌ No payouts left to send")
+            return 1
+
+    totals = {}
+    for row in rows:
+        key = (row['chain']['network'], row['token'])
+        totals[key] = totals.get(key, Decimal(0)) + row['amount']
+    print(f"\n{len(rows)} payout(s) to send (journal: {path}):")
+    for (network, token), total in sorted(totals.items()):
+        print(f"  {CHAINS[network]['name']}: {total} {token}")
+
+    confirm = input("\n🔥 Send these payouts? (yes/no): ").lower().strip()
+    if confirm != 'yes':
+        print("❌ Batch cancelled")
+        return 1
+
+    journal = open_journal(path)
+    watcher = start_tx_watcher(wallets) if TX_WATCH_ENABLED else None
+    sent = []
+    try:
+        with rpc_priority('send'):
+            for start in range(0, len(rows), max(args.group_size, 1)):
+                group = rows[start:start + max(args.group_size, 1)]
+                items = sign_group(journal, group, gas_prices, chain_nonces)
+                broadcast_items(journal, items)
+                sent.extend(items)
+
+        print("⏳ Waiting for confirmations...")
+        wait_for_items(journal, sent, args.timeout)
+    finally:
+        if watcher:
+            stop_tx_watcher(watcher)
+        close_journal(journal)
+
+    confirmed = sum(1 for item in sent if item['status'] == CONFIRMED)
+    print(f"\n✅ {confirmed}/{len(sent)} payout(s) confirmed")
+    print_batch_status(path)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,454 @@
+#!/usr/bin/env python3
+"""
+Persistent JSON-RPC connections (WebSocket and IPC) for the EVM Wallet Manager.
+One connection carries many concurrent requests, matched to responses by
+id, plus eth_subscribe streams; it reconnects and re-subscribes on its own.
+A quiet connection is pinged, and one that stays silent is dropped, so a
+half-open socket (NAT timeout, server gone without a FIN) is noticed.
+"""
+
+import os
+import ssl
+import json
+import base64
+import socket
+import time
+import struct
+import hashlib
+import itertools
+import threading
+from urllib.parse import urlparse
+
+
+WEBSOCKET_GUID = '258EAFA5-E914-47DA-95CA-C5AB0DC85B11'
+
+OPCODE_CONTINUATION = 0x0
+OPCODE_TEXT = 0x1
+OPCODE_BINARY = 0x2
+OPCODE_CLOSE = 0x8
+OPCODE_PING = 0x9
+OPCODE_PONG = 0xA
+
+
+def websocket_accept(key):
+    """Return the Sec-WebSocket-Accept value for a Sec-WebSocket-Key."""
+    return base64.b64encode(hashlib.sha1((key + WEBSOCKET_GUID).encode('ascii')).digest()).decode('ascii')
+
+
+def encode_frame(payload, opcode=OPCODE_TEXT, mask=True):
+    """Encode one final WebSocket frame (clients must mask, servers must not)."""
+    header = bytes([0x80 | opcode])
+    mask_bit = 0x80 if mask else 0
+    length = len(payload)
+    if length < 126:
+        header += bytes([mask_bit | length])
+    elif length < 1 << 16:
+        header += bytes([mask_bit | 126]) + struct.pack('!H', length)
+    else:
+        header += bytes([mask_bit | 127]) + struct.pack('!Q', length)
+    if not mask:
+        return header + payload
+    key = os.urandom(4)
+    return header + key + _apply_mask(payload, key)
+
+
+def _apply_mask(payload, key):
+    # XOR with the repeated 4-byte key, done as one big integer operation
+    repeated = (key * (len(payload) // 4 + 1))[:len(payload)]
+    return (int.from_bytes(payload, 'big') ^ int.from_bytes(repeated, 'big')).to_bytes(len(payload), 'big')
+
+
+def _read_exact(stream, count):
+    data = stream.read(count)
+    if len(data) != count:
+        raise ConnectionError("connection closed")
+    return data
+
+
+def read_frame(stream):
+    """Read one WebSocket frame from a buffered stream; returns (fin, opcode, payload)."""
+    first, second = _read_exact(stream, 2)
+    length = second & 0x7F
+    if length == 126:
+        length = struct.unpack('!H', _read_exact(stream, 2))[0]
+    elif length == 127:
+        length = struct.unpack('!Q', _read_exact(stream, 8))[0]
+    key = _read_exact(stream, 4) if second & 0x80 else None
+    payload = _read_exact(stream, length)
+    if key:
+        payload = _apply_mask(payload, key)
+    return bool(first & 0x80), first & 0x0F, payload
+
+
+class WebSocketTransport:
+    """Blocking WebSocket client transport (ws:// and wss://)."""
+
+    def __init__(self, uri, timeout):
+        parsed = urlparse(uri)
+        secure = parsed.scheme == 'wss'
+        port = parsed.port or (443 if secure else 80)
+        sock = socket.create_connection((parsed.hostname, port), timeout=timeout)
+        if secure:
+            sock = ssl.create_default_context().wrap_socket(sock, server_hostname=parsed.hostname)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.sock = sock
+        self.stream = sock.makefile('rb')
+        self.send_lock = threading.Lock()
+
+        key = base64.b64encode(os.urandom(16)).decode('ascii')
+        path = (parsed.path or '/') + (f'?{parsed.query}' if parsed.query else '')
+        request = (f"GET {path} HTTP/1.1\r\nHost: {parsed.netloc}\r\nUpgrade: websocket\r\n"
+                   f"Connection: Upgrade\r\nSec-WebSocket-Key: {key}\r\nSec-WebSocket-Version: 13\r\n\r\n")
+        sock.sendall(request.encode('ascii'))
+        status = self.stream.readline().decode('latin-1')
+        headers = {}
+        while True:
+            line = self.stream.readline().decode('latin-1').strip()
+            if not line:
+                break
+            name, _, value = line.partition(':')
+            headers[name.strip().lower()] = value.strip()
+        if ' 101 ' not in status or headers.get('sec-websocket-accept') != websocket_accept(key):
+            sock.close()
+            raise ConnectionError(f"WebSocket handshake failed: {status.strip()}")
+        # Reads block until a message arrives (a timeout would corrupt the buffered stream);
+        # request timeouts are handled by the caller and dead connections by RPCConnection's keepalive
+        sock.settimeout(None)
+        self.last_received = time.monotonic()
+
+    def send(self, data):
+        frame = encode_frame(data)
+        with self.send_lock:
+            self.sock.sendall(frame)
+
+    def ping(self):
+        with self.send_lock:
+            self.sock.sendall(encode_frame(b'keepalive', OPCODE_PING))
+
+    def abort(self):
+        """Unblock the reader by shutting the socket down (recv then fails)."""
+        try:
+            self.sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+
+    def recv(self):
+        message = b''
+        while True:
+            fin, opcode, payload = read_frame(self.stream)
+            self.last_received = time.monotonic()
+            if opcode == OPCODE_PING:
+                with self.send_lock:
+                    self.sock.sendall(encode_frame(payload, OPCODE_PONG))
+                continue
+            if opcode == OPCODE_PONG:
+                continue
+            if opcode == OPCODE_CLOSE:
+                raise ConnectionError("WebSocket closed by server")
+            message += payload
+            if fin:
+                return message
+
+    def close(self):
+        try:
+            with self.send_lock:
+                self.sock.sendall(encode_frame(b'', OPCODE_CLOSE))
+        except OSError:
+            pass
+        self.sock.close()
+
+
+class IPCTransport:
+    """Unix socket transport for a local node's IPC endpoint (a stream of JSON values).
+
+    Bytes are buffered as they arrive and a message is parsed only once it is
+    complete: at a newline (nodes end each message with one) or, for nodes
+    that do not, once the buffer ends a JSON value. Messages are decoded
+    whole, so a chunk ending mid-character is never decoded on its own.
+    """
+
+    def __init__(self, path, timeout):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(timeout)
+        sock.connect(path)
+        sock.settimeout(None)
+        self.sock = sock
+        self.send_lock = threading.Lock()
+        self.decoder = json.JSONDecoder()
+        self.buffer = bytearray()
+        self.scanned = 0  # newlines before this offset end lines that are not a complete message
+        self.last_received = time.monotonic()
+        self.pings = itertools.count(1)
+
+    def send(self, data):
+        with self.send_lock:
+            self.sock.sendall(data)
+
+    def ping(self):
+        # IPC has no control frames; any answer counts, and its id matches no caller
+        self.send(json.dumps({'jsonrpc': '2.0', 'id': f'keepalive-{next(self.pings)}',
+                              'method': 'net_version', 'params': []}).encode('utf-8'))
+
+    def abort(self):
+        """Unblock the reader by shutting the socket down (recv then fails)."""
+        try:
+            self.sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+
+    def recv(self):
+        while True:
+            message = self._pop_message()
+            if message is not None:
+                return message
+            chunk = self.sock.recv(1 << 16)
+            if not chunk:
+                raise ConnectionError("IPC connection closed")
+            self.last_received = time.monotonic()
+            self.buffer += chunk
+
+    def _pop_message(self):
+        """Remove and return the first complete message in the buffer, or None if more bytes are needed."""
+        while True:
+            newline = self.buffer.find(b'\n', self.scanned)
+            if newline < 0:
+                break
+            line = bytes(self.buffer[:newline]).strip()
+            if not line:
+                del self.buffer[:newline + 1]
+                self.scanned = 0
+                continue
+            try:
+                json.loads(line)
+            except ValueError:
+                # A value spanning lines; keep reading
+                self.scanned = newline + 1
+                continue
+            del self.buffer[:newline + 1]
+            self.scanned = 0
+            return line
+
+        # No newline: try only when the bytes so far end like a JSON value does
+        text = bytes(self.buffer).strip()
+        if text[-1:] not in (b'}', b']'):
+            return None
+        try:
+            decoded = text.decode('utf-8')
+            _, end = self.decoder.raw_decode(decoded)
+        except ValueError:
+            return None
+        message = decoded[:end].encode('utf-8')
+        self.buffer = bytearray(decoded[end:].encode('utf-8'))
+        self.scanned = 0
+        return message
+
+    def close(self):
+        self.sock.close()
+
+
+def open_transport(uri, timeout):
+    """Open a transport for a ws://, wss://, ipc:// URI or a plain IPC socket path."""
+    if uri.startswith(('ws://', 'wss://')):
+        return WebSocketTransport(uri, timeout)
+    if uri.startswith('ipc://'):
+        uri = uri[len('ipc://'):]
+    return IPCTransport(uri, timeout)
+
+
+class RPCConnection:
+    """A multiplexed, self-healing JSON-RPC connection.
+
+    Any number of threads can send requests at once; the reader thread
+    routes each response to its caller by id and each eth_subscription
+    notification to its callback. After a disconnect, pending calls fail,
+    the connection is re-opened with backoff and subscriptions are renewed.
+    """
+
+    def __init__(self, uri, timeout=30.0, max_reconnect_delay=10.0, keepalive_interval=15.0, keepalive_timeout=10.0):
+        self.uri = uri
+        self.timeout = timeout
+        self.max_reconnect_delay = max_reconnect_delay
+        self.keepalive_interval = keepalive_interval
+        self.keepalive_timeout = keepalive_timeout
+        self.stopped = threading.Event()
+        self.transport = None
+        self.connected = threading.Event()
+        self.closed = False
+        self.lock = threading.Lock()
+        self.pending = {}
+        self.subscriptions = {}
+        self.server_ids = {}
+        self.handles = itertools.count(1)
+        self.reconnects = 0
+
+        self.transport = open_transport(uri, timeout)
+        self.connected.set()
+        self.reader = threading.Thread(target=self._read_loop, name=f'rpc-reader-{uri}', daemon=True)
+        self.reader.start()
+        if keepalive_interval:
+            threading.Thread(target=self._keepalive_loop, name=f'rpc-keepalive-{uri}', daemon=True).start()
+
+    def request(self, data, ids, timeout=None):
+        """Send an encoded request (or batch) and return the raw response once every id is answered."""
+        timeout = self.timeout if timeout is None else timeout
+        if not self.connected.wait(timeout):
+            raise ConnectionError(f"Not connected to {self.uri}")
+
+        waiter = {'event': threading.Event(), 'raw': None, 'error': None}
+        with self.lock:
+            for request_id in ids:
+                self.pending[request_id] = waiter
+        try:
+            self.transport.send(data)
+            if not waiter['event'].wait(timeout):
+                raise TimeoutError(f"No response from {self.uri} within {timeout}s")
+        finally:
+            with self.lock:
+                for request_id in ids:
+                    if self.pending.get(request_id) is waiter:
+                        del self.pending[request_id]
+        if waiter['error'] is not None:
+            raise waiter['error']
+        return waiter['raw']
+
+    def subscribe(self, params, callback):
+        """Start an eth_subscribe stream; callback(result) runs on the reader thread for every event.
+
+        Returns a handle that stays valid across reconnects.
+        """
+        handle = next(self.handles)
+        subscription = {'params': list(params), 'callback': callback, 'server_id': None}
+        with self.lock:
+            self.subscriptions[handle] = subscription
+        self._send_subscribe(handle, subscription)
+        return handle
+
+    def unsubscribe(self, handle):
+        """Stop a subscription started with subscribe()."""
+        with self.lock:
+            subscription = self.subscriptions.pop(handle, None)
+            if subscription and subscription['server_id']:
+                self.server_ids.pop(subscription['server_id'], None)
+        if subscription and subscription['server_id'] and self.connected.is_set():
+            request_id = f'unsub-{handle}'
+            data = json.dumps({'jsonrpc': '2.0', 'id': request_id, 'method': 'eth_unsubscribe',
+                               'params': [subscription['server_id']]}).encode('utf-8')
+            try:
+                self.request(data, [request_id])
+            except (ConnectionError, TimeoutError, OSError):
+                pass
+
+    def close(self):
+        """Close the connection and stop reconnecting."""
+        self.closed = True
+        self.stopped.set()
+        self.connected.clear()
+        if self.transport:
+            self.transport.close()
+
+    def _send_subscribe(self, handle, subscription):
+        request_id = f'sub-{handle}-{self.reconnects}'
+        data = json.dumps({'jsonrpc': '2.0', 'id': request_id, 'method': 'eth_subscribe',
+                           'params': subscription['params']}).encode('utf-8')
+        response = json.loads(self.request(data, [request_id]))
+        if 'error' in response:
+            raise ValueError(f"eth_subscribe failed: {response['error']}")
+        with self.lock:
+            if self.subscriptions.get(handle) is subscription:
+                subscription['server_id'] = response['result']
+                self.server_ids[response['result']] = handle
+
+    def _route(self, raw):
+        message = json.loads(raw)
+        if isinstance(message, list):
+            request_id = next((item.get('id') for item in message if isinstance(item, dict)), None)
+        elif message.get('method') == 'eth_subscription':
+            params = message.get('params') or {}
+            with self.lock:
+                handle = self.server_ids.get(params.get('subscription'))
+                subscription = self.subscriptions.get(handle)
+            if subscription:
+                try:
+                    subscription['callback'](params.get('result'))
+                except Exception as e:
+                    print(f"⚠️  Subscription callback failed: {e}")
+            return
+        else:
+            request_id = message.get('id')
+
+        with self.lock:
+            waiter = self.pending.get(request_id)
+        if waiter:
+            waiter['raw'] = raw
+            waiter['event'].set()
+
+    def _fail_pending(self, error):
+        with self.lock:
+            waiters = list(self.pending.values())
+            self.pending.clear()
+            self.server_ids.clear()
+        for waiter in waiters:
+            waiter['error'] = error
+            waiter['event'].set()
+
+    def _read_loop(self):
+        delay = 0.5
+        while not self.closed:
+            try:
+                raw = self.transport.recv()
+            except (OSError, ValueError, ConnectionError) as e:
+                if self.closed:
+                    return
+                self.connected.clear()
+                self._fail_pending(ConnectionError(f"Connection to {self.uri} lost: {e}"))
+                self.transport.close()
+                self._reconnect(delay)
+                continue
+            try:
+                self._route(raw)
+            except ValueError:
+                continue
+
+    def _keepalive_loop(self):
+        """Ping after keepalive_interval of silence; drop the connection if nothing arrives keepalive_timeout later.
+
+        Dropping it makes the reader fail over to the usual reconnect and re-subscribe.
+        """
+        pinged = None
+        while not self.stopped.wait(min(self.keepalive_interval, self.keepalive_timeout) / 4):
+            if not self.connected.is_set():
+                continue
+            transport = self.transport
+            now = time.monotonic()
+            if pinged is not None and pinged[0] is transport and transport.last_received < pinged[1]:
+                if now - pinged[1] >= self.keepalive_timeout:
+                    transport.abort()
+                    pinged = None
+            elif now - transport.last_received >= self.keepalive_interval:
+                try:
+                    transport.ping()
+                    pinged = (transport, now)
+                except OSError:
+                    transport.abort()
+
+    def _reconnect(self, delay):
+        while not self.closed:
+            try:
+                self.transport = open_transport(self.uri, self.timeout)
+                break
+            except OSError:
+                threading.Event().wait(delay)
+                delay = min(delay * 2, self.max_reconnect_delay)
+        self.reconnects += 1
+        self.connected.set()
+        # Renew subscriptions from another thread, since their replies arrive on this one
+        threading.Thread(target=self._resubscribe, daemon=True).start()
+
+    def _resubscribe(self):
+        with self.lock:
+            subscriptions = list(self.subscriptions.items())
+        for handle, subscription in subscriptions:
+            try:
+                self._send_subscribe(handle, subscription)
+            except (ConnectionError, TimeoutError, ValueError, OSError) as e:
+                print(f"⚠️  Could not renew subscription on {self.uri}: {e}")
@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+"""
+Array-backed portfolio for the EVM Wallet Manager.
+Holds raw uint256 balances as a wallets x assets x limbs array of 32-bit
+limbs, so totals, filters and rankings are exact and vectorized.
+"""
+
+from decimal import Decimal
+import numpy as np
+from balances import chain_asset_decimals, to_base_units
+
+
+LIMB_BITS = 32
+LIMB_MASK = (1 << LIMB_BITS) - 1
+DEFAULT_LIMBS = 3  # 96 bits; grows automatically up to 8 limbs (uint256)
+MAX_LIMBS = 256 // LIMB_BITS
+
+
+def asset_id(network, symbol):
+    """Return the portfolio column name for an asset on a network."""
+    return f"{network}:{symbol}"
+
+
+def create_portfolio(addresses, assets, decimals, limbs=DEFAULT_LIMBS):
+    """Create an empty portfolio for the given addresses and assets.
+
+    decimals is a sequence with one entry per asset.
+    """
+    addresses = list(addresses)
+    assets = list(assets)
+    if len(decimals) != len(assets):
+        raise ValueError("decimals must have one entry per asset")
+    return {
+        'addresses': addresses,
+        'assets': assets,
+        'address_index': {address: i for i, address in enumerate(addresses)},
+        'asset_index': {asset: i for i, asset in enumerate(assets)},
+        'decimals': np.asarray(decimals, dtype=np.int64),
+        'limbs': np.zeros((len(addresses), len(assets), limbs), dtype=np.uint32),
+        'missing': np.zeros((len(addresses), len(assets)), dtype=bool),
+    }
+
+
+def _ensure_limbs(portfolio, bits):
+    """Grow the limb dimension so values of the given bit length fit."""
+    needed = max(1, -(-bits // LIMB_BITS))
+    if needed > MAX_LIMBS:
+        raise ValueError("balance does not fit in uint256")
+    current = portfolio['limbs'].shape[2]
+    if needed > current:
+        grown = np.zeros(portfolio['limbs'].shape[:2] + (needed,), dtype=np.uint32)
+        grown[:, :, :current] = portfolio['limbs']
+        portfolio['limbs'] = grown
+
+
+def _int_to_limbs(value, count):
+    return [(value >> (LIMB_BITS * k)) & LIMB_MASK for k in range(count)]
+
+
+def _limbs_to_int(limbs):
+    return sum(int(limb) << (LIMB_BITS * k) for k, limb in enumerate(limbs))
+
+
+def set_balance(portfolio, address, asset, raw):
+    """Set one raw balance (None marks it as missing)."""
+    row = portfolio['address_index'][address]
+    col = portfolio['asset_index'][asset]
+    if raw is None:
+        portfolio['missing'][row, col] = True
+        portfolio['limbs'][row, col, :] = 0
+        return
+    _ensure_limbs(portfolio, int(raw).bit_length())
+    portfolio['missing'][row, col] = False
+    portfolio['limbs'][row, col, :] = _int_to_limbs(int(raw), portfolio['limbs'].shape[2])
+
+
+def set_asset_column(portfolio, asset, raws):
+    """Set the raw balances of one asset for every wallet, in address order."""
+    col = portfolio['asset_index'][asset]
+    values = np.array([0 if raw is None else raw for raw in raws], dtype=object)
+    missing = np.array([raw is None for raw in raws], dtype=bool)
+    if len(values) != len(portfolio['addresses']):
+        raise ValueError("one balance per address is required")
+
+    largest = int(values.max()) if len(values) else 0
+    _ensure_limbs(portfolio, largest.bit_length())
+    count = portfolio['limbs'].shape[2]
+
+    if largest < (1 << 64):
+        # Fast path: split 64-bit values with vectorized bit operations
+        words = values.astype(np.uint64)
+        portfolio['limbs'][:, col, :] = 0
+        portfolio['limbs'][:, col, 0] = (words & np.uint64(LIMB_MASK)).astype(np.uint32)
+        if count > 1:
+            portfolio['limbs'][:, col, 1] = (words >> np.uint64(LIMB_BITS)).astype(np.uint32)
+    else:
+        for k in range(count):
+            portfolio['limbs'][:, col, k] = ((values >> (LIMB_BITS * k)) & LIMB_MASK).astype(np.uint32)
+    portfolio['missing'][:, col] = missing
+
+
+def portfolio_from_balances(balances):
+    """Build a portfolio from fetch_all_balances() output."""
+    assets = []
+    decimals = []
+    addresses = []
+    for network, by_address in balances.items():
+        network_decimals = chain_asset_decimals(network)
+        for symbol, asset_decimals in network_decimals.items():
+            assets.append(asset_id(network, symbol))
+            decimals.append(asset_decimals)
+        if not addresses:
+            addresses = list(by_address)
+
+    portfolio = create_portfolio(addresses, assets, decimals)
+    for network, by_address in balances.items():
+        for symbol in chain_asset_decimals(network):
+            set_asset_column(portfolio, asset_id(network, symbol),
+                             [by_address[address].get(symbol) for address in addresses])
+    return portfolio
+
+
+def get_raw_balance(portfolio, address, asset):
+    """Return one exact raw balance as a Python int (None if missing)."""
+    row = portfolio['address_index'][address]
+    col = portfolio['asset_index'][asset]
+    if portfolio['missing'][row, col]:
+        return None
+    return _limbs_to_int(portfolio['limbs'][row, col])
+
+
+def to_decimal(portfolio, asset, raw):
+    """Convert a raw amount of an asset to a Decimal in token units."""
+    decimals = int(portfolio['decimals'][portfolio['asset_index'][asset]])
+    return Decimal(raw).scaleb(-decimals)
+
+
+def to_raw(portfolio, asset, amount):
+    """Convert an amount in token units (str, int or Decimal) to a raw integer."""
+    decimals = int(portfolio['decimals'][portfolio['asset_index'][asset]])
+    return to_base_units(amount, decimals)
+
+
+def asset_totals(portfolio):
+    """Return {asset: exact raw total} across all wallets."""
+    # Each limb is < 2**32, so column sums fit in uint64 for up to 2**32 wallets
+    sums = portfolio['limbs'].sum(axis=0, dtype=np.uint64)
+    return {asset: _limbs_to_int(sums[col]) for asset, col in portfolio['asset_index'].items()}
+
+
+def _column(portfolio, asset):
+    return portfolio['limbs'][:, portfolio['asset_index'][asset], :]
+
+
+def compare_to(portfolio, asset, threshold_raw):
+    """Return (greater, equal) boolean masks of each wallet's balance against a raw threshold."""
+    column = _column(portfolio, asset)
+    count = column.shape[1]
+    if int(threshold_raw).bit_length() > count * LIMB_BITS:
+        return np.zeros(len(column), dtype=bool), np.zeros(len(column), dtype=bool)
+
+    threshold = _int_to_limbs(int(threshold_raw), count)
+    greater = np.zeros(len(column), dtype=bool)
+    equal = np.ones(len(column), dtype=bool)
+    for k in range(count - 1, -1, -1):
+        limb = column[:, k]
+        greater |= equal & (limb > threshold[k])
+        equal &= limb == threshold[k]
+    return greater, equal
+
+
+def wallets_above(portfolio, asset, amount, inclusive=False):
+    """Return indices of wallets holding more than amount (in token units) of an asset."""
+    greater, equal = compare_to(portfolio, asset, to_raw(portfolio, asset, amount))
+    mask = (greater | equal) if inclusive else greater
+    mask &= ~portfolio['missing'][:, portfolio['asset_index'][asset]]
+    return np.nonzero(mask)[0]
+
+
+def wallets_below(portfolio, asset, amount, inclusive=False):
+    """Return indices of wallets holding less than amount (in token units) of an asset."""
+    greater, equal = compare_to(portfolio, asset, to_raw(portfolio, asset, amount))
+    mask = ~greater if inclusive else ~(greater | equal)
+    mask &= ~portfolio['missing'][:, portfolio['asset_index'][asset]]
+    return np.nonzero(mask)[0]
+
+
+def approximate_balances(portfolio, asset):
+    """Return float64 approximations of an asset column (for fast pre-selection)."""
+    column = _column(portfolio, asset).astype(np.float64)
+    scale = np.float64(2.0) ** (LIMB_BITS * np.arange(column.shape[1]))
+    return column @ scale
+
+
+def sort_wallets(portfolio, asset, descending=True):
+    """Return wallet indices sorted exactly by their balance of an asset."""
+    column = _column(portfolio, asset)
+    # np.lexsort sorts by the last key first, so pass limbs least significant first
+    order = np.lexsort(tuple(column[:, k] for k in range(column.shape[1])))
+    return order[::-1] if descending else order
+
+
+def top_wallets(portfolio, asset, n):
+    """Return indices of the n wallets with the largest balance of an asset, largest first."""
+    total = len(portfolio['addresses'])
+    if n >= total:
+        return sort_wallets(portfolio, asset)
+    if n <= 0:
+        return np.array([], dtype=np.int64)
+
+    # Pre-select with float approximations, then rank the candidates exactly
+    approx = approximate_balances(portfolio, asset)
+    kth = np.partition(approx, total - n)[total - n]
+    candidates = np.nonzero(approx >= kth * (1 - 2.0 ** -40))[0]
+    column = _column(portfolio, asset)[candidates]
+    order = np.lexsort(tuple(column[:, k] for k in range(column.shape[1])))[::-1]
+    return candidates[order[:n]]
+
+
+def print_portfolio_summary(portfolio, top=5):
+    """Print exact per-asset totals and the largest holders of each asset."""
+    totals = asset_totals(portfolio)
+    print("\n📊 Portfolio Summary")
+    print("=" * 80)
+    print(f"Wallets: {len(portfolio['addresses'])}   Assets: {len(portfolio['assets'])}")
+
+    for asset in portfolio['assets']:
+        total = totals[asset]
+        missing = int(portfolio['missing'][:, portfolio['asset_index'][asset]].sum())
+        note = f" ({missing} unavailable)" if missing else ""
+        print(f"\n  💎 {asset}: {to_decimal(portfolio, asset, total)}{note}")
+        if total == 0:
+            continue
+        for rank, row in enumerate(top_wallets(portfolio, asset, top), start=1):
+            raw = _limbs_to_int(_column(portfolio, asset)[row])
+            if raw == 0:
+                break
+            print(f"     {rank}. {portfolio['addresses'][row]}: {to_decimal(portfolio, asset, raw)}")
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Pre-flight simulation of planned transfers for the EVM Wallet Manager.
+Runs eth_call and eth_estimateGas for a whole batch of transfers, pinned to
+one block and sent as JSON-RPC batches, so failing rows are caught before
+any nonce is allocated or transaction signed.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from config import BALANCE_BATCH_SIZE, RPC_CONCURRENCY_PER_CHAIN, DEFAULT_GAS_LIMIT_ERC20, DEFAULT_GAS_LIMIT_NATIVE
+from chains import get_chain, get_token, encode_transfer
+from rpc import get_web3_connection, batch_request
+from balances import encode_balance_of, decode_uint
+from scheduler import bind_priority
+
+
+def _error_message(response):
+    if not isinstance(response, dict):
+        return f"unexpected response {response!r}"
+    error = response.get('error')
+    if error is None:
+        return None
+    return error.get('message', str(error)) if isinstance(error, dict) else str(error)
+
+
+def _send_batches(web3, requests):
+    """Send requests in BALANCE_BATCH_SIZE batches in parallel; returns responses in order."""
+    chunks = [requests[i:i + BALANCE_BATCH_SIZE] for i in range(0, len(requests), BALANCE_BATCH_SIZE)]
+    responses = []
+    with ThreadPoolExecutor(max_workers=RPC_CONCURRENCY_PER_CHAIN) as pool:
+        for result in pool.map(bind_priority(lambda chunk: batch_request(web3, chunk)), chunks):
+            responses.extend(result)
+    return responses
+
+
+def preflight_transfers(network, transfers, gas_price, block=None):
+    """Simulate planned transfers on one network at one block.
+
+    transfers are dicts with sender, recipient, asset and amount_raw. Returns
+    one {'ok', 'gas', 'error'} dict per transfer, in order. Besides per-transfer
+    simulation, balances are checked cumulatively so a sender cannot overspend
+    across several rows of the same batch.
+    """
+    if not transfers:
+        return []
+    chain = get_chain(network)
+    web3 = get_web3_connection(network)
+    if block is None:
+        block = web3.eth.block_number
+    block = block if isinstance(block, str) else hex(block)
+
+    requests = []
+    plans = []
+    for transfer in transfers:
+        amount_raw = int(transfer['amount_raw'])
+        if transfer['asset'].upper() == chain['native']:
+            call = {'from': transfer['sender'], 'to': transfer['recipient'], 'value': hex(amount_raw)}
+            gas_limit = DEFAULT_GAS_LIMIT_NATIVE
+            token_address = None
+        else:
+            token_address = get_token(network, transfer['asset'])['address']
+            call = {'from': transfer['sender'], 'to': token_address,
+                    'data': encode_transfer(transfer['recipient'], amount_raw)}
+            gas_limit = DEFAULT_GAS_LIMIT_ERC20
+            # eth_call catches transfers that return false instead of reverting
+            requests.append(('eth_call', [call, block]))
+        requests.append(('eth_estimateGas', [dict(call, gasPrice=hex(gas_price)), block]))
+        plans.append((transfer, amount_raw, gas_limit, token_address))
+
+    # One balance read per sender and asset, for the cumulative check
+    balance_keys = {}
+    for transfer, _, _, token_address in plans:
+        balance_keys[(transfer['sender'], None)] = True
+        balance_keys[(transfer['sender'], token_address)] = True
+    balance_keys = list(balance_keys)
+    for sender, token_address in balance_keys:
+        if token_address is None:
+            requests.append(('eth_getBalance', [sender, block]))
+        else:
+            requests.append(('eth_call', [{'to': token_address, 'data': encode_balance_of(sender)}, block]))
+
+    responses = _send_batches(web3, requests)
+    balances = dict(zip(balance_keys, (decode_uint(r) for r in responses[-len(balance_keys):])))
+
+    results = []
+    position = 0
+    for transfer, amount_raw, gas_limit, token_address in plans:
+        error = None
+        if token_address is not None:
+            call_response = responses[position]
+            position += 1
+            error = _error_message(call_response)
+            if error is None and decode_uint(call_response) == 0 and call_response.get('result') not in ('0x', ''):
+                error = "token transfer returned false"
+        estimate_response = responses[position]
+        position += 1
+        error = error or _error_message(estimate_response)
+        gas = decode_uint(estimate_response) if error is None else None
+        if error is None and gas is None:
+            error = "no gas estimate returned"
+        elif error is None and gas > gas_limit:
+            error = f"needs {gas} gas, limit is {gas_limit}"
+
+        if error is None:
+            # Later rows from the same sender spend what earlier rows left; a rejected row spends nothing
+            native_key = (transfer['sender'], None)
+            native_cost = gas_limit * gas_price + (amount_raw if token_address is None else 0)
+            token_key = (transfer['sender'], token_address)
+            if balances[native_key] is not None and balances[native_key] < native_cost:
+                error = f"insufficient {chain['native']} for this and earlier rows in the batch"
+            elif token_address is not None and balances[token_key] is not None and balances[token_key] < amount_raw:
+                error = f"insufficient {transfer['asset'].upper()} for this and earlier rows in the batch"
+            else:
+                if balances[native_key] is not None:
+                    balances[native_key] -= native_cost
+                if token_address is not None and balances[token_key] is not None:
+                    balances[token_key] -= amount_raw
+
+        results.append({'ok': error is None, 'gas': gas, 'error': error})
+    return results
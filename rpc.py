@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+RPC connections for the EVM Wallet Manager.
+Builds Web3 connections for each network with instrumentation attached.
+HTTP endpoints use web3's HTTPProvider; WebSocket and IPC endpoints share
+one persistent, multiplexed connection per endpoint.
+"""
+
+import json
+import threading
+from functools import partial
+from web3 import Web3
+from web3.providers import JSONBaseProvider
+from config import (
+    METRICS_ENABLED, COALESCE_REQUESTS, HEDGED_READS, BREAKER_ENABLED, RPC_CACHE_ENABLED, RPC_OVERRIDES, RPC_REQUEST_TIMEOUT, RPC_RECONNECT_MAX_DELAY,
+    RPC_KEEPALIVE_INTERVAL, RPC_KEEPALIVE_TIMEOUT, RPC_HTTP_TIMEOUT,
+)
+from chains import CHAINS
+from metrics import instrument_provider, endpoint_label
+from persistent import RPCConnection
+from singleflight import coalesce_provider
+from scheduler import schedule_provider
+from hedge import hedge_provider
+from breaker import breaker_provider, failover_provider
+from rpc_cache import cache_provider, get_shared_cache
+
+
+# RPC endpoint for each network: the override from config, else the registry's primary URL
+RPC_URLS = {network: RPC_OVERRIDES.get(network) or chain['rpc'][0] for network, chain in CHAINS.items()}
+
+
+class PersistentProvider(JSONBaseProvider):
+    """web3 provider over a WebSocket or IPC RPCConnection.
+
+    Concurrent callers share the connection; make_request calls are not
+    serialized. subscribe() exposes eth_subscribe streams.
+    """
+
+    def __init__(self, endpoint_uri, request_timeout=RPC_REQUEST_TIMEOUT):
+        super().__init__()
+        self.endpoint_uri = endpoint_uri
+        self.connection = RPCConnection(endpoint_uri, request_timeout, RPC_RECONNECT_MAX_DELAY,
+                                        RPC_KEEPALIVE_INTERVAL, RPC_KEEPALIVE_TIMEOUT)
+
+    def make_request(self, method, params):
+        data = self.encode_rpc_request(method, params)
+        request_id = json.loads(data)['id']
+        return self.decode_rpc_response(self.connection.request(data, [request_id]))
+
+    def make_batch_request(self, requests):
+        data = self.encode_batch_rpc_request(requests)
+        ids = [request['id'] for request in json.loads(data)]
+        responses = self.decode_rpc_response(self.connection.request(data, ids))
+        if not isinstance(responses, list):
+            return responses
+        # Batch responses may come back in any order
+        by_id = {response.get('id'): response for response in responses}
+        return [by_id.get(request_id, {'error': {'code': -1, 'message': 'missing response'}}) for request_id in ids]
+
+    def is_connected(self, show_traceback=False):
+        return self.connection.connected.is_set()
+
+    def subscribe(self, params, callback):
+        """Start an eth_subscribe stream (e.g. ['newHeads']); returns a handle for unsubscribe()."""
+        return self.connection.subscribe(params, callback)
+
+    def unsubscribe(self, handle):
+        """Stop a subscription started with subscribe()."""
+        self.connection.unsubscribe(handle)
+
+
+def make_provider(rpc_url):
+    """Return a web3 provider for an http(s):// URL, a ws(s):// URL or an IPC socket path."""
+    if rpc_url.startswith(('http://', 'https://')):
+        # A hung endpoint fails soon after it counts as slow, instead of waiting out the library default
+        return Web3.HTTPProvider(rpc_url, request_kwargs={'timeout': RPC_HTTP_TIMEOUT})
+    return PersistentProvider(rpc_url)
+
+_connections = {}
+_connections_lock = threading.Lock()
+
+
+def _build_provider(network, rpc_url):
+    """Return an instrumented, circuit-broken, scheduled provider for one endpoint."""
+    provider = make_provider(rpc_url)
+    if METRICS_ENABLED:
+        instrument_provider(provider, network)
+    if BREAKER_ENABLED:
+        # Inside the scheduler, so queue time does not count as a slow endpoint
+        breaker_provider(provider, network, endpoint_label(rpc_url))
+    # Queue time is not endpoint latency, so scheduling wraps the instrumentation
+    schedule_provider(provider, rpc_url)
+    return provider
+
+
+def get_web3_connection(network):
+    """Get a properly configured Web3 connection for the specified network."""
+    network = network.lower()
+    rpc_url = RPC_URLS.get(network)
+    if not rpc_url:
+        raise ValueError(f"Unknown network: {network}")
+
+    # Connections are shared; HTTP sessions are kept per thread by web3,
+    # WebSocket/IPC endpoints multiplex all threads over one connection
+    with _connections_lock:
+        web3 = _connections.get((network, rpc_url))
+        if web3 is None:
+            provider = _build_provider(network, rpc_url)
+            backup_urls = [url for url in CHAINS[network]['rpc'] if url != rpc_url]
+            if BREAKER_ENABLED and backup_urls:
+                # A tripped endpoint's calls go to the network's next endpoint
+                failover_provider(provider, [partial(_build_provider, network, url) for url in backup_urls])
+            if HEDGED_READS and backup_urls:
+                hedge_provider(provider, network, endpoint_label(rpc_url), _build_provider(network, backup_urls[0]))
+            if COALESCE_REQUESTS:
+                # Metrics sit inside, so they count only calls that reach an endpoint
+                coalesce_provider(provider, network)
+            if RPC_CACHE_ENABLED:
+                # Outermost: immutable data already on disk never queues or goes out. An override
+                # endpoint may be another chain than chains.json says, so it is asked for its chain ID
+                chain_id = CHAINS[network]['chain_id'] if rpc_url in CHAINS[network]['rpc'] else None
+                cache_provider(provider, get_shared_cache(), chain_id)
+
+            web3 = Web3(provider)
+            _connections[(network, rpc_url)] = web3
+
+    # For BSC (Proof of Authority chain), we handle POA middleware internally
+    # Modern web3.py handles this automatically in most cases
+
+    return web3
+
+
+def batch_request(web3, requests):
+    """Send (method, params) pairs as one JSON-RPC batch, falling back to single calls.
+
+    Returns one response dict per request, in order.
+    """
+    provider = web3.provider
+    if len(requests) > 1 and hasattr(provider, 'make_batch_request'):
+        try:
+            responses = provider.make_batch_request(requests)
+            if isinstance(responses, list) and len(responses) == len(requests):
+                return responses
+        except Exception:
+            # Endpoint rejected the batch; retry one request at a time
+            pass
+
+    responses = []
+    for method, params in requests:
+        try:
+            responses.append(provider.make_request(method, params))
+        except Exception as e:
+            responses.append({'error': {'code': -1, 'message': str(e)}})
+    return responses
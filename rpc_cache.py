@@ -0,0 +1,432 @@
+#!/usr/bin/env python3
+"""
+Persistent cache for immutable RPC responses.
+Receipts, mined transactions, blocks, logs and state reads pinned to a
+confirmed block never change, so their results are kept on disk and
+served without touching the network. Results are stored once per content
+hash in append-only pack files read through mmap; an SQLite index maps
+request keys to contents and evicts the least recently used entries when
+the cache outgrows its size limit. Keys and heads are per chain ID, so two
+names for one chain share entries and an endpoint on another chain never
+gets them.
+"""
+
+import os
+import mmap
+import json
+import time
+import atexit
+import sqlite3
+import hashlib
+import threading
+from config import RPC_CACHE_DIR, RPC_CACHE_MAX_BYTES, RPC_CACHE_CONFIRMATIONS
+
+
+PACK_SEGMENT_BYTES = 64 * 1024 * 1024  # a new pack file is started past this size
+TOUCH_FLUSH_EVERY = 256  # hits between last-used time writes
+COMPACT_LIVE_RATIO = 0.5  # pack files with less live data than this are rewritten after eviction
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    key TEXT PRIMARY KEY,
+    digest TEXT NOT NULL,
+    last_used REAL NOT NULL
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS entries_last_used ON entries (last_used);
+CREATE INDEX IF NOT EXISTS entries_digest ON entries (digest);
+
+CREATE TABLE IF NOT EXISTS blobs (
+    digest TEXT PRIMARY KEY,
+    segment INTEGER NOT NULL,
+    offset INTEGER NOT NULL,
+    size INTEGER NOT NULL
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS blobs_segment ON blobs (segment);
+
+CREATE TABLE IF NOT EXISTS chain_heads (
+    chain_id INTEGER PRIMARY KEY,
+    head INTEGER NOT NULL
+) WITHOUT ROWID;
+"""
+
+# Position of the block parameter for state reads
+BLOCK_PARAM = {
+    'eth_getBalance': 1,
+    'eth_getCode': 1,
+    'eth_getTransactionCount': 1,
+    'eth_call': 1,
+    'eth_getStorageAt': 2,
+    'eth_getBlockByNumber': 0,
+}
+
+# Results that are pinned once they are in a confirmed block
+MINED_RESULT_METHODS = {'eth_getTransactionReceipt', 'eth_getTransactionByHash'}
+
+CACHEABLE_METHODS = set(BLOCK_PARAM) | MINED_RESULT_METHODS | {'eth_chainId', 'eth_getBlockByHash', 'eth_getLogs'}
+
+_shared = None
+_shared_lock = threading.Lock()
+
+
+def open_cache(directory=RPC_CACHE_DIR, max_bytes=RPC_CACHE_MAX_BYTES):
+    """Open (creating if needed) a cache directory and return its handle."""
+    os.makedirs(directory, exist_ok=True)
+    db = sqlite3.connect(os.path.join(directory, 'index.db'), check_same_thread=False, isolation_level=None)
+    db.execute("PRAGMA journal_mode=WAL")
+    db.execute("PRAGMA synchronous=NORMAL")
+    db.executescript(SCHEMA)
+    return {
+        'directory': directory,
+        'db': db,
+        'lock': threading.RLock(),
+        'max_bytes': max_bytes,
+        'maps': {},
+        'touched': {},
+        'heads': dict(db.execute("SELECT chain_id, head FROM chain_heads").fetchall()),
+        'bytes': db.execute("SELECT COALESCE(SUM(size), 0) FROM blobs").fetchone()[0],
+        'hits': 0,
+        'misses': 0,
+    }
+
+
+def get_shared_cache():
+    """Open (once) and return the process-wide cache, in RPC_CACHE_DIR unless use_shared_cache() chose another."""
+    global _shared
+    with _shared_lock:
+        if _shared is None:
+            _shared = open_cache()
+        return _shared
+
+
+def use_shared_cache(directory=RPC_CACHE_DIR, max_bytes=RPC_CACHE_MAX_BYTES):
+    """Open a cache directory as the process-wide cache, closing the one it replaces.
+
+    Connections keep the cache they were built with, so call this before the first one is made.
+    """
+    global _shared
+    with _shared_lock:
+        if _shared is not None:
+            close_cache(_shared)
+        _shared = open_cache(directory, max_bytes)
+        return _shared
+
+
+def close_shared_cache():
+    """Close the process-wide cache, if it is open (also run at exit)."""
+    global _shared
+    with _shared_lock:
+        if _shared is not None:
+            close_cache(_shared)
+            _shared = None
+
+
+atexit.register(close_shared_cache)
+
+
+def close_cache(cache):
+    """Write pending last-used times and release the pack file mappings."""
+    with cache['lock']:
+        _flush_touched(cache)
+        for mapped in cache['maps'].values():
+            mapped.close()
+        cache['maps'].clear()
+        cache['db'].close()
+
+
+def _segment_path(cache, segment):
+    return os.path.join(cache['directory'], f"pack-{segment:05d}.dat")
+
+
+def _read_blob(cache, segment, offset, size):
+    mapped = cache['maps'].get(segment)
+    if mapped is None or offset + size > len(mapped):
+        # Not mapped yet, or the file has grown since it was mapped
+        if mapped is not None:
+            mapped.close()
+        try:
+            with open(_segment_path(cache, segment), 'rb') as f:
+                mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            cache['maps'].pop(segment, None)
+            return None
+        cache['maps'][segment] = mapped
+    if offset + size > len(mapped):
+        return None
+    return mapped[offset:offset + size]
+
+
+def _flush_touched(cache):
+    if cache['touched']:
+        cache['db'].executemany("UPDATE entries SET last_used = ? WHERE key = ?",
+                                [(used, key) for key, used in cache['touched'].items()])
+        cache['touched'] = {}
+
+
+def cache_get(cache, key):
+    """Return the cached bytes for a key, or None."""
+    with cache['lock']:
+        row = cache['db'].execute(
+            "SELECT blobs.segment, blobs.offset, blobs.size FROM entries JOIN blobs USING (digest) "
+            "WHERE entries.key = ?", (key,)).fetchone()
+        data = _read_blob(cache, *row) if row else None
+        if data is None:
+            cache['misses'] += 1
+            return None
+        cache['hits'] += 1
+        cache['touched'][key] = time.time()
+        if len(cache['touched']) >= TOUCH_FLUSH_EVERY:
+            _flush_touched(cache)
+        return data
+
+
+def _append_blob(cache, data):
+    """Append data to the newest pack file (cache lock and an index write transaction held)."""
+    db = cache['db']
+    segment = db.execute("SELECT MAX(segment) FROM blobs").fetchone()[0] or 1
+    path = _segment_path(cache, segment)
+    if os.path.exists(path) and os.path.getsize(path) >= PACK_SEGMENT_BYTES:
+        segment += 1
+        path = _segment_path(cache, segment)
+    with open(path, 'ab') as f:
+        offset = f.seek(0, os.SEEK_END)
+        f.write(data)
+    return segment, offset
+
+
+def cache_put(cache, key, data):
+    """Store bytes under a key; identical contents are stored once."""
+    digest = hashlib.sha256(data).hexdigest()
+    with cache['lock']:
+        db = cache['db']
+        # BEGIN IMMEDIATE also serializes pack file appends between processes
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            if db.execute("SELECT 1 FROM blobs WHERE digest = ?", (digest,)).fetchone() is None:
+                segment, offset = _append_blob(cache, data)
+                db.execute("INSERT INTO blobs (digest, segment, offset, size) VALUES (?, ?, ?, ?)",
+                           (digest, segment, offset, len(data)))
+                cache['bytes'] += len(data)
+            db.execute("INSERT OR REPLACE INTO entries (key, digest, last_used) VALUES (?, ?, ?)",
+                       (key, digest, time.time()))
+            db.execute("COMMIT")
+        except Exception:
+            db.execute("ROLLBACK")
+            raise
+        if cache['bytes'] > cache['max_bytes']:
+            evict(cache)
+
+
+def evict(cache, target_ratio=0.9):
+    """Drop least recently used entries until the cache is below target_ratio of its limit.
+
+    Contents no longer referenced are dropped, and pack files left mostly
+    empty are compacted into the newest one.
+    """
+    with cache['lock']:
+        db = cache['db']
+        _flush_touched(cache)
+        target = cache['max_bytes'] * target_ratio
+        size = db.execute("SELECT COALESCE(SUM(size), 0) FROM blobs").fetchone()[0]
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            while size > target:
+                keys = [row[0] for row in db.execute(
+                    "SELECT key FROM entries ORDER BY last_used LIMIT 50").fetchall()]
+                if not keys:
+                    break
+                db.executemany("DELETE FROM entries WHERE key = ?", [(key,) for key in keys])
+                db.execute("DELETE FROM blobs WHERE digest NOT IN (SELECT digest FROM entries)")
+                size = db.execute("SELECT COALESCE(SUM(size), 0) FROM blobs").fetchone()[0]
+            db.execute("COMMIT")
+        except Exception:
+            db.execute("ROLLBACK")
+            raise
+        cache['bytes'] = size
+        _compact(cache)
+
+
+def _compact(cache):
+    db = cache['db']
+    newest = db.execute("SELECT MAX(segment) FROM blobs").fetchone()[0]
+    live = dict(db.execute("SELECT segment, SUM(size) FROM blobs GROUP BY segment").fetchall())
+    for name in os.listdir(cache['directory']):
+        if not (name.startswith('pack-') and name.endswith('.dat')):
+            continue
+        segment = int(name[5:-4])
+        if segment == newest:
+            continue
+        path = _segment_path(cache, segment)
+        if live.get(segment, 0) >= os.path.getsize(path) * COMPACT_LIVE_RATIO:
+            continue
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            for digest, offset, size in db.execute(
+                    "SELECT digest, offset, size FROM blobs WHERE segment = ?", (segment,)).fetchall():
+                data = _read_blob(cache, segment, offset, size)
+                if data is None:
+                    db.execute("DELETE FROM blobs WHERE digest = ?", (digest,))
+                    continue
+                new_segment, new_offset = _append_blob(cache, data)
+                db.execute("UPDATE blobs SET segment = ?, offset = ? WHERE digest = ?",
+                           (new_segment, new_offset, digest))
+            db.execute("COMMIT")
+        except Exception:
+            db.execute("ROLLBACK")
+            raise
+        mapped = cache['maps'].pop(segment, None)
+        if mapped is not None:
+            mapped.close()
+        os.remove(path)
+
+
+def note_head(cache, chain_id, head):
+    """Remember the highest block seen on a chain (decides what counts as confirmed)."""
+    with cache['lock']:
+        if head > cache['heads'].get(chain_id, -1):
+            cache['heads'][chain_id] = head
+            cache['db'].execute("INSERT OR REPLACE INTO chain_heads (chain_id, head) VALUES (?, ?)",
+                                (chain_id, head))
+
+
+def _block_number(tag):
+    """Return a block number for a concrete block parameter, 'hash' for a block hash, else None."""
+    if isinstance(tag, int):
+        return tag
+    if isinstance(tag, dict):
+        if tag.get('blockHash'):
+            return 'hash'
+        return _block_number(tag.get('blockNumber'))
+    if isinstance(tag, str):
+        if tag == 'earliest':
+            return 0
+        if tag.startswith('0x') and len(tag) == 66:
+            return 'hash'
+        if tag.startswith('0x'):
+            try:
+                return int(tag, 16)
+            except ValueError:
+                return None
+    return None
+
+
+def is_immutable(cache, chain_id, method, params, result):
+    """Return True if a successful response can be cached for good.
+
+    Anything read at a block number must be at least RPC_CACHE_CONFIRMATIONS
+    blocks below the highest head seen, so reorgs cannot change it.
+    """
+    if result is None:
+        return False
+    head = cache['heads'].get(chain_id)
+
+    def confirmed(number):
+        if number == 'hash':
+            return True
+        return number is not None and head is not None and number <= head - RPC_CACHE_CONFIRMATIONS
+
+    params = list(params or [])
+    if method == 'eth_chainId':
+        return True
+    if method == 'eth_getBlockByHash':
+        return True
+    if method in BLOCK_PARAM:
+        position = BLOCK_PARAM[method]
+        return len(params) > position and confirmed(_block_number(params[position]))
+    if method in MINED_RESULT_METHODS:
+        return isinstance(result, dict) and confirmed(_block_number(result.get('blockNumber')))
+    if method == 'eth_getLogs' and params and isinstance(params[0], dict):
+        log_filter = params[0]
+        if log_filter.get('blockHash'):
+            return True
+        return _block_number(log_filter.get('fromBlock')) not in (None, 'hash') and \
+            confirmed(_block_number(log_filter.get('toBlock')))
+    return False
+
+
+def may_be_cached(method, params):
+    """Cheap pre-check: False for requests that can never be served from the cache."""
+    if method not in CACHEABLE_METHODS:
+        return False
+    position = BLOCK_PARAM.get(method)
+    return position is None or (len(params or []) > position and _block_number(params[position]) is not None)
+
+
+def request_key(chain_id, method, params):
+    """Return the content key for a request on a chain."""
+    text = json.dumps([chain_id, method, params], sort_keys=True, separators=(',', ':'), default=repr)
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+def get_cache_stats(cache):
+    """Return {'hits', 'misses', 'bytes'} for a cache."""
+    with cache['lock']:
+        return {'hits': cache['hits'], 'misses': cache['misses'], 'bytes': cache['bytes']}
+
+
+def cache_provider(provider, cache, chain_id=None):
+    """Wrap a provider so immutable responses are served from (and saved to) the cache.
+
+    Without a chain_id, the endpoint is asked for it once, on the first cacheable request.
+    """
+    make_request = provider.make_request
+    chain = {'id': chain_id}
+
+    def get_chain_id():
+        if chain['id'] is None:
+            try:
+                result = make_request('eth_chainId', []).get('result')
+                chain['id'] = int(result, 16)
+            except Exception:
+                # Not known yet: the request goes out uncached and the next one asks again
+                return None
+        return chain['id']
+
+    def lookup(method, params):
+        if not may_be_cached(method, params) or get_chain_id() is None:
+            return None
+        data = cache_get(cache, request_key(chain['id'], method, params))
+        if data is None:
+            return None
+        return {'jsonrpc': '2.0', 'id': 0, 'result': json.loads(data)}
+
+    def observe(method, params, response):
+        """Track the head and save the response if it can never change."""
+        if not isinstance(response, dict) or 'error' in response:
+            return
+        result = response.get('result')
+        if method == 'eth_blockNumber' and isinstance(result, str):
+            if get_chain_id() is not None:
+                note_head(cache, chain['id'], int(result, 16))
+            return
+        if may_be_cached(method, params) and get_chain_id() is not None and \
+                is_immutable(cache, chain['id'], method, params, result):
+            cache_put(cache, request_key(chain['id'], method, params),
+                      json.dumps(result, separators=(',', ':')).encode('utf-8'))
+
+    def cached_make_request(method, params):
+        response = lookup(method, params)
+        if response is not None:
+            return response
+        response = make_request(method, params)
+        observe(method, params, response)
+        return response
+
+    provider.make_request = cached_make_request
+
+    make_batch_request = getattr(provider, 'make_batch_request', None)
+    if make_batch_request is not None:
+        def cached_make_batch_request(requests):
+            responses = [lookup(method, params) for method, params in requests]
+            missing = [position for position, response in enumerate(responses) if response is None]
+            if not missing:
+                return responses
+            fetched = make_batch_request([requests[position] for position in missing])
+            if not isinstance(fetched, list) or len(fetched) != len(missing):
+                return fetched
+            for position, response in zip(missing, fetched):
+                observe(requests[position][0], requests[position][1], response)
+                responses[position] = response
+            return responses
+
+        provider.make_batch_request = cached_make_batch_request
+    return provider
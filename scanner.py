@@ -0,0 +1,282 @@
+#!/usr/bin/env python3
+"""
+Sharded balance scanner for external address lists.
+Splits a large address file (deposit addresses, airdrop recipients, ...)
+into shards that worker processes read with batched calls, each worker
+starting from a different RPC endpoint of every network. Finished shards
+are checkpointed, so an interrupted scan resumes where it stopped, and the
+shard results are merged into one CSV, NDJSON or Parquet file.
+"""
+
+import os
+import sys
+import csv
+import json
+import time
+import hashlib
+import argparse
+import multiprocessing
+from itertools import islice
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from config import SCANNER_DIR, SCANNER_SHARD_ADDRESSES, SCANNER_WORKERS, RPC_OVERRIDES
+from chains import CHAINS
+from rpc import RPC_URLS
+from export import (
+    BALANCE_COLUMNS, INTEGER_COLUMNS, FORMATS, open_export, write_rows, close_export, iter_addresses,
+    iter_balance_rows, resolve_heads,
+)
+from scheduler import rpc_priority
+
+
+MANIFEST_FILE = "manifest.json"
+PROGRESS_FILE = "progress.jsonl"
+MERGE_ROWS = 10000  # rows per write while merging shard results
+
+
+def scan_id_for(filename, column, networks, nonzero=False):
+    """Return a scan id derived from the address file's content and the scan's options."""
+    digest = hashlib.sha256()
+    with open(filename, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    digest.update(f"|{column}|{','.join(sorted(networks))}|{nonzero}".encode('utf-8'))
+    return digest.hexdigest()[:16]
+
+
+def shard_path(directory, shard):
+    """Return the path of a shard's address list."""
+    return os.path.join(directory, f"shard-{shard:05d}.txt")
+
+
+def result_path(directory, shard):
+    """Return the path of a shard's balance rows."""
+    return os.path.join(directory, f"result-{shard:05d}.csv")
+
+
+def split_addresses(filename, column, directory, shard_size=SCANNER_SHARD_ADDRESSES):
+    """Write the file's valid addresses into shard files (streamed); returns the manifest.
+
+    Done once per scan: a resumed scan reuses the shards and manifest already on disk.
+    """
+    manifest_path = os.path.join(directory, MANIFEST_FILE)
+    if os.path.exists(manifest_path):
+        with open(manifest_path) as f:
+            return json.load(f)
+
+    os.makedirs(directory, exist_ok=True)
+    errors = []
+    addresses = iter_addresses(filename, column, errors)
+    shards = total = 0
+    while True:
+        chunk = list(islice(addresses, shard_size))
+        if not chunk:
+            break
+        with open(shard_path(directory, shards), 'w') as f:
+            f.write("\n".join(chunk) + "\n")
+        shards += 1
+        total += len(chunk)
+
+    manifest = {'input': os.path.abspath(filename), 'column': column, 'shards': shards,
+                'addresses': total, 'invalid': len(errors), 'created_at': time.time()}
+    # The manifest goes last, so a split cut short is redone from the start
+    write_manifest(directory, manifest)
+    return manifest
+
+
+def write_manifest(directory, manifest):
+    """Replace a scan's manifest atomically."""
+    manifest_path = os.path.join(directory, MANIFEST_FILE)
+    tmp_path = manifest_path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, manifest_path)
+
+
+def pin_heads(directory, manifest, networks):
+    """Resolve every network's head block and timestamp once per scan and keep them in the manifest.
+
+    Every shard, in this run or a resumed one, reads at the same blocks.
+    """
+    if 'heads' not in manifest:
+        manifest['heads'], manifest['timestamps'] = resolve_heads(networks)
+        write_manifest(directory, manifest)
+    return manifest
+
+
+def read_progress(directory):
+    """Return {shard: {'rows', 'failed'}} for every finished shard."""
+    progress = {}
+    try:
+        with open(os.path.join(directory, PROGRESS_FILE)) as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    # A line cut short by a crash; that shard is scanned again
+                    continue
+                progress[entry['shard']] = entry
+    except FileNotFoundError:
+        pass
+    return progress
+
+
+def record_progress(progress_file, entry):
+    """Append a finished shard to the progress file, durably."""
+    progress_file.write(json.dumps(entry) + "\n")
+    progress_file.flush()
+    os.fsync(progress_file.fileno())
+
+
+def _init_worker(slots):
+    """Point this worker at its own endpoint of every network (the others remain its failover)."""
+    with slots.get_lock():
+        slot = slots.value
+        slots.value += 1
+    for network, chain in CHAINS.items():
+        if network not in RPC_OVERRIDES:
+            RPC_URLS[network] = chain['rpc'][slot % len(chain['rpc'])]
+
+
+def scan_shard(directory, shard, networks, heads, timestamps, nonzero=False):
+    """Read one shard's balances at the pinned heads into its result file; returns its progress entry."""
+    with open(shard_path(directory, shard)) as f:
+        addresses = [line.strip() for line in f if line.strip()]
+    stats = {}
+    path = result_path(directory, shard)
+    export = open_export(path + '.tmp', 'csv', BALANCE_COLUMNS)
+    try:
+        with rpc_priority('background'):
+            write_rows(export, iter_balance_rows(addresses, networks, nonzero=nonzero, stats=stats,
+                                                 heads=heads, timestamps=timestamps))
+    finally:
+        close_export(export)
+    os.replace(path + '.tmp', path)
+    return {'shard': shard, 'rows': export['rows'], 'failed': stats.get('failed', 0)}
+
+
+def run_scan(directory, manifest, networks, workers=SCANNER_WORKERS, nonzero=False, retry_failed=False):
+    """Scan every shard not finished yet across worker processes; returns the progress."""
+    progress = read_progress(directory)
+    todo = [shard for shard in range(manifest['shards'])
+            if shard not in progress or (retry_failed and progress[shard]['failed'])]
+    if not todo:
+        return progress
+
+    workers = min(workers or os.cpu_count() or 1, len(todo))
+    rows = sum(entry['rows'] for entry in progress.values())
+    print(f"🔎 {len(todo)} shard(s) to scan with {workers} worker process(es)")
+    with open(os.path.join(directory, PROGRESS_FILE), 'a') as progress_file, \
+            ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                initargs=(multiprocessing.Value('i', 0),)) as pool:
+        futures = [pool.submit(scan_shard, directory, shard, networks, manifest['heads'], manifest['timestamps'],
+                               nonzero) for shard in todo]
+        try:
+            for future in as_completed(futures):
+                try:
+                    entry = future.result()
+                except Exception as e:
+                    print(f"\n⚠️  A shard failed and will be retried on the next run: {e}")
+                    continue
+                record_progress(progress_file, entry)
+                progress[entry['shard']] = entry
+                rows += entry['rows']
+                print(f"\r  {len(progress)}/{manifest['shards']} shard(s), {rows} row(s)", end='', flush=True)
+        except KeyboardInterrupt:
+            pool.shutdown(wait=False, cancel_futures=True)
+            raise
+    print()
+    return progress
+
+
+def _typed(row):
+    return {column: (int(value) if value and column in INTEGER_COLUMNS else value or None)
+            for column, value in row.items()}
+
+
+def merge_results(directory, manifest, output, export_format, columns):
+    """Merge every shard's results, in input order, into one export file; returns the rows written."""
+    export = open_export(output, export_format, columns)
+    try:
+        for shard in range(manifest['shards']):
+            with open(result_path(directory, shard), newline='') as f:
+                reader = csv.DictReader(f)
+                while True:
+                    chunk = [_typed(row) for row in islice(reader, MERGE_ROWS)]
+                    if not chunk:
+                        break
+                    write_rows(export, chunk)
+    finally:
+        close_export(export)
+    return export['rows']
+
+
+def main():
+    """Main function to scan balances of an external address list."""
+    parser = argparse.ArgumentParser(description="Scan balances of a large address list across processes")
+    parser.add_argument('file', help="Plain list (one address per line) or CSV file")
+    parser.add_argument('--output', required=True, help="Merged output (.csv, .ndjson/.jsonl or .parquet)")
+    parser.add_argument('--format', choices=sorted(set(FORMATS.values())),
+                        help="Output format (default: from the file extension)")
+    parser.add_argument('--column', help="CSV column with the addresses")
+    parser.add_argument('--columns', help="Comma-separated columns to write (default: all)")
+    parser.add_argument('--networks', default=','.join(CHAINS), help="Comma-separated networks")
+    parser.add_argument('--workers', type=int, default=SCANNER_WORKERS, help="Worker processes (default: all cores)")
+    parser.add_argument('--shard-size', type=int, default=SCANNER_SHARD_ADDRESSES, help="Addresses per shard")
+    parser.add_argument('--nonzero', action='store_true', help="Leave out zero balances")
+    parser.add_argument('--retry-failed', action='store_true', help="Scan again shards that had unreadable balances")
+    args = parser.parse_args()
+
+    print("🛰️  Address Scanner")
+    print("=" * 50)
+
+    export_format = args.format or next((fmt for ext, fmt in FORMATS.items() if args.output.lower().endswith(ext)), None)
+    if export_format is None:
+        print("❌ Unknown output format; use --format or a .csv, .ndjson or .parquet file")
+        return 1
+    columns = [c.strip() for c in args.columns.split(',') if c.strip()] if args.columns else list(BALANCE_COLUMNS)
+    unknown = [c for c in columns if c not in BALANCE_COLUMNS]
+    if unknown:
+        print(f"❌ Unknown columns: {', '.join(unknown)} (available: {', '.join(BALANCE_COLUMNS)})")
+        return 1
+    networks = [n.strip().lower() for n in args.networks.split(',') if n.strip()]
+    unknown = [n for n in networks if n not in CHAINS]
+    if unknown:
+        print(f"❌ Unknown networks: {', '.join(unknown)}")
+        return 1
+
+    directory = os.path.join(SCANNER_DIR, scan_id_for(args.file, args.column, networks, args.nonzero))
+    try:
+        manifest = split_addresses(args.file, args.column, directory, max(1, args.shard_size))
+        pin_heads(directory, manifest, networks)
+    except (OSError, ValueError) as e:
+        print(f"❌ {e}")
+        return 1
+    print(f"📋 {manifest['addresses']} address(es) in {manifest['shards']} shard(s) (scan: {directory})")
+    if manifest['invalid']:
+        print(f"⚠️  Skipping {manifest['invalid']} invalid address(es) in {args.file}")
+
+    try:
+        progress = run_scan(directory, manifest, networks, args.workers, args.nonzero, args.retry_failed)
+    except KeyboardInterrupt:
+        print("\n⏸️  Scan interrupted; run the same command again to resume")
+        return 1
+
+    missing = manifest['shards'] - len(progress)
+    if missing:
+        print(f"⚠️  {missing} shard(s) unfinished; run the same command again to resume")
+        return 1
+    failed = sum(entry['failed'] for entry in progress.values())
+    if failed:
+        print(f"⚠️  {failed} balance(s) could not be read; their raw column is empty (--retry-failed to rescan)")
+
+    try:
+        rows = merge_results(directory, manifest, args.output, export_format, columns)
+    except (OSError, ValueError) as e:
+        print(f"❌ {e}")
+        return 1
+    print(f"✅ {rows} row(s) written to {args.output} ({export_format})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
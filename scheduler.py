@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+Priority-aware RPC scheduling for the EVM Wallet Manager.
+Every endpoint has a budget of concurrent requests shared by three
+priority classes (send, interactive, background) with weighted fair
+queueing, so a balance lookup or a broadcast never waits behind a scan.
+"""
+
+import time
+import functools
+import threading
+from collections import deque
+from contextlib import contextmanager
+from config import RPC_ENDPOINT_CONCURRENCY, RPC_RESERVED_SLOTS, RPC_PRIORITY_WEIGHTS
+
+
+PRIORITIES = ('send', 'interactive', 'background')  # most urgent first
+DEFAULT_PRIORITY = 'interactive'
+
+# Methods that always run in the send class, whatever the calling thread's class
+SEND_METHODS = {'eth_sendRawTransaction'}
+
+_local = threading.local()
+_schedulers = {}
+_schedulers_lock = threading.Lock()
+
+
+def current_priority():
+    """Return the priority class of RPC calls made by this thread."""
+    return getattr(_local, 'priority', DEFAULT_PRIORITY)
+
+
+@contextmanager
+def rpc_priority(priority):
+    """Run the RPC calls this thread makes inside the block in a priority class."""
+    if priority not in PRIORITIES:
+        raise ValueError(f"Unknown RPC priority: {priority}")
+    previous = current_priority()
+    _local.priority = priority
+    try:
+        yield
+    finally:
+        _local.priority = previous
+
+
+def bind_priority(function):
+    """Wrap a function so it runs in the caller's priority class on any thread (for worker pools)."""
+    priority = current_priority()
+
+    @functools.wraps(function)
+    def run(*args, **kwargs):
+        with rpc_priority(priority):
+            return function(*args, **kwargs)
+    return run
+
+
+def new_scheduler(slots=RPC_ENDPOINT_CONCURRENCY, reserved=RPC_RESERVED_SLOTS, weights=RPC_PRIORITY_WEIGHTS):
+    """Return the state of one endpoint's scheduler."""
+    return {
+        'lock': threading.Lock(),
+        'slots': slots,
+        'reserved': min(reserved, slots - 1),
+        'weights': dict(weights),
+        'in_flight': 0,
+        'virtual_time': 0.0,
+        'queues': {priority: deque() for priority in PRIORITIES},
+        'last_tag': {priority: 0.0 for priority in PRIORITIES},
+        'stats': {priority: {'requests': 0, 'wait_seconds': 0.0, 'max_wait': 0.0} for priority in PRIORITIES},
+    }
+
+
+def get_scheduler(endpoint):
+    """Return the shared scheduler for an endpoint URL."""
+    with _schedulers_lock:
+        scheduler = _schedulers.get(endpoint)
+        if scheduler is None:
+            scheduler = _schedulers[endpoint] = new_scheduler()
+        return scheduler
+
+
+def _dispatch(scheduler):
+    """Start queued requests while slots are free (scheduler lock held).
+
+    The queued request with the smallest virtual finish tag goes first; a
+    class's tags advance by 1/weight per request, so under load each class
+    gets slots in proportion to its weight. Background requests never take
+    the reserved slots, which stay free for send and interactive calls.
+    """
+    while scheduler['in_flight'] < scheduler['slots']:
+        best = None
+        for rank, priority in enumerate(PRIORITIES):
+            queue = scheduler['queues'][priority]
+            if not queue:
+                continue
+            if priority == 'background' and \
+                    scheduler['in_flight'] >= scheduler['slots'] - scheduler['reserved']:
+                continue
+            if best is None or (queue[0]['tag'], rank) < (best[0]['tag'], best[1]):
+                best = (queue[0], rank, queue)
+        if best is None:
+            return
+        ticket = best[2].popleft()
+        scheduler['virtual_time'] = ticket['tag']
+        scheduler['in_flight'] += 1
+        ticket['event'].set()
+
+
+@contextmanager
+def rpc_slot(scheduler, priority=None):
+    """Hold one of an endpoint's request slots for the enclosed request."""
+    priority = priority or current_priority()
+    ticket = {'event': threading.Event(), 'tag': 0.0}
+    queued_at = time.perf_counter()
+    with scheduler['lock']:
+        # An idle class restarts at the current virtual time instead of banking credit
+        start = max(scheduler['virtual_time'], scheduler['last_tag'][priority])
+        ticket['tag'] = start + 1.0 / scheduler['weights'][priority]
+        scheduler['last_tag'][priority] = ticket['tag']
+        scheduler['queues'][priority].append(ticket)
+        _dispatch(scheduler)
+    ticket['event'].wait()
+
+    waited = time.perf_counter() - queued_at
+    with scheduler['lock']:
+        stats = scheduler['stats'][priority]
+        stats['requests'] += 1
+        stats['wait_seconds'] += waited
+        stats['max_wait'] = max(stats['max_wait'], waited)
+    try:
+        yield
+    finally:
+        with scheduler['lock']:
+            scheduler['in_flight'] -= 1
+            _dispatch(scheduler)
+
+
+def get_scheduler_stats():
+    """Return {endpoint: {priority: {'requests', 'wait_seconds', 'max_wait'}}}."""
+    with _schedulers_lock:
+        schedulers = dict(_schedulers)
+    snapshot = {}
+    for endpoint, scheduler in schedulers.items():
+        with scheduler['lock']:
+            snapshot[endpoint] = {priority: dict(stats) for priority, stats in scheduler['stats'].items()}
+    return snapshot
+
+
+def schedule_provider(provider, endpoint):
+    """Wrap a provider so every request (a batch counts as one) waits for a slot on its endpoint."""
+    scheduler = get_scheduler(endpoint)
+    make_request = provider.make_request
+
+    def scheduled_make_request(method, params):
+        with rpc_slot(scheduler, 'send' if method in SEND_METHODS else None):
+            return make_request(method, params)
+
+    provider.make_request = scheduled_make_request
+
+    make_batch_request = getattr(provider, 'make_batch_request', None)
+    if make_batch_request is not None:
+        def scheduled_make_batch_request(requests):
+            send = any(method in SEND_METHODS for method, _ in requests)
+            with rpc_slot(scheduler, 'send' if send else None):
+                return make_batch_request(requests)
+
+        provider.make_batch_request = scheduled_make_batch_request
+    return provider
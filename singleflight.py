@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""
+In-flight request coalescing for the EVM Wallet Manager.
+Identical read-only JSON-RPC requests (same method, params and block tag)
+issued while one is already on the wire share its response instead of
+each making their own call.
+"""
+
+import json
+import threading
+from scheduler import PRIORITIES, current_priority
+
+
+# Read-only methods: concurrent duplicates can share one response (and hedge.py may send them twice)
+READ_METHODS = {
+    'eth_chainId', 'net_version', 'eth_blockNumber', 'eth_gasPrice', 'eth_maxPriorityFeePerGas',
+    'eth_feeHistory', 'eth_getBalance', 'eth_getTransactionCount', 'eth_getCode', 'eth_call',
+    'eth_estimateGas', 'eth_getBlockByNumber', 'eth_getLogs', 'eth_getTransactionReceipt',
+    'eth_getTransactionByHash',
+}
+
+_stats = {}
+_stats_lock = threading.Lock()
+
+
+def request_key(method, params):
+    """Return the coalescing key for a request, or None if it must not be shared."""
+    if method not in READ_METHODS:
+        return None
+    # Params include the block tag, so 'latest' and a pinned block never share
+    return method, json.dumps(params, sort_keys=True, default=repr)
+
+
+def _count(network, shared):
+    with _stats_lock:
+        stats = _stats.setdefault(network, {'requests': 0, 'shared': 0})
+        stats['requests'] += 1
+        stats['shared'] += shared
+
+
+def get_coalescing_stats():
+    """Return {network: {'requests', 'shared'}} counted since start."""
+    with _stats_lock:
+        return {network: dict(stats) for network, stats in _stats.items()}
+
+
+def coalesce_provider(provider, network):
+    """Wrap a provider so identical in-flight requests share one call (single-flight)."""
+    inflight = {}
+    lock = threading.Lock()
+    make_request = provider.make_request
+
+    def join(key):
+        """Return (call, leader flag) for a key, registering a new call if none is in flight.
+
+        call is None if the in-flight call was made by a less urgent priority
+        class, so this caller is not held back by that class's queue.
+        """
+        rank = PRIORITIES.index(current_priority())
+        with lock:
+            call = inflight.get(key)
+            if call is not None:
+                return (call if rank >= call['rank'] else None), False
+            call = inflight[key] = {'event': threading.Event(), 'response': None, 'error': None,
+                                    'retry': False, 'rank': rank}
+            return call, True
+
+    def finish(key, call):
+        with lock:
+            del inflight[key]
+        call['event'].set()
+
+    def wait(call, method, params):
+        call['event'].wait()
+        if call['retry']:
+            return make_request(method, params)
+        if call['error'] is not None:
+            raise call['error']
+        # Callers may post-process their response, so each gets its own top-level dict
+        return dict(call['response'])
+
+    def coalesced_make_request(method, params):
+        key = request_key(method, params)
+        if key is None:
+            return make_request(method, params)
+        call, leader = join(key)
+        if call is None:
+            return make_request(method, params)
+        _count(network, not leader)
+        if not leader:
+            return wait(call, method, params)
+        try:
+            call['response'] = make_request(method, params)
+            return call['response']
+        except Exception as e:
+            call['error'] = e
+            raise
+        finally:
+            finish(key, call)
+
+    provider.make_request = coalesced_make_request
+
+    make_batch_request = getattr(provider, 'make_batch_request', None)
+    if make_batch_request is None:
+        return provider
+
+    def coalesced_make_batch_request(requests):
+        # Requests already in flight elsewhere are waited for; the rest are
+        # de-duplicated and sent as one batch led by this caller
+        keys = [request_key(method, params) for method, params in requests]
+        led = {}
+        joined = {}
+        send = []
+        for position, ((method, params), key) in enumerate(zip(requests, keys)):
+            if key is None:
+                send.append((method, params))
+                continue
+            if key in led or key in joined:
+                _count(network, True)
+                continue
+            call, leader = join(key)
+            if call is None:
+                send.append((method, params))
+                keys[position] = None
+                continue
+            _count(network, not leader)
+            if leader:
+                led[key] = (call, len(send))
+                send.append((method, params))
+            else:
+                joined[key] = call
+
+        try:
+            responses = make_batch_request(send) if send else []
+        except Exception:
+            responses = None
+        if not isinstance(responses, list) or len(responses) != len(send):
+            # The batch failed as a whole; anyone waiting on it sends their own request
+            for key, (call, _) in led.items():
+                call['retry'] = True
+                finish(key, call)
+            return responses
+
+        for key, (call, position) in led.items():
+            call['response'] = responses[position]
+            finish(key, call)
+
+        results = []
+        position = 0
+        for (method, params), key in zip(requests, keys):
+            if key is None:
+                results.append(responses[position])
+                position += 1
+            elif key in led:
+                call, leader_position = led[key]
+                if leader_position == position:
+                    position += 1
+                results.append(dict(responses[leader_position]))
+            else:
+                call = joined[key]
+                try:
+                    results.append(wait(call, method, params))
+                except Exception as e:
+                    results.append({'error': {'code': -1, 'message': str(e)}})
+        return results
+
+    provider.make_batch_request = coalesced_make_batch_request
+    return provider
@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+"""
+Historical Balance Snapshots
+Resolves dates to block numbers and reads wallet balances at those blocks,
+storing each snapshot in a columnar file so repeat reports are served locally.
+"""
+
+import os
+import sys
+import json
+import calendar
+import argparse
+import threading
+from datetime import datetime, timezone
+import numpy as np
+from config import SNAPSHOT_DIR, BLOCK_CACHE_FILE
+from chains import CHAINS
+from rpc import get_web3_connection
+from balances import fetch_all_balances
+from portfolio import portfolio_from_balances, asset_totals, to_decimal, get_raw_balance
+from main import load_wallets
+
+
+_cache_lock = threading.Lock()
+
+
+def load_block_cache(filename=BLOCK_CACHE_FILE):
+    """Load the {network: {timestamp: block}} cache from disk."""
+    if not os.path.exists(filename):
+        return {}
+    with open(filename) as f:
+        return json.load(f)
+
+
+def save_block_cache(cache, filename=BLOCK_CACHE_FILE):
+    """Write the block cache to disk."""
+    with _cache_lock:
+        tmp = filename + '.tmp'
+        with open(tmp, 'w') as f:
+            json.dump(cache, f, indent=1, sort_keys=True)
+        os.replace(tmp, filename)
+
+
+def parse_report_date(value):
+    """Parse YYYY-MM-DD (end of that day) or YYYY-MM (end of that month) into a UTC timestamp."""
+    parts = value.split('-')
+    if len(parts) == 2:
+        year, month = int(parts[0]), int(parts[1])
+        day = calendar.monthrange(year, month)[1]
+    elif len(parts) == 3:
+        year, month, day = int(parts[0]), int(parts[1]), int(parts[2])
+    else:
+        raise ValueError(f"Invalid date: {value} (use YYYY-MM-DD or YYYY-MM)")
+    end_of_day = datetime(year, month, day, 23, 59, 59, tzinfo=timezone.utc)
+    return int(end_of_day.timestamp())
+
+
+def get_block_timestamp(web3, number, timestamps):
+    """Return a block's timestamp, memoized in the timestamps dict."""
+    if number not in timestamps:
+        response = web3.provider.make_request('eth_getBlockByNumber', [hex(number), False])
+        block = response.get('result') if isinstance(response, dict) else None
+        if not block:
+            raise ValueError(f"Block {number} not available: {response.get('error') if isinstance(response, dict) else response}")
+        timestamps[number] = int(block['timestamp'], 16)
+    return timestamps[number]
+
+
+def resolve_block(network, timestamp, cache):
+    """Return the last block on a network with a timestamp at or before the given time.
+
+    Uses binary search over block timestamps, narrowed by previously resolved points.
+    """
+    network_cache = cache.setdefault(network, {})
+    key = str(timestamp)
+    if key in network_cache:
+        return network_cache[key]
+
+    web3 = get_web3_connection(network)
+    timestamps = {}
+    head = web3.eth.block_number
+    if get_block_timestamp(web3, head, timestamps) <= timestamp:
+        # The date is not over yet on this chain; do not cache a moving target
+        return head
+    if get_block_timestamp(web3, 0, timestamps) > timestamp:
+        raise ValueError(f"{network} did not exist at {timestamp}")
+
+    # Narrow the search range with cached results from earlier lookups
+    low, high = 0, head
+    for cached_ts, cached_block in network_cache.items():
+        cached_ts = int(cached_ts)
+        if cached_ts <= timestamp and cached_block > low:
+            low = cached_block
+        elif cached_ts > timestamp and cached_block < high:
+            high = cached_block
+
+    # Invariant: timestamp(low) <= target < timestamp(high)
+    while high - low > 1:
+        middle = (low + high) // 2
+        if get_block_timestamp(web3, middle, timestamps) <= timestamp:
+            low = middle
+        else:
+            high = middle
+
+    network_cache[key] = low
+    return low
+
+
+def snapshot_path(network, block, directory=SNAPSHOT_DIR):
+    return os.path.join(directory, f"{network}-{block}.npz")
+
+
+def save_snapshot(portfolio, network, block, timestamp, directory=SNAPSHOT_DIR):
+    """Store a portfolio snapshot as a compressed columnar file."""
+    os.makedirs(directory, exist_ok=True)
+    path = snapshot_path(network, block, directory)
+    tmp = path + '.tmp.npz'
+    np.savez_compressed(
+        tmp,
+        addresses=np.array(portfolio['addresses']),
+        assets=np.array(portfolio['assets']),
+        decimals=portfolio['decimals'],
+        limbs=portfolio['limbs'],
+        missing=portfolio['missing'],
+        meta=np.array([network, str(block), str(timestamp)]),
+    )
+    os.replace(tmp, path)
+    return path
+
+
+def load_snapshot(network, block, directory=SNAPSHOT_DIR):
+    """Load a stored snapshot as a portfolio, or None if it is not stored."""
+    path = snapshot_path(network, block, directory)
+    if not os.path.exists(path):
+        return None
+    with np.load(path) as data:
+        addresses = [str(a) for a in data['addresses']]
+        assets = [str(a) for a in data['assets']]
+        return {
+            'addresses': addresses,
+            'assets': assets,
+            'address_index': {address: i for i, address in enumerate(addresses)},
+            'asset_index': {asset: i for i, asset in enumerate(assets)},
+            'decimals': data['decimals'],
+            'limbs': data['limbs'],
+            'missing': data['missing'],
+        }
+
+
+def take_snapshot(network, addresses, block, timestamp, refresh=False):
+    """Return a portfolio of balances at a block, reading the chain only if not stored locally."""
+    if not refresh:
+        stored = load_snapshot(network, block)
+        if stored is not None and set(addresses) <= set(stored['address_index']):
+            return stored, True
+
+    balances = fetch_all_balances(addresses, networks=[network], block=block)
+    portfolio = portfolio_from_balances(balances)
+    # Do not persist snapshots with failed reads (e.g. the node has pruned that state)
+    if not portfolio['missing'].any():
+        save_snapshot(portfolio, network, block, timestamp)
+    return portfolio, False
+
+
+def print_snapshot_report(portfolio, network, block, label):
+    """Print per-wallet balances and totals for one snapshot."""
+    print(f"\n📅 {label} — {CHAINS[network]['name']} block {block}")
+    print("-" * 80)
+    for address in portfolio['addresses']:
+        parts = []
+        for asset in portfolio['assets']:
+            raw = get_raw_balance(portfolio, address, asset)
+            value = "n/a" if raw is None else f"{to_decimal(portfolio, asset, raw)}"
+            parts.append(f"{asset.split(':', 1)[1]}={value}")
+        print(f"  {address}: {', '.join(parts)}")
+    totals = asset_totals(portfolio)
+    print("  Σ " + ", ".join(f"{asset.split(':', 1)[1]}={to_decimal(portfolio, asset, total)}"
+                            for asset, total in totals.items()))
+
+
+def main():
+    """Main function to build historical balance reports."""
+    parser = argparse.ArgumentParser(description="Historical balance snapshots at block heights")
+    parser.add_argument('dates', nargs='+', help="Dates as YYYY-MM-DD (end of day UTC) or YYYY-MM (month end)")
+    parser.add_argument('--networks', default=','.join(CHAINS), help="Comma-separated networks")
+    parser.add_argument('--refresh', action='store_true', help="Ignore stored snapshots and re-read the chain")
+    args = parser.parse_args()
+
+    print("📅 Historical Balance Snapshots")
+    print("=" * 50)
+
+    networks = [n.strip().lower() for n in args.networks.split(',') if n.strip()]
+    unknown = [n for n in networks if n not in CHAINS]
+    if unknown:
+        print(f"❌ Unknown networks: {', '.join(unknown)}")
+        return 1
+
+    wallets = load_wallets()
+    if not wallets:
+        return 1
+    addresses = [wallet['address'] for wallet in wallets.values()]
+
+    cache = load_block_cache()
+    try:
+        for date in args.dates:
+            timestamp = parse_report_date(date)
+            for network in networks:
+                try:
+                    block = resolve_block(network, timestamp, cache)
+                    portfolio, cached = take_snapshot(network, addresses, block, timestamp, args.refresh)
+                except Exception as e:
+                    print(f"❌ {network} at {date}: {e}")
+                    continue
+                source = "💾 local" if cached else "🌐 chain"
+                print_snapshot_report(portfolio, network, block, f"{date} ({source})")
+    finally:
+        save_block_cache(cache)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
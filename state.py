@@ -0,0 +1,432 @@
+#!/usr/bin/env python3
+"""
+Local state store for the EVM Wallet Manager.
+Keeps the address index, last-known balances, nonce lanes, sent
+transaction history, discovered token metadata and scan checkpoints in an
+embedded SQLite database (WAL mode).
+"""
+
+import time
+import sqlite3
+import hashlib
+import threading
+from contextlib import contextmanager
+from config import STATE_DB_FILE
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS wallets (
+    idx INTEGER PRIMARY KEY,
+    address TEXT NOT NULL COLLATE NOCASE,
+    key_hash TEXT NOT NULL
+);
+CREATE UNIQUE INDEX IF NOT EXISTS wallets_key_hash ON wallets (key_hash);
+CREATE INDEX IF NOT EXISTS wallets_address ON wallets (address);
+
+CREATE TABLE IF NOT EXISTS balances (
+    address TEXT NOT NULL COLLATE NOCASE,
+    network TEXT NOT NULL,
+    asset TEXT NOT NULL,
+    raw TEXT NOT NULL,
+    block INTEGER,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (address, network, asset)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS balances_network_asset ON balances (network, asset);
+
+CREATE TABLE IF NOT EXISTS nonces (
+    address TEXT NOT NULL,
+    network TEXT NOT NULL,
+    next_nonce INTEGER NOT NULL,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (address, network)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS transactions (
+    tx_hash TEXT PRIMARY KEY,
+    network TEXT NOT NULL,
+    sender TEXT NOT NULL COLLATE NOCASE,
+    recipient TEXT NOT NULL COLLATE NOCASE,
+    asset TEXT NOT NULL,
+    amount_raw TEXT NOT NULL,
+    nonce INTEGER NOT NULL,
+    status TEXT NOT NULL,
+    block INTEGER,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    gas_price TEXT,
+    replaces TEXT
+);
+CREATE INDEX IF NOT EXISTS transactions_sender ON transactions (sender, created_at);
+CREATE INDEX IF NOT EXISTS transactions_recipient ON transactions (recipient, created_at);
+CREATE INDEX IF NOT EXISTS transactions_lane ON transactions (network, sender, nonce);
+CREATE INDEX IF NOT EXISTS transactions_status ON transactions (status);
+CREATE INDEX IF NOT EXISTS transactions_replaces ON transactions (replaces);
+
+CREATE TABLE IF NOT EXISTS code_cache (
+    network TEXT NOT NULL,
+    address TEXT NOT NULL,
+    is_contract INTEGER NOT NULL,
+    checked_at REAL NOT NULL,
+    PRIMARY KEY (network, address)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS tokens (
+    network TEXT NOT NULL,
+    address TEXT NOT NULL COLLATE NOCASE,
+    symbol TEXT,
+    name TEXT,
+    decimals INTEGER,
+    discovered_at REAL NOT NULL,
+    PRIMARY KEY (network, address)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS scan_checkpoints (
+    network TEXT NOT NULL,
+    scan_id TEXT NOT NULL,
+    next_block INTEGER NOT NULL,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (network, scan_id)
+) WITHOUT ROWID;
+"""
+
+# Columns added after the first release, applied to existing databases on open
+MIGRATIONS = [
+    ('transactions', 'gas_price', 'TEXT'),
+    ('transactions', 'replaces', 'TEXT'),
+]
+
+SQL_VARIABLES_PER_QUERY = 500  # bound parameters per IN (...) query, well under SQLite's limit
+
+_db = None
+_db_lock = threading.RLock()
+
+
+def get_state_db(filename=STATE_DB_FILE):
+    """Open (once) and return the state database connection."""
+    global _db
+    with _db_lock:
+        if _db is None:
+            db = sqlite3.connect(filename, check_same_thread=False, isolation_level=None)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            db.execute("PRAGMA foreign_keys=ON")
+            for table, column, column_type in MIGRATIONS:
+                columns = [row[1] for row in db.execute(f"PRAGMA table_info({table})")]
+                if columns and column not in columns:
+                    db.execute(f"ALTER TABLE {table} ADD COLUMN {column} {column_type}")
+            db.executescript(SCHEMA)
+            _db = db
+        return _db
+
+
+@contextmanager
+def _transaction(db, begin="BEGIN"):
+    """Run a block as one transaction on the shared connection (lock held), rolled back if it raises.
+
+    Without the rollback, a failed statement would leave the connection inside
+    the transaction and every later BEGIN on it would fail.
+    """
+    db.execute(begin)
+    try:
+        yield
+    except BaseException:
+        db.execute("ROLLBACK")
+        raise
+    db.execute("COMMIT")
+
+
+def key_hash(private_key):
+    """Return a one-way fingerprint of a private key (used to reuse stored addresses)."""
+    normalized = private_key.lower()
+    if normalized.startswith('0x'):
+        normalized = normalized[2:]
+    return hashlib.sha256(normalized.encode('utf-8')).hexdigest()
+
+
+def load_known_addresses():
+    """Return {key_hash: address} for every wallet seen before."""
+    db = get_state_db()
+    with _db_lock:
+        return dict(db.execute("SELECT key_hash, address FROM wallets").fetchall())
+
+
+def get_wallet_addresses():
+    """Return {wallet number: address} for every indexed wallet (no keystore password needed)."""
+    db = get_state_db()
+    with _db_lock:
+        return dict(db.execute("SELECT idx, address FROM wallets ORDER BY idx").fetchall())
+
+
+def save_wallets(wallets, replace=True):
+    """Store the index -> address mapping for all wallets (replace=False to add a partial unlock)."""
+    db = get_state_db()
+    rows = [(index, wallet['address'], key_hash(wallet['private_key'])) for index, wallet in wallets.items()]
+    with _db_lock:
+        with _transaction(db):
+            if replace:
+                db.execute("DELETE FROM wallets")
+            db.executemany("INSERT OR REPLACE INTO wallets (idx, address, key_hash) VALUES (?, ?, ?)", rows)
+
+
+def save_balances(balances, blocks):
+    """Store fetch_all_balances() output with the block each network was read at.
+
+    Failed reads (None) keep the previous last-known value.
+    """
+    db = get_state_db()
+    now = time.time()
+    rows = []
+    for network, by_address in balances.items():
+        block = blocks.get(network)
+        for address, assets in by_address.items():
+            for asset, raw in assets.items():
+                if raw is not None:
+                    rows.append((address, network, asset, str(raw), block, now))
+    with _db_lock:
+        with _transaction(db):
+            db.executemany(
+                "INSERT INTO balances (address, network, asset, raw, block, updated_at) VALUES (?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT (address, network, asset) DO UPDATE SET "
+                "raw = excluded.raw, block = excluded.block, updated_at = excluded.updated_at",
+                rows)
+
+
+def get_cached_balances(addresses, networks):
+    """Return last-known balances in fetch_all_balances() shape, plus {network: oldest block}."""
+    db = get_state_db()
+    addresses = list(addresses)
+    networks = list(networks)
+    by_lower = {address.lower(): address for address in addresses}
+    balances = {network: {address: {} for address in addresses} for network in networks}
+    blocks = {}
+    if not networks:
+        return balances, blocks
+    network_marks = ', '.join('?' * len(networks))
+    for start in range(0, len(addresses), SQL_VARIABLES_PER_QUERY):
+        chunk = addresses[start:start + SQL_VARIABLES_PER_QUERY]
+        with _db_lock:
+            rows = db.execute(
+                f"SELECT address, network, asset, raw, block FROM balances "
+                f"WHERE network IN ({network_marks}) AND address IN ({', '.join('?' * len(chunk))})",
+                (*networks, *chunk)).fetchall()
+        for address, network, asset, raw, block in rows:
+            balances[network][by_lower[address.lower()]][asset] = int(raw)
+            if block is not None:
+                blocks[network] = min(blocks.get(network, block), block)
+    return balances, blocks
+
+
+def allocate_nonce(address, network, chain_nonce):
+    """Reserve the next nonce in a (address, network) lane.
+
+    The lane never goes below the chain's pending nonce, so locally tracked
+    sends can be pipelined without another RPC round trip per send.
+    """
+    db = get_state_db()
+    with _db_lock:
+        with _transaction(db, "BEGIN IMMEDIATE"):
+            row = db.execute("SELECT next_nonce FROM nonces WHERE address = ? AND network = ?",
+                             (address, network)).fetchone()
+            nonce = max(chain_nonce, row[0]) if row else chain_nonce
+            db.execute(
+                "INSERT INTO nonces (address, network, next_nonce, updated_at) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT (address, network) DO UPDATE SET next_nonce = excluded.next_nonce, "
+                "updated_at = excluded.updated_at",
+                (address, network, nonce + 1, time.time()))
+    return nonce
+
+
+def release_nonce(address, network, nonce):
+    """Give back a nonce that was allocated but never broadcast, if it is the latest one."""
+    db = get_state_db()
+    with _db_lock:
+        db.execute("UPDATE nonces SET next_nonce = ?, updated_at = ? "
+                   "WHERE address = ? AND network = ? AND next_nonce = ?",
+                   (nonce, time.time(), address, network, nonce + 1))
+
+
+def record_transaction(tx_hash, network, sender, recipient, asset, amount_raw, nonce, status='pending',
+                       gas_price=None, replaces=None):
+    """Record a broadcast transaction (replaces links a fee bump or cancel to the hash it replaced)."""
+    db = get_state_db()
+    now = time.time()
+    with _db_lock:
+        db.execute(
+            "INSERT OR REPLACE INTO transactions (tx_hash, network, sender, recipient, asset, amount_raw, "
+            "nonce, status, block, created_at, updated_at, gas_price, replaces) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, NULL, ?, ?, ?, ?)",
+            (tx_hash, network, sender, recipient, asset, str(amount_raw), nonce, status, now, now,
+             None if gas_price is None else str(gas_price), replaces))
+
+
+def update_transaction(tx_hash, status, block=None):
+    """Update a transaction's status (and block once mined)."""
+    db = get_state_db()
+    with _db_lock:
+        db.execute("UPDATE transactions SET status = ?, block = COALESCE(?, block), updated_at = ? "
+                   "WHERE tx_hash = ?", (status, block, time.time(), tx_hash))
+
+
+def get_transaction(tx_hash):
+    """Return one recorded transaction, or None."""
+    db = get_state_db()
+    columns = "tx_hash, network, sender, recipient, asset, amount_raw, nonce, status, block, created_at, replaces"
+    with _db_lock:
+        row = db.execute(f"SELECT {columns} FROM transactions WHERE tx_hash = ?", (tx_hash,)).fetchone()
+    return dict(zip(columns.split(', '), row)) if row else None
+
+
+def count_recent_transfers(network, sender, recipient, asset, amount_raw, since):
+    """Return how many pending or confirmed transfers with these details were recorded at or after since."""
+    db = get_state_db()
+    with _db_lock:
+        return db.execute(
+            "SELECT COUNT(*) FROM transactions WHERE sender = ? AND created_at >= ? AND network = ? "
+            "AND recipient = ? AND asset = ? AND amount_raw = ? AND status IN ('pending', 'confirmed')",
+            (sender, since, network, recipient, asset, str(amount_raw))).fetchone()[0]
+
+
+def get_transaction_history(address=None, limit=50):
+    """Return sent transactions, newest first, optionally for one address (sender or recipient)."""
+    db = get_state_db()
+    columns = "tx_hash, network, sender, recipient, asset, amount_raw, nonce, status, block, created_at, replaces"
+    with _db_lock:
+        if address:
+            rows = db.execute(
+                f"SELECT {columns} FROM transactions WHERE sender = ? "
+                f"UNION ALL SELECT {columns} FROM transactions WHERE recipient = ? AND sender != ? "
+                "ORDER BY created_at DESC LIMIT ?",
+                (address, address, address, limit)).fetchall()
+        else:
+            rows = db.execute(f"SELECT {columns} FROM transactions ORDER BY created_at DESC LIMIT ?",
+                              (limit,)).fetchall()
+    keys = columns.split(', ')
+    return [dict(zip(keys, row)) for row in rows]
+
+
+def iter_transactions(page_size=1000):
+    """Yield every recorded transaction, oldest first, reading one page at a time."""
+    db = get_state_db()
+    columns = ("tx_hash, network, sender, recipient, asset, amount_raw, nonce, status, block, created_at, "
+               "gas_price, replaces")
+    keys = columns.split(', ')
+    after = (-1.0, '')
+    while True:
+        # Keyset paging, so the database lock is not held while rows are consumed
+        with _db_lock:
+            rows = db.execute(f"SELECT {columns} FROM transactions WHERE (created_at, tx_hash) > (?, ?) "
+                              "ORDER BY created_at, tx_hash LIMIT ?", (*after, page_size)).fetchall()
+        for row in rows:
+            yield dict(zip(keys, row))
+        if len(rows) < page_size:
+            return
+        after = (rows[-1][9], rows[-1][0])
+
+
+def get_pending_transactions(older_than=None):
+    """Return pending transactions, optionally only those broadcast more than older_than seconds ago."""
+    db = get_state_db()
+    columns = "tx_hash, network, sender, recipient, asset, amount_raw, nonce, gas_price, replaces, created_at"
+    cutoff = time.time() - older_than if older_than is not None else time.time()
+    with _db_lock:
+        rows = db.execute(f"SELECT {columns} FROM transactions WHERE status = 'pending' AND created_at <= ? "
+                          "ORDER BY network, sender, nonce", (cutoff,)).fetchall()
+    keys = columns.split(', ')
+    return [dict(zip(keys, row)) for row in rows]
+
+
+def get_replacement_chain(tx_hash):
+    """Return [tx_hash, replacement, replacement of the replacement, ...] for a transaction."""
+    db = get_state_db()
+    chain = [tx_hash]
+    with _db_lock:
+        while True:
+            row = db.execute("SELECT tx_hash FROM transactions WHERE replaces = ? ORDER BY created_at DESC LIMIT 1",
+                             (chain[-1],)).fetchone()
+            if row is None or row[0] in chain:
+                return chain
+            chain.append(row[0])
+
+
+def get_original_chain(tx_hash):
+    """Return [tx_hash, the hash it replaced, ...] back to the original transaction."""
+    db = get_state_db()
+    chain = [tx_hash]
+    with _db_lock:
+        while True:
+            row = db.execute("SELECT replaces FROM transactions WHERE tx_hash = ?", (chain[-1],)).fetchone()
+            if row is None or row[0] is None or row[0] in chain:
+                return chain
+            chain.append(row[0])
+
+
+def get_cached_code(network, addresses, max_age=None):
+    """Return {address: is_contract} for addresses with a cached eth_getCode result.
+
+    Contracts are cached for good; results for plain accounts expire after max_age seconds.
+    """
+    db = get_state_db()
+    addresses = list(addresses)
+    cutoff = time.time() - max_age if max_age is not None else 0
+    found = {}
+    with _db_lock:
+        for start in range(0, len(addresses), 500):
+            chunk = addresses[start:start + 500]
+            rows = db.execute(
+                f"SELECT address, is_contract FROM code_cache WHERE network = ? AND address IN "
+                f"({', '.join('?' * len(chunk))}) AND (is_contract = 1 OR checked_at >= ?)",
+                [network] + chunk + [cutoff]).fetchall()
+            found.update((address, bool(is_contract)) for address, is_contract in rows)
+    return found
+
+
+def save_code_cache(network, results):
+    """Store {address: is_contract} eth_getCode results for a network."""
+    db = get_state_db()
+    now = time.time()
+    with _db_lock:
+        with _transaction(db):
+            db.executemany(
+                "INSERT OR REPLACE INTO code_cache (network, address, is_contract, checked_at) VALUES (?, ?, ?, ?)",
+                [(network, address, int(is_contract), now) for address, is_contract in results.items()])
+
+
+def get_token_metadata(network):
+    """Return {token address: {'symbol', 'name', 'decimals'}} for tokens cached on a network."""
+    db = get_state_db()
+    with _db_lock:
+        rows = db.execute("SELECT address, symbol, name, decimals FROM tokens WHERE network = ?",
+                          (network,)).fetchall()
+    return {address: {'symbol': symbol, 'name': name, 'decimals': decimals}
+            for address, symbol, name, decimals in rows}
+
+
+def save_token_metadata(network, tokens):
+    """Store {token address: {'symbol', 'name', 'decimals'}} for a network."""
+    db = get_state_db()
+    now = time.time()
+    with _db_lock:
+        with _transaction(db):
+            db.executemany(
+                "INSERT OR REPLACE INTO tokens (network, address, symbol, name, decimals, discovered_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                [(network, address, meta.get('symbol'), meta.get('name'), meta.get('decimals'), now)
+                 for address, meta in tokens.items()])
+
+
+def get_scan_checkpoint(network, scan_id):
+    """Return the next block to scan for a resumable scan, or None if it never ran."""
+    db = get_state_db()
+    with _db_lock:
+        row = db.execute("SELECT next_block FROM scan_checkpoints WHERE network = ? AND scan_id = ?",
+                         (network, scan_id)).fetchone()
+    return row[0] if row else None
+
+
+def save_scan_checkpoint(network, scan_id, next_block):
+    """Record that a scan has covered every block below next_block."""
+    db = get_state_db()
+    with _db_lock:
+        db.execute("INSERT OR REPLACE INTO scan_checkpoints (network, scan_id, next_block, updated_at) "
+                   "VALUES (?, ?, ?, ?)", (network, scan_id, next_block, time.time()))
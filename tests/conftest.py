@@ -0,0 +1,17 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import state  # noqa: E402
+
+
+@pytest.fixture
+def state_db(tmp_path, monkeypatch):
+    """Point the state store at a fresh database for one test."""
+    monkeypatch.setattr(state, '_db', None)
+    db = state.get_state_db(str(tmp_path / 'state.db'))
+    yield db
+    db.close()
@@ -0,0 +1,39 @@
+import pytest
+
+from addresses import to_checksum, validate_address, validate_addresses
+
+# Test vectors from EIP-55
+CHECKSUMMED = [
+    '0x5aAeb6053F3E94C9b9A09f33669435E7Ef1BeAed',
+    '0xfB6916095ca1df60bB79Ce92cE3Ea74c37c5d359',
+    '0xdbF03B407c01E7cD3CBea99509d93f8DDDC8C6FB',
+    '0xD1220A0cf47c7B9Be7A2E6BA89F429762e7b9aDb',
+]
+
+
+@pytest.mark.parametrize('address', CHECKSUMMED)
+def test_eip55_vectors(address):
+    assert to_checksum(address.lower()) == address
+    assert validate_address(address) == (address, None)
+    # No checksum to check in a single-case address
+    assert validate_address(address.lower()) == (address, None)
+    assert validate_address('0x' + address[2:].upper()) == (address, None)
+
+
+@pytest.mark.parametrize('address', CHECKSUMMED)
+def test_mixed_case_with_a_wrong_checksum_is_rejected(address):
+    position = next(i for i, c in enumerate(address) if i > 1 and c.isalpha())
+    flipped = address[:position] + address[position].swapcase() + address[position + 1:]
+    assert validate_address(flipped) == (None, f"bad EIP-55 checksum (expected {address})")
+
+
+def test_malformed_addresses_and_duplicates():
+    assert validate_address('5aAeb6053F3E94C9b9A09f33669435E7Ef1BeAed')[1] == "missing 0x prefix"
+    assert validate_address('0x5aAeb6053F3E94C9b9A09f33669435E7Ef1BeA')[1] == "wrong length (40 characters, expected 42)"
+    assert validate_address('0x5aAeb6053F3E94C9b9A09f33669435E7Ef1BeAeg')[1] == "not hexadecimal"
+
+    first_seen, errors, duplicates = validate_addresses(
+        [(1, CHECKSUMMED[0]), (2, CHECKSUMMED[0].lower()), (3, '0x123'), (4, CHECKSUMMED[1])])
+    assert list(first_seen) == [CHECKSUMMED[0], CHECKSUMMED[1]]
+    assert duplicates == [(2, CHECKSUMMED[0], 1)]
+    assert [line for line, _, _ in errors] == [3]
@@ -0,0 +1,44 @@
+from decimal import Decimal
+
+import pytest
+
+import alerts
+
+ADDRESS = '0x1111111111111111111111111111111111111111'
+ETH = 10 ** 18
+
+
+@pytest.fixture
+def engine(monkeypatch):
+    monkeypatch.setattr(alerts, 'ALERT_DEBOUNCE_SECONDS', 0)
+    monkeypatch.setattr(alerts, 'ALERT_REPEAT_SECONDS', 100)
+    monkeypatch.setattr(alerts, 'chain_asset_decimals', lambda network: {'ETH': 18})
+    monkeypatch.setattr(alerts, 'notify', lambda engine, notice: None)
+    rules = [
+        {'name': 'low', 'network': 'ethereum', 'asset': 'ETH', 'wallets': [], 'condition': 'below',
+         'amount': Decimal(1), 'window': None},
+        {'name': 'outflow', 'network': 'ethereum', 'asset': 'ETH', 'wallets': [], 'condition': 'drop',
+         'amount': Decimal(1), 'window': 50},
+    ]
+    return alerts.new_alert_engine(rules, webhook_url=None)
+
+
+def _observe(engine, raw, now):
+    notices = alerts.observe_balances(engine, {'ethereum': {ADDRESS: {'ETH': raw}}}, now=now)
+    return [(notice['rule'], notice['status']) for notice in notices]
+
+
+def test_rate_alert_resolves_when_the_drop_leaves_its_window(engine):
+    assert _observe(engine, 3 * ETH, now=0) == []
+    assert _observe(engine, ETH // 2, now=10) == [('low', 'firing'), ('outflow', 'firing')]
+    assert alerts.check_due_alerts(engine, now=30) == []
+    # The 3 ETH balance leaves the 50s window at 60s; the balance itself never changes again
+    assert [notice['status'] for notice in alerts.check_due_alerts(engine, now=60)] == ['resolved']
+
+
+def test_steady_firing_alert_is_repeated(engine):
+    _observe(engine, ETH // 2, now=0)
+    assert _observe(engine, ETH // 2, now=50) == []
+    assert _observe(engine, ETH // 2, now=100) == [('low', 'firing')]
+    assert [notice['rule'] for notice in alerts.check_due_alerts(engine, now=200)] == ['low']
+    assert alerts.firing_alerts(engine) == 1
@@ -0,0 +1,108 @@
+import time
+
+import pytest
+
+import breaker
+from breaker import CLOSED, OPEN, HALF_OPEN, CircuitOpenError, breaker_provider, failover_provider, get_breaker
+
+
+class FakeProvider:
+    def __init__(self, name):
+        self.name = name
+        self.down = False
+        self.delay = 0.0
+        self.calls = 0
+
+    def make_request(self, method, params):
+        self.calls += 1
+        time.sleep(self.delay)
+        if self.down:
+            raise ConnectionError(f"{self.name} unreachable")
+        if method == 'eth_call':
+            return {'error': {'code': 3, 'message': 'execution reverted'}}
+        return {'result': self.name}
+
+
+@pytest.fixture(autouse=True)
+def short_cool_down(monkeypatch):
+    monkeypatch.setattr(breaker, 'BREAKER_OPEN_SECONDS', 0.1)
+    monkeypatch.setattr(breaker, 'BREAKER_CONSECUTIVE_FAILURES', 3)
+    monkeypatch.setattr(breaker, 'BREAKER_HALF_OPEN_PROBES', 1)
+
+
+def _fail(provider, times):
+    for _ in range(times):
+        with pytest.raises(ConnectionError):
+            provider.make_request('eth_blockNumber', [])
+
+
+def test_circuit_opens_probes_and_closes():
+    endpoint = FakeProvider('node')
+    provider = breaker_provider(endpoint, 'breaker-net', 'node-a')
+    state = get_breaker('breaker-net', 'node-a')
+
+    # Reverts are healthy answers
+    for _ in range(5):
+        assert 'error' in provider.make_request('eth_call', [])
+    assert state['state'] == CLOSED
+
+    endpoint.down = True
+    _fail(provider, 3)
+    assert state['state'] == OPEN
+    with pytest.raises(CircuitOpenError):
+        provider.make_request('eth_blockNumber', [])
+    assert endpoint.calls == 8
+
+    # A failed probe reopens the circuit with a doubled cool-down
+    time.sleep(0.15)
+    _fail(provider, 1)
+    assert state['state'] == OPEN and state['open_seconds'] == pytest.approx(0.2)
+    time.sleep(0.15)
+    with pytest.raises(CircuitOpenError):
+        provider.make_request('eth_blockNumber', [])
+
+    # Half-open lets one probe through at a time, and a good probe closes the circuit
+    time.sleep(0.1)
+    endpoint.down = False
+    assert breaker.allow_call(state) == (True, 0.0) and state['state'] == HALF_OPEN
+    with pytest.raises(CircuitOpenError):
+        provider.make_request('eth_blockNumber', [])
+    breaker.record_outcome(state, False, 0.01)
+    assert state['state'] == CLOSED and state['open_seconds'] == pytest.approx(0.1)
+    assert provider.make_request('eth_blockNumber', []) == {'result': 'node'}
+    assert breaker.get_breaker_states()[('breaker-net', 'node-a')]['trips'] == 2
+
+
+def test_slow_answers_count_as_failures(monkeypatch):
+    monkeypatch.setattr(breaker, 'BREAKER_SLOW_SECONDS', 0.02)
+    endpoint = FakeProvider('slow')
+    endpoint.delay = 0.05
+    provider = breaker_provider(endpoint, 'breaker-net', 'node-slow')
+    for _ in range(3):
+        assert provider.make_request('eth_blockNumber', []) == {'result': 'slow'}
+    assert get_breaker('breaker-net', 'node-slow')['state'] == OPEN
+
+
+def test_open_circuit_fails_over_to_the_next_endpoint():
+    primary_endpoint = FakeProvider('primary')
+    backup_endpoint = FakeProvider('backup')
+    built = []
+
+    def build_backup():
+        built.append(1)
+        return breaker_provider(backup_endpoint, 'failover-net', 'node-b')
+
+    provider = failover_provider(breaker_provider(primary_endpoint, 'failover-net', 'node-a'), [build_backup])
+    assert provider.make_request('eth_blockNumber', []) == {'result': 'primary'}
+    assert built == []
+
+    primary_endpoint.down = True
+    _fail(provider, 3)
+    assert provider.make_request('eth_blockNumber', []) == {'result': 'backup'}
+    assert primary_endpoint.calls == 4 and built == [1]
+
+    # With every circuit open the caller gets CircuitOpenError
+    backup_endpoint.down = True
+    _fail(provider, 3)
+    with pytest.raises(CircuitOpenError):
+        provider.make_request('eth_blockNumber', [])
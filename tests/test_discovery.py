@@ -0,0 +1,56 @@
+import pytest
+
+import discovery
+
+ADDRESS = '0x1111111111111111111111111111111111111111'
+
+
+@pytest.mark.parametrize('message', [
+    "query returned more than 10000 results",
+    "Log response size exceeded. You can make eth_getLogs requests with up to a 2K block range",
+    "exceed maximum block range: 5000",
+    "block range is too wide",
+])
+def test_result_and_range_limits_are_too_large(message):
+    assert discovery.is_too_large_error(message)
+    assert not discovery.is_transient_error(message)
+
+
+@pytest.mark.parametrize('message', [
+    "429 Client Error: Too Many Requests for url: https://rpc.example",
+    "rate limit exceeded",
+    "HTTPSConnectionPool(host='rpc.example', port=443): Read timed out. (read timeout=10)",
+])
+def test_rate_limits_and_timeouts_are_transient(message):
+    assert discovery.is_transient_error(message)
+    assert not discovery.is_too_large_error(message)
+
+
+def test_rate_limited_chunk_is_retried_whole_after_a_backoff(state_db, monkeypatch):
+    monkeypatch.setattr(discovery, 'DISCOVERY_BACKOFF_SECONDS', 0.01)
+    calls = []
+
+    def fetch(network, topics, low, high):
+        calls.append((low, high))
+        if len(calls) <= 2:
+            raise ValueError("429 Client Error: Too Many Requests")
+        return set(), 0.0
+
+    monkeypatch.setattr(discovery, 'fetch_transfer_tokens', fetch)
+    discovery.discover_tokens('ethereum', [ADDRESS], 0, 999, workers=1, chunk_blocks=1000)
+    assert calls == [(0, 999)] * 3
+
+
+def test_too_large_chunk_is_split(state_db, monkeypatch):
+    calls = []
+
+    def fetch(network, topics, low, high):
+        calls.append((low, high))
+        if high - low >= 500:
+            raise ValueError("query returned more than 10000 results")
+        return set(), 0.0
+
+    monkeypatch.setattr(discovery, 'fetch_transfer_tokens', fetch)
+    discovery.discover_tokens('ethereum', [ADDRESS], 0, 999, workers=1, chunk_blocks=1000)
+    assert calls[0] == (0, 999)
+    assert sorted(calls[1:]) == [(0, 499), (500, 999)]
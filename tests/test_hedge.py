@@ -0,0 +1,55 @@
+import time
+
+import pytest
+
+import hedge
+
+
+class FakeProvider:
+    def __init__(self, name, delay, response=None):
+        self.name = name
+        self.delay = delay
+        self.response = response or {'result': name}
+        self.calls = 0
+
+    def make_request(self, method, params):
+        self.calls += 1
+        time.sleep(self.delay)
+        return self.response
+
+
+@pytest.fixture(autouse=True)
+def short_delay(monkeypatch):
+    monkeypatch.setattr(hedge, 'hedge_delay', lambda network, endpoint: 0.05)
+
+
+def test_slow_read_is_answered_by_the_backup():
+    primary = hedge.hedge_provider(FakeProvider('primary', 1.0), 'hedge-slow', 'a', FakeProvider('backup', 0.0))
+    started = time.perf_counter()
+    assert primary.make_request('eth_getBalance', []) == {'result': 'backup'}
+    assert time.perf_counter() - started < 0.5
+    assert hedge.get_hedge_stats()['hedge-slow'] == {'reads': 1, 'hedged': 1, 'backup_wins': 1}
+    # Sends are never hedged
+    assert primary.make_request('eth_sendRawTransaction', []) == {'result': 'primary'}
+
+
+def test_first_good_answer_wins_over_an_earlier_error():
+    error = {'error': {'code': -32000, 'message': 'header not found'}}
+    primary = hedge.hedge_provider(FakeProvider('primary', 0.1, error), 'hedge-error', 'a', FakeProvider('backup', 0.3))
+    assert primary.make_request('eth_getBalance', []) == {'result': 'backup'}
+    # Both failing: the error comes back
+    primary = hedge.hedge_provider(FakeProvider('primary', 0.1, error), 'hedge-error', 'a',
+                                   FakeProvider('backup', 0.2, error))
+    assert primary.make_request('eth_getBalance', []) == error
+
+
+def test_hedges_stop_when_the_budget_is_spent(monkeypatch):
+    monkeypatch.setattr(hedge, 'HEDGE_MAX_RATIO', 0.0)
+    monkeypatch.setattr(hedge, 'HEDGE_BURST', 1)
+    backup = FakeProvider('backup', 0.0)
+    primary = hedge.hedge_provider(FakeProvider('primary', 0.2), 'hedge-budget', 'a', backup)
+
+    assert [primary.make_request('eth_getBalance', [])['result'] for _ in range(3)] == \
+        ['backup', 'primary', 'primary']
+    assert backup.calls == 1
+    assert hedge.get_hedge_stats()['hedge-budget'] == {'reads': 3, 'hedged': 1, 'backup_wins': 1}
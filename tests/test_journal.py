@@ -0,0 +1,57 @@
+from web3.datastructures import AttributeDict
+
+from journal import CONFIRMED, CANCELLED, SIGNED, open_journal, append_entry, close_journal, record_receipt
+from payouts import unsent_rows
+from state import record_transaction, get_transaction
+
+SENDER = '0x1111111111111111111111111111111111111111'
+RECIPIENT = '0x2222222222222222222222222222222222222222'
+ORIGINAL = '0x' + 'aa' * 32
+REPLACEMENT = '0x' + 'bb' * 32
+
+
+def _receipt(tx_hash, block=100, status=1):
+    return AttributeDict({'transactionHash': bytes.fromhex(tx_hash[2:]), 'blockNumber': block, 'status': status})
+
+
+def _journal_item(journal, tx_hash=ORIGINAL):
+    item = {'id': 'row-2', 'network': 'ethereum', 'sender': SENDER, 'recipient': RECIPIENT, 'asset': 'ETH',
+            'amount_raw': '5000', 'nonce': 7, 'tx_hash': tx_hash}
+    append_entry(journal, item['id'], SIGNED, **{k: v for k, v in item.items() if k != 'id'})
+    item['status'] = SIGNED
+    return item
+
+
+def _replace(recipient, amount_raw):
+    record_transaction(ORIGINAL, 'ethereum', SENDER, RECIPIENT, 'ETH', 5000, 7)
+    record_transaction(REPLACEMENT, 'ethereum', SENDER, recipient, 'ETH', amount_raw, 7, replaces=ORIGINAL)
+
+
+def test_mined_cancel_is_cancelled_and_resent(state_db, tmp_path):
+    _replace(SENDER, 0)
+    path = str(tmp_path / 'batch.jsonl')
+    journal = open_journal(path)
+    item = _journal_item(journal)
+
+    status = record_receipt(journal, item, _receipt(REPLACEMENT))
+    close_journal(journal)
+
+    assert status == CANCELLED
+    assert get_transaction(ORIGINAL)['status'] == CANCELLED
+    assert get_transaction(REPLACEMENT)['status'] == CONFIRMED
+    # The payout row is sent again on the next run
+    assert unsent_rows([{'id': 'row-2'}, {'id': 'row-3'}], path) == [{'id': 'row-2'}, {'id': 'row-3'}]
+
+
+def test_mined_fee_bump_is_confirmed(state_db, tmp_path):
+    _replace(RECIPIENT, 5000)
+    path = str(tmp_path / 'batch.jsonl')
+    journal = open_journal(path)
+    item = _journal_item(journal)
+
+    status = record_receipt(journal, item, _receipt(REPLACEMENT))
+    close_journal(journal)
+
+    assert status == CONFIRMED
+    assert get_transaction(REPLACEMENT)['status'] == CONFIRMED
+    assert unsent_rows([{'id': 'row-2'}, {'id': 'row-3'}], path) == [{'id': 'row-3'}]
@@ -0,0 +1,59 @@
+import json
+
+import pytest
+
+import metrics
+
+
+class FakeProvider:
+    endpoint_uri = 'http://node.example/key'
+
+    def encode_rpc_request(self, method, params):
+        return json.dumps([method, params]).encode()
+
+    def decode_rpc_response(self, raw_response):
+        return json.loads(raw_response)
+
+    def make_request(self, method, params):
+        return self.decode_rpc_response(json.dumps({'result': '0x1'}).encode())
+
+    def encode_batch_rpc_request(self, requests):
+        return b'x' * 10
+
+    def make_batch_request(self, requests):
+        self.encode_batch_rpc_request(requests)
+        if requests[0][0] == 'boom':
+            raise ConnectionError('reset')
+        self.decode_rpc_response(b'{"a":' + b'1' * 94 + b'}')
+        return [{'error': {'code': -32000}} if method == 'eth_call' else {'result': '0x1'}
+                for method, _ in requests]
+
+
+@pytest.fixture
+def provider():
+    metrics.reset_metrics()
+    yield metrics.instrument_provider(FakeProvider(), 'ethereum')
+    metrics.reset_metrics()
+
+
+def test_batch_items_get_their_own_errors_and_bytes(provider):
+    provider.make_batch_request([('eth_getBalance', []), ('eth_call', []), ('eth_getBalance', [])])
+    snapshot = {method: series for (_, _, method), series in metrics.get_metrics_snapshot().items()}
+
+    assert snapshot['eth_getBalance']['calls'] == 2 and snapshot['eth_getBalance']['errors'] == 0
+    assert snapshot['eth_call']['calls'] == 1 and snapshot['eth_call']['errors'] == 1
+    assert sum(series['bytes_sent'] for series in snapshot.values()) == 10
+    assert sum(series['bytes_received'] for series in snapshot.values()) == 100
+    # Only the round trip is timed
+    assert sum(snapshot[metrics.BATCH_METHOD]['buckets']) == 1
+    assert not any(snapshot['eth_getBalance']['buckets']) and not any(snapshot['eth_call']['buckets'])
+    assert 'method="eth_call"' not in metrics.render_prometheus().split('wallet_rpc_latency_seconds')[-1]
+
+
+def test_failed_batch_counts_every_item_as_an_error(provider):
+    with pytest.raises(ConnectionError):
+        provider.make_batch_request([('boom', []), ('eth_call', [])])
+    snapshot = {method: series for (_, _, method), series in metrics.get_metrics_snapshot().items()}
+
+    assert snapshot['boom']['errors'] == 1 and snapshot['eth_call']['errors'] == 1
+    assert snapshot[metrics.BATCH_METHOD]['errors'] == 1
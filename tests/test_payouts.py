@@ -0,0 +1,47 @@
+from payouts import batch_journal_path, read_payouts, already_sent_rows
+from state import record_transaction
+
+SENDER = '0x1111111111111111111111111111111111111111'
+ALICE = '0x2222222222222222222222222222222222222222'
+BOB = '0x3333333333333333333333333333333333333333'
+WALLETS = {1: {'address': SENDER, 'private_key': '0x' + '11' * 32}}
+
+
+def _write(tmp_path, name, lines):
+    path = tmp_path / name
+    path.write_text("\n".join(lines) + "\n")
+    return str(path)
+
+
+def test_ids_survive_edits_and_repeats_are_distinct(tmp_path):
+    header = "wallet,network,token,recipient,amount"
+    first = _write(tmp_path, 'june.csv', [header, f"1,ethereum,ETH,{ALICE},1.5", f"1,ethereum,ETH,{BOB},2",
+                                          f"1,ethereum,ETH,{ALICE},1.5"])
+    rows, errors = read_payouts(first, WALLETS)
+    assert errors == []
+    assert len({row['id'] for row in rows}) == 3
+
+    # Dropping the first row and reordering keeps every other row's identity
+    edited = _write(tmp_path, 'edited.csv', [header, f"1,ethereum,ETH,{BOB},2", f"1,ethereum,ETH,{ALICE},1.5"])
+    edited_rows, _ = read_payouts(edited, WALLETS)
+    assert [row['id'] for row in edited_rows] == [rows[1]['id'], rows[0]['id']]
+    assert batch_journal_path(first) == batch_journal_path(str(tmp_path / 'june.csv'))
+
+
+def test_id_column_and_duplicate_ids(tmp_path):
+    header = "id,wallet,network,token,recipient,amount"
+    path = _write(tmp_path, 'ids.csv', [header, f"a,1,ethereum,ETH,{ALICE},1", f"a,1,ethereum,ETH,{BOB},1"])
+    rows, errors = read_payouts(path, WALLETS)
+    assert [row['id'] for row in rows] == ['a']
+    assert errors == ["line 3: duplicate id a"]
+
+
+def test_already_sent_rows_matches_the_state_store(state_db, tmp_path):
+    header = "wallet,network,token,recipient,amount"
+    path = _write(tmp_path, 'p.csv', [header, f"1,ethereum,ETH,{ALICE},1", f"1,ethereum,ETH,{ALICE},1",
+                                      f"1,ethereum,ETH,{BOB},1"])
+    rows, _ = read_payouts(path, WALLETS)
+    record_transaction('0x' + 'aa' * 32, 'ethereum', SENDER, ALICE.upper().replace('0X', '0x'), 'ETH', 10 ** 18, 0)
+    record_transaction('0x' + 'bb' * 32, 'ethereum', SENDER, BOB, 'ETH', 10 ** 18, 1, status='failed')
+
+    assert already_sent_rows(rows, since=0) == [rows[0]]
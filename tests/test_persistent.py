@@ -0,0 +1,118 @@
+import json
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from benchmarks.mock_rpc import start_mock_ws_rpc, drop_connections, freeze_connections
+from persistent import RPCConnection, IPCTransport
+
+
+def _wait_for(condition, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() >= deadline:
+            return False
+        time.sleep(0.02)
+    return True
+
+
+def _block_number(connection, request_id):
+    data = json.dumps({'jsonrpc': '2.0', 'id': request_id, 'method': 'eth_blockNumber', 'params': []})
+    return json.loads(connection.request(data.encode('utf-8'), [request_id]))
+
+
+@pytest.fixture
+def server():
+    server = start_mock_ws_rpc(block_time=0.2)
+    yield server
+    server.shutdown()
+
+
+@pytest.fixture
+def connection(server):
+    connection = RPCConnection(server.url, timeout=10.0, max_reconnect_delay=0.5)
+    yield connection
+    connection.close()
+
+
+def test_concurrent_requests_and_subscriptions_share_one_socket(server, connection):
+    heads = {1: [], 2: []}
+    first = connection.subscribe(['newHeads'], heads[1].append)
+    second = connection.subscribe(['newHeads'], heads[2].append)
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        responses = list(pool.map(lambda n: _block_number(connection, f'req-{n}'), range(40)))
+
+    assert [response['id'] for response in responses] == [f'req-{n}' for n in range(40)]
+    assert all('result' in response for response in responses)
+    assert _wait_for(lambda: len(heads[1]) >= 2 and len(heads[2]) >= 2)
+    assert len(server.state['connections']) == 1
+
+    connection.unsubscribe(first)
+    count = len(heads[1])
+    assert _wait_for(lambda: len(heads[2]) >= count + 3)
+    assert len(heads[1]) <= count + 1
+    connection.unsubscribe(second)
+
+
+def test_subscriptions_are_renewed_after_a_dropped_connection(server, connection):
+    heads = []
+    received = threading.Event()
+    connection.subscribe(['newHeads'], lambda head: (heads.append(head), received.set()))
+    assert received.wait(10)
+
+    drop_connections(server)
+    assert _wait_for(lambda: connection.reconnects == 1 and connection.connected.is_set())
+    count = len(heads)
+    assert _wait_for(lambda: len(heads) >= count + 2)
+    assert 'result' in _block_number(connection, 'after-reconnect')
+
+
+def test_half_open_connection_is_detected_by_keepalive(server):
+    connection = RPCConnection(server.url, timeout=10.0, max_reconnect_delay=0.5,
+                               keepalive_interval=0.3, keepalive_timeout=0.3)
+    try:
+        heads = []
+        connection.subscribe(['newHeads'], heads.append)
+        assert _wait_for(lambda: len(heads) >= 1)
+
+        # The socket stays open but nothing comes back: no heads, no pongs
+        freeze_connections(server)
+        assert _wait_for(lambda: connection.reconnects == 1 and connection.connected.is_set())
+        count = len(heads)
+        assert _wait_for(lambda: len(heads) >= count + 2)
+    finally:
+        connection.close()
+
+
+def test_ipc_messages_are_parsed_whole(tmp_path):
+    path = str(tmp_path / 'node.ipc')
+    listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    listener.bind(path)
+    listener.listen(1)
+    first = json.dumps({'jsonrpc': '2.0', 'id': 1, 'result': 'héllo ✓'}, ensure_ascii=False).encode('utf-8')
+    second = json.dumps({'jsonrpc': '2.0', 'id': 2, 'result': [1, 2]}).encode('utf-8')
+    third = json.dumps({'jsonrpc': '2.0', 'id': 3, 'result': None}).encode('utf-8')
+
+    def serve():
+        peer, _ = listener.accept()
+        split = first.index('✓'.encode('utf-8')) + 1
+        # A chunk ending mid-character, two messages in one chunk, then one without a newline
+        for chunk in (first[:split], first[split:] + b'\n' + second[:5], second[5:] + b'\n' + third):
+            peer.sendall(chunk)
+            time.sleep(0.05)
+        peer.close()
+
+    thread = threading.Thread(target=serve, daemon=True)
+    thread.start()
+    transport = IPCTransport(path, timeout=5.0)
+    try:
+        assert [transport.recv() for _ in range(3)] == [first, second, third]
+        with pytest.raises(ConnectionError):
+            transport.recv()
+    finally:
+        transport.close()
+        listener.close()
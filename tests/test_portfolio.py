@@ -0,0 +1,44 @@
+import random
+
+import portfolio as pf
+
+ASSET = 'ethereum:USDT'
+
+
+def _portfolio(raws, decimals=18):
+    addresses = [f"0x{n:040x}" for n in range(len(raws))]
+    portfolio = pf.create_portfolio(addresses, [ASSET], [decimals])
+    pf.set_asset_column(portfolio, ASSET, raws)
+    return portfolio
+
+
+def test_limb_arithmetic_is_exact_above_64_bits():
+    raws = [2 ** 64, 2 ** 64 - 1, 2 ** 255 + 12345, None, 10 ** 30 + 1, 0]
+    portfolio = _portfolio(raws)
+    assert portfolio['limbs'].shape[2] == pf.MAX_LIMBS
+
+    assert [pf.get_raw_balance(portfolio, address, ASSET) for address in portfolio['addresses']] == raws
+    assert pf.asset_totals(portfolio) == {ASSET: sum(raw or 0 for raw in raws)}
+
+    # 10**30 + 1 wei is above 10**12 tokens, 10**30 is not; floats cannot tell them apart
+    assert list(pf.wallets_above(portfolio, ASSET, 10 ** 12)) == [2, 4]
+    assert list(pf.wallets_above(portfolio, ASSET, '1000000000000.000000000000000001')) == [2]
+    assert list(pf.wallets_below(portfolio, ASSET, 10 ** 12, inclusive=True)) == [0, 1, 5]
+
+    # A single value set later grows the limbs of a portfolio built small
+    small = _portfolio([1, 2])
+    pf.set_balance(small, small['addresses'][1], ASSET, 2 ** 100 + 7)
+    assert pf.get_raw_balance(small, small['addresses'][1], ASSET) == 2 ** 100 + 7
+    assert pf.asset_totals(small) == {ASSET: 2 ** 100 + 8}
+
+
+def test_top_wallets_matches_an_exact_sort():
+    rng = random.Random(7)
+    # Close values far above 2**53, so the float pre-selection sees many ties
+    raws = [10 ** 30 + rng.randrange(1000) for _ in range(2000)] + [rng.randrange(2 ** 200) for _ in range(50)]
+    portfolio = _portfolio(raws)
+
+    for n in (1, 10, 100, 1500, 3000):
+        top = pf.top_wallets(portfolio, ASSET, n)
+        assert [raws[index] for index in top] == sorted(raws, reverse=True)[:n]
+    assert [raws[index] for index in pf.sort_wallets(portfolio, ASSET, descending=False)] == sorted(raws)
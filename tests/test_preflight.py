@@ -0,0 +1,66 @@
+import preflight
+from balances import SELECTOR_BALANCE_OF
+from config import DEFAULT_GAS_LIMIT_ERC20, DEFAULT_GAS_LIMIT_NATIVE
+
+ALICE = '0x1111111111111111111111111111111111111111'
+BOB = '0x2222222222222222222222222222222222222222'
+RECIPIENT = '0x3333333333333333333333333333333333333333'
+GAS_PRICE = 10 ** 9
+NATIVE_COST = DEFAULT_GAS_LIMIT_NATIVE * GAS_PRICE
+
+
+def _node(monkeypatch, native, tokens):
+    """Answer preflight's batches from fixed balances; every simulated transfer succeeds."""
+    def batch_request(web3, requests):
+        responses = []
+        for method, params in requests:
+            if method == 'eth_getBalance':
+                result = native[params[0]]
+            elif method == 'eth_estimateGas':
+                result = 21000 if 'data' not in params[0] else 50000
+            elif params[0]['data'].startswith(SELECTOR_BALANCE_OF):
+                result = tokens[params[0]['data'][-40:]]
+            else:
+                result = 1  # transfer() returned true
+            responses.append({'jsonrpc': '2.0', 'id': 1, 'result': '0x' + format(result, '064x')})
+        return responses
+
+    monkeypatch.setattr(preflight, 'get_web3_connection', lambda network: None)
+    monkeypatch.setattr(preflight, 'batch_request', batch_request)
+
+
+def _transfer(sender, asset, amount_raw):
+    return {'sender': sender, 'recipient': RECIPIENT, 'asset': asset, 'amount_raw': str(amount_raw)}
+
+
+def test_balances_are_checked_across_rows(monkeypatch):
+    _node(monkeypatch, native={ALICE: 2 * (NATIVE_COST + 10 ** 18) + 1, BOB: 10 ** 18},
+          tokens={ALICE[2:]: 100, BOB[2:]: 0})
+    results = preflight.preflight_transfers('ethereum', [
+        _transfer(ALICE, 'ETH', 10 ** 18),
+        _transfer(BOB, 'ETH', 10 ** 17),
+        _transfer(ALICE, 'ETH', 10 ** 18),
+        # Each row fits on its own, but ALICE has spent all but 1 wei by now
+        _transfer(ALICE, 'ETH', 1),
+    ], GAS_PRICE, block=100)
+
+    assert [result['ok'] for result in results] == [True, True, True, False]
+    assert results[3]['error'] == "insufficient ETH for this and earlier rows in the batch"
+
+
+def test_token_rows_spend_the_token_and_gas(monkeypatch):
+    token_gas = DEFAULT_GAS_LIMIT_ERC20 * GAS_PRICE
+    _node(monkeypatch, native={ALICE: 3 * token_gas}, tokens={ALICE[2:]: 100})
+    results = preflight.preflight_transfers('ethereum', [
+        _transfer(ALICE, 'USDT', 60),
+        # Rejected, so it spends neither tokens nor gas
+        _transfer(ALICE, 'USDT', 60),
+        _transfer(ALICE, 'USDT', 30),
+        _transfer(ALICE, 'USDT', 10),
+        _transfer(ALICE, 'USDT', 0),
+    ], GAS_PRICE, block=100)
+
+    assert [result['error'] for result in results] == [
+        None, "insufficient USDT for this and earlier rows in the batch", None, None,
+        "insufficient ETH for this and earlier rows in the batch"]
+    assert results[0]['gas'] == 50000
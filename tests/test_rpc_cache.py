@@ -0,0 +1,47 @@
+import rpc_cache
+
+BLOCK = ['0x10', False]
+
+
+class FakeProvider:
+    def __init__(self, chain_id):
+        self.chain_id = chain_id
+        self.calls = []
+
+    def make_request(self, method, params):
+        self.calls.append(method)
+        if method == 'eth_chainId':
+            return {'result': hex(self.chain_id)}
+        if method == 'eth_blockNumber':
+            return {'result': '0x100'}
+        return {'result': {'chain': self.chain_id}}
+
+
+def test_entries_are_per_chain_and_the_chain_id_is_asked_once(tmp_path):
+    cache = rpc_cache.open_cache(str(tmp_path / 'cache'))
+    try:
+        mainnet = rpc_cache.cache_provider(FakeProvider(1), cache, chain_id=1)
+        mainnet.make_request('eth_blockNumber', [])
+        assert mainnet.make_request('eth_getBlockByNumber', BLOCK) == {'result': {'chain': 1}}
+        assert mainnet.make_request('eth_getBlockByNumber', BLOCK)['result'] == {'chain': 1}
+        assert mainnet.calls == ['eth_blockNumber', 'eth_getBlockByNumber']
+
+        # An override endpoint on another chain, under the same network name, is asked for its chain ID
+        fork = FakeProvider(1337)
+        rpc_cache.cache_provider(fork, cache)
+        fork.make_request('eth_blockNumber', [])
+        assert fork.make_request('eth_getBlockByNumber', BLOCK)['result'] == {'chain': 1337}
+        assert fork.make_request('eth_getBlockByNumber', BLOCK)['result'] == {'chain': 1337}
+        assert fork.calls == ['eth_blockNumber', 'eth_chainId', 'eth_getBlockByNumber']
+    finally:
+        rpc_cache.close_cache(cache)
+
+
+def test_use_shared_cache_replaces_the_shared_cache(tmp_path, monkeypatch):
+    monkeypatch.setattr(rpc_cache, '_shared', None)
+    first = rpc_cache.use_shared_cache(str(tmp_path / 'one'))
+    assert rpc_cache.get_shared_cache() is first
+    second = rpc_cache.use_shared_cache(str(tmp_path / 'two'))
+    assert rpc_cache.get_shared_cache() is second and second['directory'].endswith('two')
+    rpc_cache.close_shared_cache()
+    assert rpc_cache._shared is None
@@ -0,0 +1,34 @@
+import json
+
+import scanner
+
+ADDRESSES = ['0x%040x' % n for n in range(1, 6)]
+
+
+def test_heads_are_resolved_once_and_given_to_every_shard(tmp_path, monkeypatch):
+    source = tmp_path / 'addresses.txt'
+    source.write_text("\n".join(ADDRESSES) + "\n")
+    directory = str(tmp_path / 'scan')
+    resolved = []
+    monkeypatch.setattr(scanner, 'resolve_heads',
+                        lambda networks: resolved.append(networks) or ({'ethereum': 100}, {'ethereum': 1700000000}))
+    seen = []
+
+    def rows(addresses, networks, nonzero=False, stats=None, heads=None, timestamps=None):
+        seen.append((len(addresses), heads, timestamps))
+        return iter(())
+
+    monkeypatch.setattr(scanner, 'iter_balance_rows', rows)
+
+    manifest = scanner.pin_heads(directory, scanner.split_addresses(str(source), None, directory, 2), ['ethereum'])
+    # A resumed scan reads the pinned heads back from the manifest
+    resumed = scanner.pin_heads(directory, scanner.split_addresses(str(source), None, directory, 2), ['ethereum'])
+    assert resolved == [['ethereum']]
+    assert resumed['heads'] == {'ethereum': 100}
+    with open(tmp_path / 'scan' / scanner.MANIFEST_FILE) as f:
+        assert json.load(f)['timestamps'] == {'ethereum': 1700000000}
+
+    for shard in range(manifest['shards']):
+        scanner.scan_shard(directory, shard, ['ethereum'], resumed['heads'], resumed['timestamps'])
+    pinned = ({'ethereum': 100}, {'ethereum': 1700000000})
+    assert seen == [(2, *pinned), (2, *pinned), (1, *pinned)]
@@ -0,0 +1,67 @@
+import threading
+import time
+from contextlib import ExitStack
+
+from scheduler import new_scheduler, rpc_slot
+
+
+def _wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() >= deadline:
+            return False
+        time.sleep(0.01)
+    return True
+
+
+def _queued(scheduler):
+    with scheduler['lock']:
+        return sum(len(queue) for queue in scheduler['queues'].values())
+
+
+def test_queued_requests_get_slots_in_proportion_to_their_weights():
+    scheduler = new_scheduler(slots=1, reserved=0, weights={'send': 8, 'interactive': 4, 'background': 1})
+    order = []
+
+    def request(priority):
+        with rpc_slot(scheduler, priority):
+            order.append(priority)
+
+    with ExitStack() as held:
+        held.enter_context(rpc_slot(scheduler, 'interactive'))
+        threads = [threading.Thread(target=request, args=(priority,))
+                   for priority in ['background'] * 4 + ['interactive'] * 16]
+        for thread in threads:
+            thread.start()
+        assert _wait_for(lambda: _queued(scheduler) == len(threads))
+    for thread in threads:
+        thread.join(5)
+
+    # Weights 4:1, so four interactive requests for every background one while both are queued
+    assert order[:10] == ['interactive'] * 4 + ['background'] + ['interactive'] * 4 + ['background']
+    assert scheduler['stats']['background']['requests'] == 4
+
+
+def test_background_requests_never_take_the_reserved_slots():
+    scheduler = new_scheduler(slots=2, reserved=1)
+    started = threading.Event()
+
+    def background():
+        with rpc_slot(scheduler, 'background'):
+            started.set()
+
+    with ExitStack() as first:
+        first.enter_context(rpc_slot(scheduler, 'background'))
+        thread = threading.Thread(target=background)
+        thread.start()
+        assert _wait_for(lambda: _queued(scheduler) == 1)
+        assert not started.wait(0.2)
+
+        with ExitStack() as interactive:
+            # The reserved slot is free for an interactive call at once
+            interactive.enter_context(rpc_slot(scheduler, 'interactive'))
+            first.close()
+            assert not started.wait(0.2)
+        assert started.wait(5)
+    thread.join(5)
+    assert scheduler['in_flight'] == 0
@@ -0,0 +1,104 @@
+import threading
+import time
+
+from singleflight import coalesce_provider, get_coalescing_stats
+
+BALANCE = ('eth_getBalance', ['0x1111111111111111111111111111111111111111', 'latest'])
+CODE = ('eth_getCode', ['0x2222222222222222222222222222222222222222', 'latest'])
+
+
+class FakeProvider:
+    def __init__(self):
+        self.gate = threading.Event()
+        self.calls = []
+        self.fail_batches = False
+
+    def make_request(self, method, params):
+        self.calls.append(method)
+        self.gate.wait(5)
+        return {'jsonrpc': '2.0', 'id': 1, 'result': f"{method}:{params[0]}"}
+
+    def make_batch_request(self, requests):
+        self.calls.append([method for method, _ in requests])
+        self.gate.wait(5)
+        if self.fail_batches:
+            return {'jsonrpc': '2.0', 'id': None, 'error': {'code': -32600, 'message': 'batch too large'}}
+        return [{'jsonrpc': '2.0', 'id': 1, 'result': f"{method}:{params[0]}"} for method, params in requests]
+
+
+def _wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() >= deadline:
+            return False
+        time.sleep(0.01)
+    return True
+
+
+def _requests(network):
+    return get_coalescing_stats().get(network, {}).get('requests', 0)
+
+
+def _start(target, *args):
+    results = []
+    thread = threading.Thread(target=lambda: results.append(target(*args)))
+    thread.start()
+    return thread, results
+
+
+def test_identical_requests_share_one_call():
+    endpoint = FakeProvider()
+    provider = coalesce_provider(endpoint, 'sf-single')
+    started = [_start(provider.make_request, *BALANCE) for _ in range(5)]
+    assert _wait_for(lambda: _requests('sf-single') == 5)
+    endpoint.gate.set()
+    for thread, _ in started:
+        thread.join(5)
+
+    responses = [results[0] for _, results in started]
+    assert endpoint.calls == ['eth_getBalance']
+    assert all(response == responses[0] for response in responses)
+    # Each caller gets its own dict
+    assert len({id(response) for response in responses}) == 5
+    assert get_coalescing_stats()['sf-single'] == {'requests': 5, 'shared': 4}
+
+    # Sends are never shared
+    provider.make_request('eth_sendRawTransaction', ['0xabc'])
+    provider.make_request('eth_sendRawTransaction', ['0xabc'])
+    assert endpoint.calls.count('eth_sendRawTransaction') == 2
+
+
+def test_batch_joins_a_call_in_flight_and_sends_duplicates_once():
+    endpoint = FakeProvider()
+    provider = coalesce_provider(endpoint, 'sf-batch')
+    single, single_results = _start(provider.make_request, *BALANCE)
+    assert _wait_for(lambda: _requests('sf-batch') == 1)
+
+    batch, batch_results = _start(provider.make_batch_request, [BALANCE, CODE, CODE])
+    assert _wait_for(lambda: len(endpoint.calls) == 2)
+    endpoint.gate.set()
+    single.join(5)
+    batch.join(5)
+
+    assert endpoint.calls == ['eth_getBalance', ['eth_getCode']]
+    assert [response['result'] for response in batch_results[0]] == \
+        [single_results[0]['result'], f"eth_getCode:{CODE[1][0]}", f"eth_getCode:{CODE[1][0]}"]
+
+
+def test_joiners_of_a_failed_batch_send_their_own_request():
+    endpoint = FakeProvider()
+    endpoint.fail_batches = True
+    provider = coalesce_provider(endpoint, 'sf-retry')
+    batch, batch_results = _start(provider.make_batch_request, [BALANCE, CODE])
+    assert _wait_for(lambda: _requests('sf-retry') == 2)
+
+    joiner, joiner_results = _start(provider.make_request, *BALANCE)
+    assert _wait_for(lambda: _requests('sf-retry') == 3)
+    endpoint.gate.set()
+    batch.join(5)
+    joiner.join(5)
+
+    # The failed batch's answer goes back to its caller; the joiner retried on its own
+    assert 'error' in batch_results[0]
+    assert joiner_results[0]['result'] == f"eth_getBalance:{BALANCE[1][0]}"
+    assert endpoint.calls == [['eth_getBalance', 'eth_getCode'], 'eth_getBalance']
@@ -0,0 +1,24 @@
+import sqlite3
+
+import pytest
+
+from state import save_wallets, get_wallet_addresses, allocate_nonce
+
+ALICE = '0x1111111111111111111111111111111111111111'
+BOB = '0x2222222222222222222222222222222222222222'
+KEY = '0x' + '11' * 32
+
+
+def test_failed_transaction_is_rolled_back(state_db):
+    save_wallets({1: {'address': ALICE, 'private_key': KEY}})
+
+    # The second row has no address: the whole batch fails, including the delete
+    with pytest.raises(sqlite3.IntegrityError):
+        save_wallets({2: {'address': BOB, 'private_key': '0x' + '22' * 32},
+                      3: {'address': None, 'private_key': '0x' + '33' * 32}})
+    assert not state_db.in_transaction
+    assert get_wallet_addresses() == {1: ALICE}
+
+    # The connection is usable again
+    assert allocate_nonce(ALICE, 'ethereum', 5) == 5
+    assert allocate_nonce(ALICE, 'ethereum', 0) == 6
@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+Stage-level tracing and sampling profiler for the EVM Wallet Manager.
+Spans are written as OTLP/JSON lines so they can be loaded by any
+OpenTelemetry-compatible tool; the profiler writes collapsed stacks.
+"""
+
+import os
+import sys
+import json
+import time
+import threading
+from contextlib import contextmanager
+
+
+SERVICE_NAME = 'evm-wallet-manager'
+
+_local = threading.local()
+_export_lock = threading.Lock()
+_trace_file = None
+
+
+def configure_tracing(filename):
+    """Enable span export to a local JSONL file (None disables tracing)."""
+    global _trace_file
+    _trace_file = filename
+
+
+def tracing_enabled():
+    return _trace_file is not None
+
+
+def _attribute_value(value):
+    """Encode an attribute value as an OTLP AnyValue."""
+    if isinstance(value, bool):
+        return {'boolValue': value}
+    if isinstance(value, int):
+        return {'intValue': str(value)}
+    if isinstance(value, float):
+        return {'doubleValue': value}
+    return {'stringValue': str(value)}
+
+
+def _export(record):
+    """Append one finished span to the trace file as an OTLP/JSON resourceSpans line."""
+    line = {
+        'resourceSpans': [{
+            'resource': {'attributes': [
+                {'key': 'service.name', 'value': {'stringValue': SERVICE_NAME}},
+            ]},
+            'scopeSpans': [{
+                'scope': {'name': 'wallet-manager.tracing'},
+                'spans': [record],
+            }],
+        }],
+    }
+    data = json.dumps(line, separators=(',', ':'))
+    with _export_lock:
+        with open(_trace_file, 'a') as f:
+            f.write(data + "\n")
+
+
+@contextmanager
+def span(name, **attributes):
+    """Trace a block of code as a span; nested spans share the trace id."""
+    if _trace_file is None:
+        yield {}
+        return
+
+    stack = getattr(_local, 'stack', None)
+    if stack is None:
+        stack = _local.stack = []
+    parent = stack[-1] if stack else None
+
+    current = {
+        'traceId': parent['traceId'] if parent else os.urandom(16).hex(),
+        'spanId': os.urandom(8).hex(),
+        'name': name,
+        'kind': 1,  # SPAN_KIND_INTERNAL
+        'attributes': dict(attributes),
+    }
+    if parent:
+        current['parentSpanId'] = parent['spanId']
+
+    stack.append(current)
+    start = time.time_ns()
+    status = {'code': 1}  # STATUS_CODE_OK
+    try:
+        yield current['attributes']
+    except BaseException as e:
+        status = {'code': 2, 'message': f"{type(e).__name__}: {e}"}  # STATUS_CODE_ERROR
+        raise
+    finally:
+        end = time.time_ns()
+        stack.pop()
+        record = {
+            'traceId': current['traceId'],
+            'spanId': current['spanId'],
+            'name': name,
+            'kind': current['kind'],
+            'startTimeUnixNano': str(start),
+            'endTimeUnixNano': str(end),
+            'attributes': [{'key': k, 'value': _attribute_value(v)}
+                           for k, v in current['attributes'].items() if v is not None],
+            'status': status,
+        }
+        if 'parentSpanId' in current:
+            record['parentSpanId'] = current['parentSpanId']
+        try:
+            _export(record)
+        except OSError as e:
+            print(f"⚠️  Could not write trace span: {e}")
+
+
+def _sample_loop(profiler):
+    """Collect stack samples from every other thread until stopped."""
+    own_id = threading.get_ident()
+    interval = profiler['interval']
+    while not profiler['stop'].wait(interval):
+        names = {t.ident: t.name for t in threading.enumerate()}
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == own_id:
+                continue
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                frame = frame.f_back
+            key = ';'.join([names.get(thread_id, str(thread_id))] + stack[::-1])
+            profiler['samples'][key] = profiler['samples'].get(key, 0) + 1
+
+
+def start_sampling_profiler(interval=0.005):
+    """Start a background sampling profiler and return its handle."""
+    profiler = {
+        'interval': interval,
+        'samples': {},
+        'stop': threading.Event(),
+        'started': time.perf_counter(),
+    }
+    profiler['thread'] = threading.Thread(target=_sample_loop, args=(profiler,),
+                                          name='sampling-profiler', daemon=True)
+    profiler['thread'].start()
+    return profiler
+
+
+def stop_sampling_profiler(profiler, filename):
+    """Stop the profiler and write collapsed stacks (flamegraph.pl / speedscope format)."""
+    profiler['stop'].set()
+    profiler['thread'].join()
+    with open(filename, 'w') as f:
+        for stack, count in sorted(profiler['samples'].items(), key=lambda item: -item[1]):
+            f.write(f"{stack} {count}\n")
+    return sum(profiler['samples'].values())
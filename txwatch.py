@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+Stuck transaction watcher for the EVM Wallet Manager.
+Finds transactions that stay pending longer than a target latency and
+re-signs them at the same nonce with a higher gas price (or cancels them),
+linking every replacement to the hash it replaced in the state store.
+"""
+
+import time
+import threading
+from web3 import Web3
+from web3.exceptions import TransactionNotFound, TimeExhausted
+from config import TX_WATCH_INTERVAL, STUCK_TX_SECONDS, FEE_BUMP_PERCENT, MAX_FEE_BUMPS, STUCK_TX_ACTION
+from chains import get_chain, build_transfer
+from rpc import get_web3_connection
+from scheduler import rpc_priority
+from state import (
+    record_transaction, update_transaction, get_transaction, get_pending_transactions, get_replacement_chain,
+    get_original_chain,
+)
+
+
+def _get_receipt(web3, tx_hash):
+    try:
+        return web3.eth.get_transaction_receipt(tx_hash)
+    except TransactionNotFound:
+        return None
+
+
+def find_receipt(web3, tx_hash):
+    """Return the receipt of a transaction or of any replacement sent for it, or None."""
+    for candidate in reversed(get_replacement_chain(tx_hash)):
+        receipt = _get_receipt(web3, candidate)
+        if receipt is not None:
+            return receipt
+    return None
+
+
+def wait_for_receipt(web3, tx_hash, timeout=300, poll_latency=0.1):
+    """Like wait_for_transaction_receipt, but also returns once a fee-bumped replacement is mined."""
+    deadline = time.monotonic() + timeout
+    while True:
+        receipt = find_receipt(web3, tx_hash)
+        if receipt is not None:
+            return receipt
+        if time.monotonic() >= deadline:
+            raise TimeExhausted(f"Transaction {tx_hash} is not in the chain after {timeout} seconds")
+        time.sleep(poll_latency)
+
+
+def receipt_hash(receipt):
+    """Return the 0x-prefixed hash of the transaction a receipt belongs to."""
+    return Web3.to_hex(receipt['transactionHash'])
+
+
+def is_cancel(tx):
+    """Return True if a recorded transaction is a cancel: a zero-value self-transfer replacing another."""
+    return (tx is not None and tx['replaces'] is not None and int(tx['amount_raw']) == 0
+            and tx['recipient'].lower() == tx['sender'].lower())
+
+
+def bumped_gas_price(old_price, current_price, bump_percent=FEE_BUMP_PERCENT):
+    """Return a gas price that satisfies the node's replacement rule and is not below the current price."""
+    percent = max(int(bump_percent), 10)
+    minimum = -(-old_price * (100 + percent) // 100)
+    return max(minimum, current_price)
+
+
+def replace_transaction(web3, tx, private_key, action=STUCK_TX_ACTION):
+    """Re-sign a pending transaction at the same nonce with a bumped fee; returns the new hash."""
+    chain = get_chain(tx['network'])
+    if tx['gas_price'] is not None:
+        old_price = int(tx['gas_price'])
+    else:
+        old_price = web3.eth.get_transaction(tx['tx_hash'])['gasPrice']
+    gas_price = bumped_gas_price(old_price, web3.eth.gas_price)
+
+    if action == 'cancel':
+        # Zero-value transfer to self consumes the nonce instead of paying the recipient
+        asset, recipient, amount_raw = chain['native'], tx['sender'], 0
+    else:
+        asset, recipient, amount_raw = tx['asset'], tx['recipient'], int(tx['amount_raw'])
+
+    transaction = build_transfer(chain, asset, recipient, amount_raw, tx['nonce'], gas_price)
+    signed_txn = web3.eth.account.sign_transaction(transaction, private_key)
+    new_hash = web3.to_hex(signed_txn.hash)
+
+    web3.eth.send_raw_transaction(signed_txn.raw_transaction)
+    record_transaction(new_hash, tx['network'], tx['sender'], recipient, asset, amount_raw, tx['nonce'],
+                       gas_price=gas_price, replaces=tx['tx_hash'])
+    update_transaction(tx['tx_hash'], 'replaced')
+    return new_hash
+
+
+def check_transaction(tx, private_keys, action=STUCK_TX_ACTION):
+    """Check one stuck transaction and settle, replace or leave it; returns what was done."""
+    web3 = get_web3_connection(tx['network'])
+    versions = get_original_chain(tx['tx_hash'])
+
+    if web3.eth.get_transaction_count(tx['sender'], 'latest') > tx['nonce']:
+        # The nonce is used: one of the versions was mined, or a transaction this store does not know about
+        for candidate in versions:
+            receipt = _get_receipt(web3, candidate)
+            if receipt is not None:
+                update_transaction(candidate, 'confirmed' if receipt.status == 1 else 'failed', receipt.blockNumber)
+                if candidate != tx['tx_hash']:
+                    # A mined cancel means the payment was never made
+                    update_transaction(tx['tx_hash'], 'cancelled' if is_cancel(get_transaction(candidate)) else 'replaced')
+                return 'mined'
+        update_transaction(tx['tx_hash'], 'dropped')
+        return 'dropped'
+
+    if len(versions) - 1 >= MAX_FEE_BUMPS:
+        return 'stuck'
+    private_key = private_keys.get(tx['sender'].lower())
+    if private_key is None:
+        return 'stuck'
+
+    new_hash = replace_transaction(web3, tx, private_key, action)
+    print(f"\n⛽ {tx['network']} nonce {tx['nonce']} pending for {int(time.time() - tx['created_at'])}s: "
+          f"{'cancelled' if action == 'cancel' else 'fee bumped'} {tx['tx_hash']} -> {new_hash}")
+    return 'replaced'
+
+
+def check_stuck_transactions(wallets, stuck_after=STUCK_TX_SECONDS, action=STUCK_TX_ACTION):
+    """Run one watcher pass over every transaction pending longer than stuck_after seconds.
+
+    Returns {outcome: count}.
+    """
+    private_keys = {wallet['address'].lower(): wallet['private_key'] for wallet in wallets.values()}
+    results = {}
+    for tx in get_pending_transactions(older_than=stuck_after):
+        try:
+            outcome = check_transaction(tx, private_keys, action)
+        except Exception as e:
+            print(f"\n⚠️  Could not replace {tx['tx_hash']} on {tx['network']}: {e}")
+            outcome = 'error'
+        results[outcome] = results.get(outcome, 0) + 1
+    return results
+
+
+def start_tx_watcher(wallets, interval=TX_WATCH_INTERVAL):
+    """Start a daemon thread that replaces stuck transactions; returns a handle for stop_tx_watcher."""
+    stop = threading.Event()
+
+    def watch():
+        # Checks are background traffic; replacement broadcasts still go out in the send class
+        with rpc_priority('background'):
+            while not stop.wait(interval):
+                check_stuck_transactions(wallets)
+
+    thread = threading.Thread(target=watch, name='tx-watcher', daemon=True)
+    thread.start()
+    return {'thread': thread, 'stop': stop}
+
+
+def stop_tx_watcher(watcher):
+    """Stop a watcher started with start_tx_watcher."""
+    watcher['stop'].set()
+    watcher['thread'].join(timeout=5)